@@ -0,0 +1,42 @@
+"""The web app for twentyquestions."""
+
+import logging
+
+import flask
+
+from backend.views import (
+    twentyquestions,
+    socketio)
+
+
+logger = logging.getLogger(__name__)
+
+
+def create_app():
+    """Return a new twentyquestions app.
+
+    Returns
+    -------
+    flask.Flask
+        The app, with the twentyquestions blueprint registered and the
+        web socket set up.
+    """
+    app = flask.Flask(__name__)
+
+    @app.route('/')
+    def root():
+        """A root page for twentyquestions."""
+        return (
+            'This server is used by the Allen Institute for Artificial'
+            ' Intelligence to crowdsource common sense by playing 20'
+            ' Questions.',
+            200
+        )
+
+    # register blueprints
+    app.register_blueprint(twentyquestions)
+
+    # set up the web socket
+    socketio.init_app(app)
+
+    return app
@@ -0,0 +1,129 @@
+"""Detecting green threads that block the eventlet hub.
+
+Every socket handler runs in a green thread on the same hub, so a green
+thread that runs for a long time without yielding stalls all of the
+others.
+"""
+
+import logging
+import sys
+import time
+import traceback
+
+import eventlet
+from eventlet import patcher
+
+
+logger = logging.getLogger(__name__)
+
+
+# the real modules, in case eventlet has monkey patched them, since the
+# watchdog must keep running while the hub is blocked
+_threading = patcher.original('threading')
+_time = patcher.original('time')
+
+
+# main classes
+
+class BlockingDetector(object):
+    """Detect and log green threads holding the hub for too long.
+
+    A green thread on the hub records a heartbeat, then sleeps. A
+    watchdog OS thread checks the heartbeat, and if it's late, then
+    something has held the hub since, so the watchdog logs the stack
+    running in the hub's thread.
+    """
+
+    def __init__(self, threshold, counter, event_from_code):
+        """Create a new instance.
+
+        Parameters
+        ----------
+        threshold : float
+            How long a green thread may hold the hub before it's
+            reported, in seconds.
+        counter : metrics.Counter
+            A counter with an event label, incremented each time the
+            hub is blocked.
+        event_from_code : Dict[code, str]
+            A map from the code of each socket handler to the name of
+            its event, for labeling blocks that happen in a handler.
+
+        Returns
+        -------
+        BlockingDetector
+            The new instance.
+        """
+        self.threshold = threshold
+        self.counter = counter
+        self.event_from_code = event_from_code
+
+        self._interval = threshold / 2
+        self._last_beat = None
+        self._reported_beat = None
+        self._hub_thread_id = None
+        self._running = False
+
+    def _beat(self):
+        """Record heartbeats from the hub until stopped."""
+        while self._running:
+            self._last_beat = time.monotonic()
+            eventlet.sleep(self._interval)
+
+    def _watch(self):
+        """Check the heartbeats until stopped."""
+        while self._running:
+            _time.sleep(self._interval)
+
+            last_beat = self._last_beat
+            blocked_for = time.monotonic() - last_beat - self._interval
+            if blocked_for > self.threshold \
+                    and last_beat != self._reported_beat:
+                # only report each block once
+                self._reported_beat = last_beat
+                self._report(blocked_for)
+
+    def _report(self, blocked_for):
+        """Log the stack that's blocking the hub."""
+        frame = sys._current_frames().get(self._hub_thread_id)
+        stack = traceback.extract_stack(frame) if frame is not None else []
+
+        # label the block with the outermost socket handler on the stack
+        event = None
+        while frame is not None:
+            event = self.event_from_code.get(frame.f_code, event)
+            frame = frame.f_back
+
+        self.counter.inc(label=event or 'unknown')
+        logger.warning(
+            f'A green thread has blocked the hub for at least'
+            f' {blocked_for:.3f}s (handling {event or "no socket event"}).'
+            f' Stack:\n'
+            + ''.join(traceback.format_list(stack)))
+
+    def start(self):
+        """Start detecting blocks.
+
+        ``start`` must be called from the thread running the hub.
+        """
+        if self._running:
+            raise RuntimeError('The detector is already running.')
+
+        self._running = True
+        self._hub_thread_id = _threading.get_ident()
+        self._last_beat = time.monotonic()
+
+        eventlet.spawn(self._beat)
+        _threading.Thread(
+            target=self._watch,
+            name='blocking-detector',
+            daemon=True
+        ).start()
+
+        logger.info(
+            f'Detecting green threads that hold the hub for longer than'
+            f' {self.threshold}s.')
+
+    def stop(self):
+        """Stop detecting blocks."""
+        self._running = False
@@ -0,0 +1,312 @@
+"""Metrics for monitoring the server.
+
+The metrics are rendered in the Prometheus text exposition format. Each
+metric is updated incrementally as events happen, so rendering them
+only formats values that have already been computed.
+"""
+
+import bisect
+import json
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+# constants
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# the upper bounds of the buckets for latencies, in seconds
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+    2.5, 5.0, 10.0)
+
+
+# helper functions
+
+def _format_value(value):
+    """Return ``value`` formatted for the exposition format."""
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _format_labels(labels):
+    """Return ``labels`` formatted for the exposition format."""
+    if len(labels) == 0:
+        return ''
+
+    pairs = ','.join(
+        '{}="{}"'.format(
+            name,
+            str(value)
+                .replace('\\', '\\\\')
+                .replace('"', '\\"')
+                .replace('\n', '\\n'))
+        for name, value in labels)
+    return f'{{{pairs}}}'
+
+
+# main classes
+
+class Metric(object):
+    """A metric, possibly split into several series by a label.
+
+    Subclasses must define ``TYPE`` and ``_samples``.
+    """
+
+    TYPE = None
+
+    def __init__(self, name, documentation, label_name=None):
+        """Create a new instance.
+
+        Parameters
+        ----------
+        name : str
+            The name of the metric.
+        documentation : str
+            A description of the metric.
+        label_name : Optional[str], optional (default=None)
+            The name of the label splitting the metric into series, if
+            any.
+
+        Returns
+        -------
+        Metric
+            The new instance.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.label_name = label_name
+
+    def _labels(self, label):
+        """Return the labels for the series ``label``."""
+        if self.label_name is None:
+            return []
+        return [(self.label_name, label)]
+
+    def _samples(self):
+        """Yield the samples for the metric.
+
+        Yields
+        ------
+        Tuple[str, List[Tuple[str, str]], float]
+            The name, labels, and value of each sample.
+        """
+        raise NotImplementedError
+
+    def render(self):
+        """Return the metric in the Prometheus exposition format.
+
+        Returns
+        -------
+        str
+            The metric's help and type comments, followed by its
+            samples.
+        """
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.TYPE}'
+        ]
+        for name, labels, value in self._samples():
+            lines.append(
+                f'{name}{_format_labels(labels)} {_format_value(value)}')
+
+        return '\n'.join(lines) + '\n'
+
+
+class Counter(Metric):
+    """A count that only goes up."""
+
+    TYPE = 'counter'
+
+    def __init__(self, name, documentation, label_name=None):
+        super().__init__(name, documentation, label_name)
+
+        self._values = {}
+
+    def inc(self, amount=1, label=None):
+        """Increment the counter.
+
+        Parameters
+        ----------
+        amount : float, optional (default=1)
+            The amount to increment the counter by.
+        label : Optional[str], optional (default=None)
+            The value of the counter's label, if it has one.
+        """
+        self._values[label] = self._values.get(label, 0) + amount
+
+    def _samples(self):
+        for label, value in self._values.items():
+            yield self.name, self._labels(label), value
+
+
+class Gauge(Metric):
+    """A value that's read from a function when the metric is rendered.
+
+    The function must be cheap, e.g. taking the length of a dictionary.
+    """
+
+    TYPE = 'gauge'
+
+    def __init__(self, name, documentation, function, label_name=None):
+        """Create a new instance.
+
+        Parameters
+        ----------
+        name : str
+            The name of the metric.
+        documentation : str
+            A description of the metric.
+        function : Callable[[], Union[float, Dict[str, float]]]
+            A function returning the gauge's value, or if it has a
+            label, a dictionary mapping each value of the label to the
+            gauge's value.
+        label_name : Optional[str], optional (default=None)
+            The name of the label splitting the metric into series, if
+            any.
+
+        Returns
+        -------
+        Gauge
+            The new instance.
+        """
+        super().__init__(name, documentation, label_name)
+
+        self.function = function
+
+    def _samples(self):
+        values = self.function()
+        if self.label_name is None:
+            values = {None: values}
+
+        for label, value in values.items():
+            yield self.name, self._labels(label), value
+
+
+class Histogram(Metric):
+    """A distribution of observations, counted in buckets."""
+
+    TYPE = 'histogram'
+
+    def __init__(
+            self,
+            name,
+            documentation,
+            label_name=None,
+            buckets=LATENCY_BUCKETS):
+        """Create a new instance.
+
+        Parameters
+        ----------
+        name : str
+            The name of the metric.
+        documentation : str
+            A description of the metric.
+        label_name : Optional[str], optional (default=None)
+            The name of the label splitting the metric into series, if
+            any.
+        buckets : Sequence[float], optional (default=LATENCY_BUCKETS)
+            The upper bounds of the buckets, in increasing order. A
+            bucket for infinity is always added.
+
+        Returns
+        -------
+        Histogram
+            The new instance.
+        """
+        super().__init__(name, documentation, label_name)
+
+        self.buckets = tuple(buckets)
+
+        # each series is a list of the count in each bucket (not
+        # cumulative), followed by the sum of the observations
+        self._series = {}
+
+    def observe(self, value, label=None):
+        """Record an observation.
+
+        Parameters
+        ----------
+        value : float
+            The value observed.
+        label : Optional[str], optional (default=None)
+            The value of the histogram's label, if it has one.
+        """
+        series = self._series.get(label)
+        if series is None:
+            series = self._series[label] = [0] * (len(self.buckets) + 2)
+
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def _samples(self):
+        for label, series in self._series.items():
+            labels = self._labels(label)
+            count = 0
+            for bound, bucket_count in zip(
+                    self.buckets + (float('inf'),), series):
+                count += bucket_count
+                yield (
+                    f'{self.name}_bucket',
+                    labels + [('le', _format_value(float(bound)))],
+                    count)
+            yield f'{self.name}_sum', labels, series[-1]
+            yield f'{self.name}_count', labels, count
+
+
+class CountingJSON(object):
+    """A JSON module that counts the bytes it encodes.
+
+    Pass an instance as the ``json`` option of ``flask_socketio.SocketIO``
+    to count the bytes of every packet sent over the socket. The packets
+    are encoded once for each client they're sent to, so nothing is
+    serialized just to be counted.
+    """
+
+    def __init__(self, counter):
+        """Create a new instance.
+
+        Parameters
+        ----------
+        counter : Counter
+            The counter to increment by the size of each encoded packet.
+
+        Returns
+        -------
+        CountingJSON
+            The new instance.
+        """
+        self.counter = counter
+
+    def dumps(self, *args, **kwargs):
+        encoded = json.dumps(*args, **kwargs)
+        # json.dumps escapes any non-ASCII characters, so the length is
+        # the number of bytes
+        self.counter.inc(len(encoded))
+        return encoded
+
+    def loads(self, *args, **kwargs):
+        return json.loads(*args, **kwargs)
+
+
+# main functions
+
+def render(metrics):
+    """Return ``metrics`` in the Prometheus exposition format.
+
+    Parameters
+    ----------
+    metrics : Iterable[Metric]
+        The metrics to render.
+
+    Returns
+    -------
+    str
+        The rendered metrics.
+    """
+    return ''.join(metric.render() for metric in metrics)
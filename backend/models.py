@@ -1,9 +1,12 @@
 """Code modeling the 20 Questions game."""
 
 import copy
+import heapq
+import itertools
 import json
 import logging
 import random
+import time
 import uuid
 
 from . import settings
@@ -14,17 +17,74 @@ logger = logging.getLogger(__name__)
 
 # constants
 
-# the seed subjects
-subject = None
-with open(settings.SUBJECTS_FILE_PATH, 'r') as subjects_file:
-    subjects = [
-        ln.strip().lower() for ln in subjects_file
-    ]
-random.shuffle(subjects)
+# the seed subjects, in a random order. They're read the first time
+# ``get_subjects`` is called, so that importing this module does no I/O.
+_subjects = None
+
+# the random number generator for IDs and the order of the subjects,
+# once ``seed`` has been called. Until then, IDs are random UUIDs.
+_random = None
 
 
 # helper classes and functions
 
+def get_subjects():
+    """Return the seed subjects that haven't been used yet.
+
+    The subjects are read from ``settings.SUBJECTS_FILE_PATH`` and
+    shuffled on the first call. Later calls return the same list, so
+    popping a subject from it uses the subject up.
+
+    Returns
+    -------
+    List[str]
+        The remaining seed subjects.
+    """
+    global _subjects
+
+    if _subjects is None:
+        with open(settings.SUBJECTS_FILE_PATH, 'r') as subjects_file:
+            _subjects = [
+                ln.strip().lower() for ln in subjects_file
+            ]
+        (_random or random).shuffle(_subjects)
+
+    return _subjects
+
+
+def new_id():
+    """Return a new ID for a player or game room.
+
+    Returns
+    -------
+    str
+        The hex of a version 4 UUID.
+    """
+    if _random is None:
+        return uuid.uuid4().hex
+
+    return uuid.UUID(int=_random.getrandbits(128), version=4).hex
+
+
+def seed(a):
+    """Make the IDs and the order of the subjects reproducible.
+
+    The seed subjects that have been used up are restored and shuffled
+    right away, so that the IDs don't depend on when the subjects are
+    first used.
+
+    Parameters
+    ----------
+    a : int
+        The seed.
+    """
+    global _random, _subjects
+
+    _random = random.Random(a)
+    _subjects = None
+    get_subjects()
+
+
 class Data(object):
     """A base class for modeling data.
 
@@ -153,6 +213,10 @@ PLAYERACTIONS = {
     'GOACTIVE': 'GOACTIVE'
 }
 
+# the number of out of date entries the player router's activity heap
+# may hold, beyond one per game room, before it's compacted
+ACTIVITY_HEAP_SLACK = 64
+
 
 # data models
 
@@ -679,7 +743,8 @@ class PlayerRouter(object):
             game_rooms,
             players,
             game_room_priorities,
-            player_matches):
+            player_matches,
+            clock=time.monotonic):
         """Create a new instance.
 
         Parameters
@@ -697,6 +762,9 @@ class PlayerRouter(object):
             up first.
         player_matches : Dict[str, str]
             A dictionary mapping player ids to game room ids.
+        clock : Callable[[], float], optional (default=time.monotonic)
+            A function returning the current time in seconds, for
+            tracking when each game room was last active.
 
         Returns
         -------
@@ -712,8 +780,122 @@ class PlayerRouter(object):
         self.game_room_priorities = game_room_priorities
         self.player_matches = player_matches
 
+        # indexes of the game room IDs by game state and the player IDs
+        # by status. Each index maps a state to a dictionary with the
+        # IDs as keys, which is used as an ordered set. All changes to
+        # ``game_rooms`` and ``players`` go through the ``_set_*`` and
+        # ``_delete_*`` helper methods to keep the indexes up to date.
+        self.game_room_ids_by_state = {
+            state: {} for state in STATES.values()
+        }
+        for room_id, game_room in game_rooms.items():
+            self.game_room_ids_by_state[game_room.game.state][room_id] = None
+        self.player_ids_by_status = {
+            status: {} for status in PLAYERSTATUSES.values()
+        }
+        for player_id, player in players.items():
+            self.player_ids_by_status[player.status][player_id] = None
+
+        # when each game room last changed, and a min-heap of
+        # (last active, room ID) pairs for finding idle game rooms.
+        # Rather than updating entries in the heap, a new entry is
+        # pushed each time a game room changes, and entries that are out
+        # of date are skipped when they're popped.
+        self.clock = clock
+        now = clock()
+        self.last_active_from_room_id = {
+            room_id: now for room_id in game_rooms
+        }
+        self._activity_heap = [
+            (now, room_id) for room_id in sorted(game_rooms)
+        ]
+
+        self.num_evicted_game_rooms = 0
+
     # helper methods
 
+    def _touch_game_room(self, room_id):
+        """Record that the game room for ``room_id`` was just active."""
+        now = self.clock()
+        self.last_active_from_room_id[room_id] = now
+        heapq.heappush(self._activity_heap, (now, room_id))
+
+        # drop the out of date entries once they outnumber the game
+        # rooms, so the heap's size stays proportional to them
+        if (
+                len(self._activity_heap)
+                > 2 * len(self.game_rooms) + ACTIVITY_HEAP_SLACK
+        ):
+            self._activity_heap = [
+                (last_active, room_id)
+                for room_id, last_active
+                in self.last_active_from_room_id.items()
+            ]
+            heapq.heapify(self._activity_heap)
+
+    def _set_game_room(self, room_id, game_room):
+        """Set the game room for ``room_id`` to ``game_room``.
+
+        Parameters
+        ----------
+        room_id : str
+            The ID for the game room.
+        game_room : GameRoom
+            The new game room.
+        """
+        old_game_room = self.game_rooms.get(room_id)
+        if old_game_room is None:
+            self.game_room_ids_by_state[game_room.game.state][room_id] = None
+        elif old_game_room.game.state != game_room.game.state:
+            del self.game_room_ids_by_state[
+                old_game_room.game.state][room_id]
+            self.game_room_ids_by_state[game_room.game.state][room_id] = None
+
+        self.game_rooms[room_id] = game_room
+        self._touch_game_room(room_id)
+
+    def _delete_game_room(self, room_id):
+        """Delete the game room for ``room_id``.
+
+        Parameters
+        ----------
+        room_id : str
+            The ID for the game room to delete.
+        """
+        game_room = self.game_rooms.pop(room_id)
+        del self.game_room_ids_by_state[game_room.game.state][room_id]
+        del self.last_active_from_room_id[room_id]
+
+    def _set_player(self, player_id, player):
+        """Set the player for ``player_id`` to ``player``.
+
+        Parameters
+        ----------
+        player_id : str
+            The ID for the player.
+        player : Player
+            The new player.
+        """
+        old_player = self.players.get(player_id)
+        if old_player is None:
+            self.player_ids_by_status[player.status][player_id] = None
+        elif old_player.status != player.status:
+            del self.player_ids_by_status[old_player.status][player_id]
+            self.player_ids_by_status[player.status][player_id] = None
+
+        self.players[player_id] = player
+
+    def _delete_player(self, player_id):
+        """Delete the player for ``player_id``.
+
+        Parameters
+        ----------
+        player_id : str
+            The ID for the player to delete.
+        """
+        player = self.players.pop(player_id)
+        del self.player_ids_by_status[player.status][player_id]
+
     def _match_player_to_game_room(self, player_id):
         """Match the player for ``player_id`` to a game room.
 
@@ -740,7 +922,7 @@ class PlayerRouter(object):
         if len(game_room_ids) == 0:
             # there are no partially full game rooms
             # create a new game room for this player
-            room_id = str(uuid.uuid4()).replace('-', '')
+            room_id = new_id()
             game_room = GameRoom(
                 room_id=room_id,
                 game=Game(
@@ -748,14 +930,14 @@ class PlayerRouter(object):
                     answerer_id=None,
                     asker_id=None,
                     round_=Round(
-                        subject=subjects.pop(),
+                        subject=get_subjects().pop(),
                         guess_and_answer=None,
                         question_and_answers=[])),
                 player_ids=[]
             ).add_player(player)
 
             # update game room and player matches
-            self.game_rooms[room_id] = game_room
+            self._set_game_room(room_id, game_room)
             self.player_matches[player_id] = room_id
 
             # add the game room into the priority queue
@@ -770,7 +952,7 @@ class PlayerRouter(object):
             game_room = old_game_room.add_player(player)
 
             # update game room and player matches
-            self.game_rooms[room_id] = game_room
+            self._set_game_room(room_id, game_room)
             self.player_matches[player_id] = room_id
 
             # add game room into priority queue or kick of play
@@ -783,8 +965,8 @@ class PlayerRouter(object):
                 for a_player_id in game_room.player_ids:
                     a_player = self.players[a_player_id]
                     if a_player.status == PLAYERSTATUSES['WAITING']:
-                        self.players[a_player_id] = a_player.copy(
-                            status=PLAYERSTATUSES['READYTOPLAY'])
+                        self._set_player(a_player_id, a_player.copy(
+                            status=PLAYERSTATUSES['READYTOPLAY']))
 
     # server connection actions
 
@@ -807,7 +989,7 @@ class PlayerRouter(object):
         player = Player(
             player_id=player_id,
             status=PLAYERSTATUSES['READINGINSTRUCTIONS'])
-        self.players[player_id] = player
+        self._set_player(player_id, player)
 
         # set the player's match to the None game room
         self.player_matches[player_id] = None
@@ -835,13 +1017,13 @@ class PlayerRouter(object):
             if num_players == 0 and game_finished:
                 # the game is complete and all players are gone
                 # delete the game room
-                del self.game_rooms[room_id]
+                self._delete_game_room(room_id)
             elif num_players > 0 and game_finished:
                 # the game is complete but players are left
-                self.game_rooms[room_id] = game_room
+                self._set_game_room(room_id, game_room)
             elif not game_finished:
                 # the game is incomplete, put it back in the queue
-                self.game_rooms[room_id] = game_room
+                self._set_game_room(room_id, game_room)
                 # remove the old game room priority if there is one
                 self.game_room_priorities = [
                     [a_room_id for a_room_id in room_ids if a_room_id != room_id]
@@ -851,7 +1033,7 @@ class PlayerRouter(object):
                 self.game_room_priorities[num_players].append(room_id)
 
         # delete the player
-        del self.players[player_id]
+        self._delete_player(player_id)
         del self.player_matches[player_id]
 
     # player actions
@@ -875,8 +1057,8 @@ class PlayerRouter(object):
                 f'Player {player_id} cannot finish reading instructions'
                 f' while in the {player.status} state.')
 
-        self.players[player_id] = player.copy(
-            status=PLAYERSTATUSES['WAITING'])
+        self._set_player(player_id, player.copy(
+            status=PLAYERSTATUSES['WAITING']))
 
         # match the player to a game room
         self._match_player_to_game_room(player_id)
@@ -897,7 +1079,7 @@ class PlayerRouter(object):
             raise ValueError(
                 'Player can only start playing when "READYTOPLAY".')
         player = old_player.copy(status=PLAYERSTATUSES['PLAYING'])
-        self.players[player_id] = player
+        self._set_player(player_id, player)
 
         # the game room's state doesn't need to be updated because
         # players are pre-emptively placed into roles in the game when
@@ -939,7 +1121,7 @@ class PlayerRouter(object):
         # set the player's status as inactive
         player = old_player.copy(
             status=PLAYERSTATUSES['INACTIVE'])
-        self.players[player_id] = player
+        self._set_player(player_id, player)
 
         # remove the player from the game room
         room_id = self.player_matches[player_id]
@@ -950,8 +1132,8 @@ class PlayerRouter(object):
             # nothing to do on the players game room so exit
             return
 
-        self.game_rooms[room_id] = \
-            self.game_rooms[room_id].remove_player(player)
+        self._set_game_room(
+            room_id, self.game_rooms[room_id].remove_player(player))
 
         # update the player's match
         self.player_matches[player_id] = None
@@ -977,7 +1159,7 @@ class PlayerRouter(object):
         # set the player's status as active
         player = self.players[player_id].copy(
             status=PLAYERSTATUSES['WAITING'])
-        self.players[player_id] = player
+        self._set_player(player_id, player)
 
         # match the player to a game room
         self._match_player_to_game_room(player_id)
@@ -997,4 +1179,180 @@ class PlayerRouter(object):
         room_id = self.player_matches[player_id]
         game_room = self.game_rooms[room_id]
 
-        self.game_rooms[room_id] = game_room.copy(game=game)
+        self._set_game_room(room_id, game_room.copy(game=game))
+
+    # garbage collection
+
+    def evict_idle_game_rooms(self, ttl):
+        """Evict the game rooms that haven't changed for ``ttl`` seconds.
+
+        Game rooms can be abandoned, e.g. when the last player in a game
+        room goes inactive, or a player never leaves a finished game.
+        Any players still in an evicted game room become inactive and
+        unmatched, as though they went inactive, so they can rejoin a
+        new game.
+
+        Game rooms where every player is waiting for a partner aren't
+        evicted, since they're only idle because no one else has
+        joined. Disconnected players are deleted when their disconnect
+        is handled, so the players left waiting are still connected.
+        These game rooms are checked again once another ``ttl`` seconds
+        pass.
+
+        Only the game rooms that are idle are looked at, except for
+        updating the game room priorities.
+
+        Parameters
+        ----------
+        ttl : float
+            How long a game room may go without changing before it's
+            evicted, in seconds.
+
+        Returns
+        -------
+        List[GameRoom]
+            The game rooms that were evicted.
+        """
+        deadline = self.clock() - ttl
+
+        evicted_game_rooms = []
+        waiting_room_ids = []
+        while (
+                len(self._activity_heap) > 0
+                and self._activity_heap[0][0] <= deadline
+        ):
+            last_active, room_id = heapq.heappop(self._activity_heap)
+            if self.last_active_from_room_id.get(room_id) != last_active:
+                # the entry is out of date
+                continue
+
+            game_room = self.game_rooms[room_id]
+            if len(game_room.player_ids) > 0 and all(
+                    self.players[player_id].status
+                    == PLAYERSTATUSES['WAITING']
+                    for player_id in game_room.player_ids):
+                waiting_room_ids.append(room_id)
+                continue
+
+            for player_id in game_room.player_ids:
+                self._set_player(player_id, self.players[player_id].copy(
+                    status=PLAYERSTATUSES['INACTIVE']))
+                self.player_matches[player_id] = None
+            self._delete_game_room(room_id)
+
+            evicted_game_rooms.append(game_room)
+
+        # touch the waiting game rooms after popping the idle ones, so
+        # they aren't popped again
+        for room_id in waiting_room_ids:
+            self._touch_game_room(room_id)
+
+        if len(evicted_game_rooms) > 0:
+            evicted_room_ids = {
+                game_room.room_id for game_room in evicted_game_rooms
+            }
+            self.game_room_priorities = [
+                [
+                    room_id
+                    for room_id in room_ids
+                    if room_id not in evicted_room_ids
+                ]
+                for room_ids in self.game_room_priorities
+            ]
+            self.num_evicted_game_rooms += len(evicted_game_rooms)
+
+            logger.warning(
+                f'Evicted {len(evicted_game_rooms)} game rooms idle for'
+                f' more than {ttl}s.')
+
+        return evicted_game_rooms
+
+    # queries
+
+    def count_game_rooms(self, state):
+        """Return the number of game rooms in ``state``.
+
+        Parameters
+        ----------
+        state : str
+            A game state from ``STATES``.
+
+        Returns
+        -------
+        int
+            The number of game rooms whose game is in ``state``.
+        """
+        return len(self.game_room_ids_by_state[state])
+
+    def list_game_rooms(self, state, offset=0, limit=None):
+        """Return a page of the game rooms in ``state``.
+
+        Only the IDs of game rooms in ``state`` up to the end of the
+        page are looked at, so the cost doesn't depend on how many game
+        rooms there are in other states.
+
+        Parameters
+        ----------
+        state : str
+            A game state from ``STATES``.
+        offset : int, optional (default=0)
+            The number of game rooms to skip.
+        limit : Optional[int], optional (default=None)
+            The most game rooms to return. If ``None``, return all of
+            the game rooms after ``offset``.
+
+        Returns
+        -------
+        List[GameRoom]
+            The game rooms, in the order they entered ``state``.
+        """
+        stop = offset + limit if limit is not None else None
+        return [
+            self.game_rooms[room_id]
+            for room_id in itertools.islice(
+                self.game_room_ids_by_state[state], offset, stop)
+        ]
+
+    def count_players(self, status):
+        """Return the number of players with ``status``.
+
+        Parameters
+        ----------
+        status : str
+            A player status from ``PLAYERSTATUSES``.
+
+        Returns
+        -------
+        int
+            The number of players with ``status``.
+        """
+        return len(self.player_ids_by_status[status])
+
+    def list_players(self, status, offset=0, limit=None):
+        """Return a page of the players with ``status``.
+
+        Only the IDs of players with ``status`` up to the end of the
+        page are looked at, so the cost doesn't depend on how many
+        players have other statuses.
+
+        Parameters
+        ----------
+        status : str
+            A player status from ``PLAYERSTATUSES``.
+        offset : int, optional (default=0)
+            The number of players to skip.
+        limit : Optional[int], optional (default=None)
+            The most players to return. If ``None``, return all of the
+            players after ``offset``.
+
+        Returns
+        -------
+        List[Player]
+            The players, in the order they took on ``status``.
+        """
+        stop = offset + limit if limit is not None else None
+        return [
+            self.players[player_id]
+            for player_id in itertools.islice(
+                self.player_ids_by_status[status], offset, stop)
+        ]
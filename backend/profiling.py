@@ -0,0 +1,140 @@
+"""Profiling the server while it runs.
+
+Both profilers wait for their measurements by calling a ``sleep``
+function, so the server can pass ``eventlet.sleep`` and keep handling
+requests while it's being profiled.
+"""
+
+import collections
+import linecache
+import logging
+import signal
+import tracemalloc
+
+
+logger = logging.getLogger(__name__)
+
+
+# constants
+
+# the number of frames to keep for each allocation when tracing memory
+TRACEMALLOC_NUM_FRAMES = 10
+
+
+# helper functions
+
+def _format_code(code):
+    """Return a frame's name in a collapsed stack for ``code``."""
+    return f'{code.co_name} ({code.co_filename}:{code.co_firstlineno})'
+
+
+# main functions
+
+def profile_stacks(seconds, interval, sleep):
+    """Sample the running stack and return it as collapsed stacks.
+
+    A ``SIGPROF`` timer interrupts the process every ``interval``
+    seconds of CPU time, and the signal handler records the stack of
+    whichever green thread is running. Green threads only run while
+    they hold the hub, so the samples show where all of them spend
+    their time. Idle time isn't sampled.
+
+    ``profile_stacks`` must be called from the main thread, since only
+    it can handle signals.
+
+    Parameters
+    ----------
+    seconds : float
+        How long to sample for.
+    interval : float
+        The CPU time between samples, in seconds.
+    sleep : Callable[[float], None]
+        The function to wait with.
+
+    Returns
+    -------
+    str
+        The samples in the collapsed stack format read by flamegraph.pl
+        and speedscope: one line per distinct stack, with its frames
+        from outermost to innermost separated by semicolons, then a
+        space and the number of samples.
+    """
+    counts = collections.Counter()
+
+    def sample(signum, frame):
+        codes = []
+        while frame is not None:
+            codes.append(frame.f_code)
+            frame = frame.f_back
+        counts[tuple(codes)] += 1
+
+    old_handler = signal.signal(signal.SIGPROF, sample)
+    signal.setitimer(signal.ITIMER_PROF, interval, interval)
+    try:
+        sleep(seconds)
+    finally:
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, old_handler)
+
+    logger.info(
+        f'Took {sum(counts.values())} samples of {len(counts)} distinct'
+        f' stacks.')
+
+    return ''.join(
+        ';'.join(_format_code(code) for code in reversed(codes))
+        + f' {count}\n'
+        for codes, count in counts.most_common())
+
+
+def profile_memory(seconds, limit, sleep):
+    """Return the allocations that grew over ``seconds``.
+
+    Take a ``tracemalloc`` snapshot, wait, then take another and compare
+    them, to find memory that's piling up, e.g. entries leaking from the
+    player router or the connection maps. Memory is only traced while
+    profiling, unless tracing was already on.
+
+    Parameters
+    ----------
+    seconds : float
+        How long to wait between the snapshots.
+    limit : int
+        The number of tracebacks to return, largest growth first.
+    sleep : Callable[[float], None]
+        The function to wait with.
+
+    Returns
+    -------
+    str
+        A report of the tracebacks whose allocated memory changed the
+        most, with the change in size and number of blocks for each.
+    """
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start(TRACEMALLOC_NUM_FRAMES)
+    try:
+        before = tracemalloc.take_snapshot()
+        sleep(seconds)
+        after = tracemalloc.take_snapshot()
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+
+    # ignore the memory used by the snapshots themselves
+    filters = [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, linecache.__file__)
+    ]
+    stats = after.filter_traces(filters).compare_to(
+        before.filter_traces(filters), 'traceback')
+
+    lines = []
+    for stat in stats[:limit]:
+        lines.append(
+            f'{stat.size_diff:+d} B ({stat.count_diff:+d} blocks),'
+            f' {stat.size} B ({stat.count} blocks) total')
+        lines.extend(
+            f'    {line}'
+            for line in stat.traceback.format())
+
+    return '\n'.join(lines) + '\n'
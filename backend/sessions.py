@@ -0,0 +1,242 @@
+"""A registry of the socket sessions connected to the server."""
+
+import collections
+import logging
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+# main classes
+
+class SessionRegistry(object):
+    """The connections between SIDs, worker IDs, and player IDs.
+
+    A turker (identified by their worker ID) plays as one player, but
+    may connect with several SIDs over time, e.g. when their connection
+    drops and they reconnect. Every update goes through a method which
+    keeps all of the maps consistent, and no method yields to other
+    green threads, so each update is atomic.
+
+    The maps are public for reading, like ``PlayerRouter``'s, but
+    should only be changed through the methods.
+    """
+
+    def __init__(self, new_player_id, clock=time.monotonic):
+        """Create a new instance.
+
+        Parameters
+        ----------
+        new_player_id : Callable[[], str]
+            A function returning a new player ID.
+        clock : Callable[[], float], optional (default=time.monotonic)
+            A function returning the current time in seconds, for
+            recording when SIDs disconnect.
+
+        Returns
+        -------
+        SessionRegistry
+            The new instance.
+        """
+        self.new_player_id = new_player_id
+        self.clock = clock
+
+        self.player_id_from_worker_id = {}
+        self.worker_id_from_sid = {}
+        self.most_recent_sid_from_worker_id = {}
+        # the SIDs for each worker, as a dictionary used as a set
+        self.sids_from_worker_id = {}
+        # when each SID that's still registered disconnected, in order
+        self.disconnected_at_from_sid = collections.OrderedDict()
+        # when each worker that still has a player ID lost their last
+        # SID to another worker, in order
+        self.orphaned_at_from_worker_id = collections.OrderedDict()
+
+        self.num_evicted_sids = 0
+        self.num_evicted_workers = 0
+
+    def connect(self, sid, worker_id):
+        """Register ``sid`` as a connection from ``worker_id``.
+
+        The worker is assigned a player ID the first time they connect,
+        and keeps it when they reconnect.
+
+        Parameters
+        ----------
+        sid : str
+            The SID of the connection.
+        worker_id : str
+            The turker's worker ID.
+
+        Returns
+        -------
+        str
+            The worker's player ID.
+        """
+        if (
+                worker_id not in self.most_recent_sid_from_worker_id
+                and worker_id not in self.player_id_from_worker_id
+        ):
+            # initial connection
+            logger.info(
+                f'Player {worker_id} connecting to server with SID {sid}.')
+            player_id = self.new_player_id()
+            logger.info(
+                f'Assigning {worker_id} player ID {player_id}.')
+            self.player_id_from_worker_id[worker_id] = player_id
+        elif (
+                worker_id in self.most_recent_sid_from_worker_id
+                and worker_id in self.player_id_from_worker_id
+        ):
+            # reconnection
+            old_sid = self.most_recent_sid_from_worker_id[worker_id]
+            logger.info(
+                f'Turker {worker_id} reconnecting to server.'
+                f' Updating SID from {old_sid} to {sid}.')
+        elif worker_id in self.orphaned_at_from_worker_id:
+            # reconnection after another worker claimed the last SID
+            logger.info(
+                f'Turker {worker_id} reconnecting to server with SID'
+                f' {sid}.')
+        else:
+            logger.error(
+                f'{worker_id} has a connection ({sid}) in an unexpected'
+                f' state. Attempting to recover.')
+            # provide the turker a new player id to try and recover
+            player_id = self.new_player_id()
+            logger.info(
+                f'Assigning {worker_id} player ID {player_id}.')
+            self.player_id_from_worker_id[worker_id] = player_id
+
+        # a SID belongs to one worker, so drop any old owner's claim
+        old_worker_id = self.worker_id_from_sid.get(sid)
+        if old_worker_id is not None and old_worker_id != worker_id:
+            self.remove_sid(sid)
+
+        self.orphaned_at_from_worker_id.pop(worker_id, None)
+        self.worker_id_from_sid[sid] = worker_id
+        self.most_recent_sid_from_worker_id[worker_id] = sid
+        self.sids_from_worker_id.setdefault(worker_id, {})[sid] = None
+
+        return self.player_id_from_worker_id[worker_id]
+
+    def disconnect(self, sid):
+        """Record that ``sid`` disconnected.
+
+        The SID stays registered, so that the disconnection can be
+        handled later, but it's evicted by ``sweep`` if that doesn't
+        happen.
+
+        Parameters
+        ----------
+        sid : str
+            The SID that disconnected.
+        """
+        if sid in self.worker_id_from_sid:
+            # keep the SIDs in the order they disconnected
+            self.disconnected_at_from_sid.pop(sid, None)
+            self.disconnected_at_from_sid[sid] = self.clock()
+
+    def remove_sid(self, sid):
+        """Remove ``sid``, leaving the rest of its worker's connections.
+
+        If ``sid`` was the worker's last SID, then the worker keeps their
+        player ID, so they can reconnect, but ``sweep`` evicts them if
+        they don't.
+
+        Parameters
+        ----------
+        sid : str
+            The SID to remove.
+        """
+        self.disconnected_at_from_sid.pop(sid, None)
+
+        worker_id = self.worker_id_from_sid.pop(sid, None)
+        if worker_id is None:
+            return
+
+        sids = self.sids_from_worker_id.get(worker_id, {})
+        sids.pop(sid, None)
+        if self.most_recent_sid_from_worker_id.get(worker_id) == sid:
+            del self.most_recent_sid_from_worker_id[worker_id]
+        if len(sids) == 0:
+            self.sids_from_worker_id.pop(worker_id, None)
+            if worker_id in self.player_id_from_worker_id:
+                self.orphaned_at_from_worker_id[worker_id] = self.clock()
+
+    def remove_worker(self, worker_id):
+        """Remove ``worker_id``, their player ID, and all of their SIDs.
+
+        Parameters
+        ----------
+        worker_id : str
+            The worker ID to remove.
+        """
+        for sid in self.sids_from_worker_id.pop(worker_id, {}):
+            self.worker_id_from_sid.pop(sid, None)
+            self.disconnected_at_from_sid.pop(sid, None)
+
+        self.most_recent_sid_from_worker_id.pop(worker_id, None)
+        self.player_id_from_worker_id.pop(worker_id, None)
+        self.orphaned_at_from_worker_id.pop(worker_id, None)
+
+    def sweep(self, ttl):
+        """Evict SIDs that disconnected more than ``ttl`` seconds ago.
+
+        Disconnections are normally handled a short time after they
+        happen, which removes the SIDs, so any SIDs that are left have
+        been orphaned. If an orphaned SID is its worker's most recent
+        connection, then the worker is evicted, too. Workers who lost
+        their last SID to another worker more than ``ttl`` seconds ago
+        are also evicted. Only the SIDs and workers that are evicted are
+        looked at.
+
+        Parameters
+        ----------
+        ttl : float
+            How long a disconnected SID may stay registered, in seconds.
+
+        Returns
+        -------
+        List[Tuple[str, str]]
+            The worker ID and player ID of each worker evicted.
+        """
+        evicted_workers = []
+
+        deadline = self.clock() - ttl
+        while len(self.disconnected_at_from_sid) > 0:
+            sid, disconnected_at = next(
+                iter(self.disconnected_at_from_sid.items()))
+            if disconnected_at > deadline:
+                break
+
+            worker_id = self.worker_id_from_sid.get(sid)
+            self.num_evicted_sids += 1
+            if self.most_recent_sid_from_worker_id.get(worker_id) == sid:
+                evicted_workers.append(
+                    (worker_id, self.player_id_from_worker_id.get(worker_id)))
+                self.num_evicted_sids += len(
+                    self.sids_from_worker_id.get(worker_id, {})) - 1
+                self.num_evicted_workers += 1
+                self.remove_worker(worker_id)
+            else:
+                self.remove_sid(sid)
+
+        while len(self.orphaned_at_from_worker_id) > 0:
+            worker_id, orphaned_at = next(
+                iter(self.orphaned_at_from_worker_id.items()))
+            if orphaned_at > deadline:
+                break
+
+            evicted_workers.append(
+                (worker_id, self.player_id_from_worker_id.get(worker_id)))
+            self.num_evicted_workers += 1
+            self.remove_worker(worker_id)
+
+        if len(evicted_workers) > 0:
+            logger.warning(
+                f'Evicted {len(evicted_workers)} orphaned workers from the'
+                f' session registry.')
+
+        return evicted_workers
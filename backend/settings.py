@@ -63,3 +63,32 @@ TIME_TO_RECONNECT = 30
 
 # a text file containing the subjects with which to seed games
 SUBJECTS_FILE_PATH = os.path.join(BACKEND_DIR, 'subjects.txt')
+
+# the environment variable holding the token for the admin endpoints.
+# If it's unset, the admin endpoints are disabled.
+ADMIN_TOKEN_ENV_VAR = 'TWENTYQUESTIONS_ADMIN_TOKEN'
+
+# the longest a profile can be requested for, in seconds
+MAX_PROFILE_SECONDS = 300
+
+# the largest page size and offset for the admin listing endpoints
+MAX_PAGE_LIMIT = 1000
+MAX_PAGE_OFFSET = 10 ** 6
+
+# how long in seconds a socket handler may run, or a green thread may
+# hold the eventlet hub, before it's logged as slow
+BLOCKING_THRESHOLD = 0.1
+
+# how long in seconds a disconnected session may stay registered
+# without being handled before it's evicted
+SESSION_TTL = 10 * TIME_TO_RECONNECT
+
+# how long in seconds a game room may go without changing before it's
+# considered abandoned and evicted. Any players left in an evicted game
+# room are set inactive. Game rooms where every player is waiting for
+# a partner are kept.
+GAME_ROOM_TTL = 30 * 60
+
+# how often in seconds to sweep for orphaned sessions and abandoned
+# game rooms
+SWEEP_INTERVAL = 60
@@ -1308,3 +1308,223 @@ class PlayerRouterTestCase(unittest.TestCase):
         self.assertEqual(
             player_router.game_room_priorities,
             [[], [baz_room_id, foo_bar_room_id]])
+
+    def test_indexes(self):
+        """Test that the indexes by state and status stay up to date."""
+
+        def assert_indexes_match(player_router):
+            for state in models.STATES.values():
+                self.assertEqual(
+                    set(player_router.game_room_ids_by_state[state]),
+                    {
+                        room_id
+                        for room_id, game_room
+                        in player_router.game_rooms.items()
+                        if game_room.game.state == state
+                    })
+            for status in models.PLAYERSTATUSES.values():
+                self.assertEqual(
+                    set(player_router.player_ids_by_status[status]),
+                    {
+                        player_id
+                        for player_id, player
+                        in player_router.players.items()
+                        if player.status == status
+                    })
+
+        player_router = models.PlayerRouter(
+            game_rooms={},
+            players={},
+            game_room_priorities=[],
+            player_matches={})
+        assert_indexes_match(player_router)
+
+        # move some players through each transition
+
+        for player_id in ['foo', 'bar', 'baz']:
+            player_router.create_player(player_id)
+            assert_indexes_match(player_router)
+            player_router.finish_reading_instructions(player_id)
+            assert_indexes_match(player_router)
+
+        player_router.start_playing('foo')
+        assert_indexes_match(player_router)
+
+        foo_bar_room_id = player_router.player_matches['foo']
+        player_router.update_game(
+            'foo',
+            player_router.game_rooms[foo_bar_room_id].game.copy(
+                state=models.STATES['SUBMITRESULTS']))
+        assert_indexes_match(player_router)
+
+        player_router.go_inactive('baz')
+        assert_indexes_match(player_router)
+        player_router.go_active('baz')
+        assert_indexes_match(player_router)
+
+        player_router.finish_game('foo')
+        assert_indexes_match(player_router)
+        player_router.delete_player('bar')
+        assert_indexes_match(player_router)
+        self.assertNotIn(foo_bar_room_id, player_router.game_rooms)
+
+        # check that a router created from existing state is indexed
+
+        assert_indexes_match(models.PlayerRouter(
+            game_rooms=player_router.game_rooms,
+            players=player_router.players,
+            game_room_priorities=player_router.game_room_priorities,
+            player_matches=player_router.player_matches))
+
+    def test_count_and_list(self):
+        """Test counting and listing game rooms and players."""
+
+        player_router = models.PlayerRouter(
+            game_rooms={},
+            players={},
+            game_room_priorities=[],
+            player_matches={})
+        for player_id in ['foo', 'bar', 'baz', 'qux', 'quux']:
+            player_router.create_player(player_id)
+            player_router.finish_reading_instructions(player_id)
+
+        self.assertEqual(
+            player_router.count_players(models.PLAYERSTATUSES['READYTOPLAY']),
+            4)
+        self.assertEqual(
+            player_router.count_players(models.PLAYERSTATUSES['WAITING']),
+            1)
+        self.assertEqual(
+            player_router.count_game_rooms(models.STATES['ASKQUESTION']),
+            3)
+        self.assertEqual(
+            player_router.count_game_rooms(models.STATES['MAKEGUESS']),
+            0)
+
+        # check that the listings are paginated in order
+        ready_players = player_router.list_players(
+            models.PLAYERSTATUSES['READYTOPLAY'])
+        self.assertEqual(
+            {player.player_id for player in ready_players},
+            {'foo', 'bar', 'baz', 'qux'})
+        self.assertEqual(
+            player_router.list_players(
+                models.PLAYERSTATUSES['READYTOPLAY'],
+                offset=1,
+                limit=2),
+            ready_players[1:3])
+        self.assertEqual(
+            player_router.list_players(
+                models.PLAYERSTATUSES['READYTOPLAY'],
+                offset=3,
+                limit=2),
+            ready_players[3:])
+        self.assertEqual(
+            player_router.list_game_rooms(
+                models.STATES['ASKQUESTION'], offset=1, limit=1),
+            player_router.list_game_rooms(
+                models.STATES['ASKQUESTION'])[1:2])
+        self.assertEqual(
+            player_router.list_game_rooms(models.STATES['MAKEGUESS']),
+            [])
+
+    def test_evict_idle_game_rooms(self):
+        """Test evicting game rooms that have been idle past a TTL."""
+        now = [0]
+
+        player_router = models.PlayerRouter(
+            game_rooms={},
+            players={},
+            game_room_priorities=[],
+            player_matches={},
+            clock=lambda: now[0])
+        for player_id in ['foo', 'bar', 'baz']:
+            player_router.create_player(player_id)
+            player_router.finish_reading_instructions(player_id)
+
+        foo_bar_room_id = player_router.player_matches['foo']
+        baz_room_id = player_router.player_matches['baz']
+
+        # check that changing a game room keeps it from being evicted,
+        # and that game rooms with only waiting players are kept
+
+        now[0] = 100
+        player_router.update_game(
+            'foo',
+            player_router.game_rooms[foo_bar_room_id].game.copy(
+                state=models.STATES['SUBMITRESULTS']))
+
+        now[0] = 200
+        self.assertEqual(player_router.evict_idle_game_rooms(ttl=150), [])
+        self.assertEqual(player_router.num_evicted_game_rooms, 0)
+        self.assertIn(baz_room_id, player_router.game_rooms)
+        self.assertEqual(
+            player_router.players['baz'].status,
+            models.PLAYERSTATUSES['WAITING'])
+
+        # check that the players left in a finished game are released
+
+        now[0] = 220
+        player_router.go_inactive('baz')
+
+        now[0] = 300
+        evicted_game_rooms = player_router.evict_idle_game_rooms(ttl=150)
+        self.assertEqual(
+            [game_room.room_id for game_room in evicted_game_rooms],
+            [foo_bar_room_id])
+        self.assertEqual(player_router.num_evicted_game_rooms, 1)
+        self.assertEqual(set(player_router.game_rooms), {baz_room_id})
+        for player_id in ['foo', 'bar']:
+            self.assertEqual(
+                player_router.players[player_id].status,
+                models.PLAYERSTATUSES['INACTIVE'])
+            self.assertIsNone(player_router.player_matches[player_id])
+        self.assertEqual(
+            player_router.count_game_rooms(models.STATES['SUBMITRESULTS']),
+            0)
+
+        # check that an empty game room is evicted
+
+        now[0] = 400
+        evicted_game_rooms = player_router.evict_idle_game_rooms(ttl=150)
+        self.assertEqual(
+            [game_room.room_id for game_room in evicted_game_rooms],
+            [baz_room_id])
+        self.assertEqual(player_router.num_evicted_game_rooms, 2)
+        self.assertEqual(player_router.game_rooms, {})
+        self.assertEqual(player_router.last_active_from_room_id, {})
+        self.assertEqual(sum(player_router.game_room_priorities, []), [])
+        self.assertEqual(
+            player_router.count_game_rooms(models.STATES['ASKQUESTION']),
+            0)
+        self.assertEqual(
+            player_router.count_players(models.PLAYERSTATUSES['INACTIVE']),
+            3)
+
+        # check that evicted players can rejoin a game
+
+        player_router.go_active('foo')
+        player_router.go_active('bar')
+        room_id = player_router.player_matches['foo']
+        self.assertEqual(player_router.player_matches['bar'], room_id)
+
+        # check that a game room changed many times is only evicted
+        # once it's idle, and the out of date activity is compacted
+
+        for _ in range(1000):
+            now[0] += 1
+            player_router.update_game(
+                'foo', player_router.game_rooms[room_id].game.copy())
+            self.assertEqual(
+                player_router.evict_idle_game_rooms(ttl=150), [])
+
+        self.assertLessEqual(
+            len(player_router._activity_heap),
+            2 * len(player_router.game_rooms)
+            + models.ACTIVITY_HEAP_SLACK)
+
+        now[0] += 150
+        evicted_game_rooms = player_router.evict_idle_game_rooms(ttl=150)
+        self.assertEqual(
+            [game_room.room_id for game_room in evicted_game_rooms],
+            [room_id])
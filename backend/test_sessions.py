@@ -0,0 +1,193 @@
+"""Test sessions."""
+
+import itertools
+import unittest
+
+from . import sessions
+
+
+class SessionRegistryTestCase(unittest.TestCase):
+    """Test the ``SessionRegistry`` class."""
+
+    def setUp(self):
+        self.now = 0
+        player_ids = (f'player-{i}' for i in itertools.count())
+        self.session_registry = sessions.SessionRegistry(
+            new_player_id=lambda: next(player_ids),
+            clock=lambda: self.now)
+
+    def assert_maps_equal(
+            self,
+            player_id_from_worker_id,
+            worker_id_from_sid,
+            most_recent_sid_from_worker_id):
+        """Assert the registry's maps equal the ones given.
+
+        ``sids_from_worker_id`` is checked against
+        ``worker_id_from_sid``.
+        """
+        session_registry = self.session_registry
+        self.assertEqual(
+            session_registry.player_id_from_worker_id,
+            player_id_from_worker_id)
+        self.assertEqual(
+            session_registry.worker_id_from_sid,
+            worker_id_from_sid)
+        self.assertEqual(
+            session_registry.most_recent_sid_from_worker_id,
+            most_recent_sid_from_worker_id)
+
+        sids_from_worker_id = {}
+        for sid, worker_id in worker_id_from_sid.items():
+            sids_from_worker_id.setdefault(worker_id, set()).add(sid)
+        self.assertEqual(
+            {
+                worker_id: set(sids)
+                for worker_id, sids
+                in session_registry.sids_from_worker_id.items()
+            },
+            sids_from_worker_id)
+
+    def test_connect(self):
+        """Test ``connect``."""
+        self.assertEqual(
+            self.session_registry.connect(sid='sid-a', worker_id='foo'),
+            'player-0')
+        self.assertEqual(
+            self.session_registry.connect(sid='sid-b', worker_id='bar'),
+            'player-1')
+        self.assert_maps_equal(
+            player_id_from_worker_id={'foo': 'player-0', 'bar': 'player-1'},
+            worker_id_from_sid={'sid-a': 'foo', 'sid-b': 'bar'},
+            most_recent_sid_from_worker_id={'foo': 'sid-a', 'bar': 'sid-b'})
+
+        # check that reconnecting keeps the player ID
+        self.assertEqual(
+            self.session_registry.connect(sid='sid-c', worker_id='foo'),
+            'player-0')
+        self.assert_maps_equal(
+            player_id_from_worker_id={'foo': 'player-0', 'bar': 'player-1'},
+            worker_id_from_sid={
+                'sid-a': 'foo',
+                'sid-b': 'bar',
+                'sid-c': 'foo'
+            },
+            most_recent_sid_from_worker_id={'foo': 'sid-c', 'bar': 'sid-b'})
+
+        # check that a worker whose last SID is claimed by another
+        # worker is orphaned, but keeps their player ID
+        self.assertEqual(
+            self.session_registry.connect(sid='sid-b', worker_id='baz'),
+            'player-2')
+        self.assert_maps_equal(
+            player_id_from_worker_id={
+                'foo': 'player-0',
+                'bar': 'player-1',
+                'baz': 'player-2'
+            },
+            worker_id_from_sid={
+                'sid-a': 'foo',
+                'sid-b': 'baz',
+                'sid-c': 'foo'
+            },
+            most_recent_sid_from_worker_id={'foo': 'sid-c', 'baz': 'sid-b'})
+        self.assertEqual(
+            list(self.session_registry.orphaned_at_from_worker_id),
+            ['bar'])
+
+        self.assertEqual(
+            self.session_registry.connect(sid='sid-d', worker_id='bar'),
+            'player-1')
+        self.assertEqual(
+            self.session_registry.orphaned_at_from_worker_id, {})
+
+    def test_remove_sid(self):
+        """Test ``remove_sid``."""
+        self.session_registry.connect(sid='sid-a', worker_id='foo')
+        self.session_registry.connect(sid='sid-b', worker_id='foo')
+        self.session_registry.disconnect('sid-a')
+
+        self.session_registry.remove_sid('sid-a')
+        self.assert_maps_equal(
+            player_id_from_worker_id={'foo': 'player-0'},
+            worker_id_from_sid={'sid-b': 'foo'},
+            most_recent_sid_from_worker_id={'foo': 'sid-b'})
+        self.assertEqual(self.session_registry.disconnected_at_from_sid, {})
+
+        # removing an unknown SID does nothing
+        self.session_registry.remove_sid('sid-c')
+        self.assert_maps_equal(
+            player_id_from_worker_id={'foo': 'player-0'},
+            worker_id_from_sid={'sid-b': 'foo'},
+            most_recent_sid_from_worker_id={'foo': 'sid-b'})
+
+    def test_remove_worker(self):
+        """Test ``remove_worker``."""
+        self.session_registry.connect(sid='sid-a', worker_id='foo')
+        self.session_registry.connect(sid='sid-b', worker_id='foo')
+        self.session_registry.connect(sid='sid-c', worker_id='bar')
+        self.session_registry.disconnect('sid-a')
+
+        self.session_registry.remove_worker('foo')
+        self.assert_maps_equal(
+            player_id_from_worker_id={'bar': 'player-1'},
+            worker_id_from_sid={'sid-c': 'bar'},
+            most_recent_sid_from_worker_id={'bar': 'sid-c'})
+        self.assertEqual(self.session_registry.disconnected_at_from_sid, {})
+
+    def test_sweep(self):
+        """Test ``sweep``."""
+        # foo has an old SID and a current one, and bar has one SID
+        self.session_registry.connect(sid='sid-a', worker_id='foo')
+        self.session_registry.connect(sid='sid-b', worker_id='foo')
+        self.session_registry.connect(sid='sid-c', worker_id='bar')
+
+        self.now = 10
+        self.session_registry.disconnect('sid-a')
+        self.now = 20
+        self.session_registry.disconnect('sid-c')
+
+        # nothing has disconnected for long enough yet
+        self.now = 25
+        self.assertEqual(self.session_registry.sweep(ttl=20), [])
+
+        # only foo's old SID is evicted, since foo is still connected
+        self.now = 35
+        self.assertEqual(self.session_registry.sweep(ttl=20), [])
+        self.assert_maps_equal(
+            player_id_from_worker_id={'foo': 'player-0', 'bar': 'player-1'},
+            worker_id_from_sid={'sid-b': 'foo', 'sid-c': 'bar'},
+            most_recent_sid_from_worker_id={'foo': 'sid-b', 'bar': 'sid-c'})
+        self.assertEqual(self.session_registry.num_evicted_sids, 1)
+        self.assertEqual(self.session_registry.num_evicted_workers, 0)
+
+        # bar's most recent SID is evicted, so bar is too
+        self.now = 45
+        self.assertEqual(
+            self.session_registry.sweep(ttl=20),
+            [('bar', 'player-1')])
+        self.assert_maps_equal(
+            player_id_from_worker_id={'foo': 'player-0'},
+            worker_id_from_sid={'sid-b': 'foo'},
+            most_recent_sid_from_worker_id={'foo': 'sid-b'})
+        self.assertEqual(self.session_registry.num_evicted_sids, 2)
+        self.assertEqual(self.session_registry.num_evicted_workers, 1)
+
+        # check that workers whose last SID was claimed are evicted
+        self.session_registry.connect(sid='sid-b', worker_id='baz')
+
+        self.now = 60
+        self.assertEqual(self.session_registry.sweep(ttl=20), [])
+
+        self.now = 70
+        self.assertEqual(
+            self.session_registry.sweep(ttl=20),
+            [('foo', 'player-0')])
+        self.assert_maps_equal(
+            player_id_from_worker_id={'baz': 'player-2'},
+            worker_id_from_sid={'sid-b': 'baz'},
+            most_recent_sid_from_worker_id={'baz': 'sid-b'})
+        self.assertEqual(
+            self.session_registry.orphaned_at_from_worker_id, {})
+        self.assertEqual(self.session_registry.num_evicted_sids, 2)
+        self.assertEqual(self.session_registry.num_evicted_workers, 2)
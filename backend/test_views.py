@@ -0,0 +1,116 @@
+"""Test views."""
+
+import json
+import os
+import unittest
+from unittest import mock
+
+from . import app
+from . import models
+from . import settings
+from . import views
+
+
+class AdminListingTestCase(unittest.TestCase):
+    """Test the admin endpoints for listing game rooms and players."""
+
+    def setUp(self):
+        views.reset(seed=0)
+        for player_id in ['foo', 'bar', 'baz']:
+            views.player_router.create_player(player_id)
+            views.player_router.finish_reading_instructions(player_id)
+
+        self.client = app.create_app().test_client()
+
+        environ = mock.patch.dict(
+            os.environ, {settings.ADMIN_TOKEN_ENV_VAR: 'token'})
+        environ.start()
+        self.addCleanup(environ.stop)
+
+    def get(self, path):
+        """Return the response to an authorized GET request for ``path``."""
+        return self.client.get(
+            path, headers={'Authorization': 'Bearer token'})
+
+    def test_list_players(self):
+        """Test ``/admin/players``."""
+        response = self.get('/admin/players?status=READYTOPLAY')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {
+                player['playerId']
+                for player in json.loads(
+                    response.get_data(as_text=True))['items']
+            },
+            {'foo', 'bar'})
+
+        response = self.get('/admin/players?status=READYTOPLAY&offset=1')
+        page = json.loads(response.get_data(as_text=True))
+        self.assertEqual(page['count'], 2)
+        self.assertEqual(page['offset'], 1)
+        self.assertEqual(len(page['items']), 1)
+
+        response = self.client.get('/admin/players?status=WAITING')
+        self.assertEqual(response.status_code, 401)
+
+    def test_list_game_rooms(self):
+        """Test ``/admin/game-rooms``."""
+        response = self.get(
+            f'/admin/game-rooms?state={models.STATES["ASKQUESTION"]}'
+            f'&limit=1')
+        self.assertEqual(response.status_code, 200)
+        page = json.loads(response.get_data(as_text=True))
+        self.assertEqual(page['count'], 2)
+        self.assertEqual(len(page['items']), 1)
+
+    def test_list_with_bad_page_arguments(self):
+        """Test the listing endpoints with bad offsets and limits."""
+        for query in [
+                'offset=inf',
+                'offset=nan',
+                'offset=1e300',
+                f'offset={settings.MAX_PAGE_OFFSET + 1}',
+                'offset=-1',
+                'offset=foo',
+                'limit=2.5',
+                'limit=0',
+                f'limit={settings.MAX_PAGE_LIMIT + 1}'
+        ]:
+            for path in [
+                    '/admin/players?status=WAITING',
+                    '/admin/game-rooms?state=ASKQUESTION'
+            ]:
+                response = self.get(f'{path}&{query}')
+                self.assertEqual(response.status_code, 400, query)
+
+
+class HandleDisconnectTestCase(unittest.TestCase):
+    """Test the ``handle_disconnect`` function."""
+
+    def setUp(self):
+        views.reset(seed=0)
+
+    def test_handle_disconnect(self):
+        """Test ``handle_disconnect``."""
+        session_registry = views.session_registry
+        player_id = session_registry.connect(sid='sid-a', worker_id='foo')
+        session_registry.connect(sid='sid-b', worker_id='foo')
+        self.assertNotIn(player_id, views.player_router.player_matches)
+
+        # check that an unmatched worker's old SID disconnecting leaves
+        # their newer SID and their player ID
+        views.handle_disconnect('sid-a')
+        self.assertEqual(session_registry.worker_id_from_sid, {'sid-b': 'foo'})
+        self.assertEqual(
+            session_registry.most_recent_sid_from_worker_id,
+            {'foo': 'sid-b'})
+        self.assertEqual(
+            session_registry.player_id_from_worker_id,
+            {'foo': player_id})
+
+        # check that the worker is removed with their last SID
+        views.handle_disconnect('sid-b')
+        self.assertEqual(session_registry.worker_id_from_sid, {})
+        self.assertEqual(session_registry.sids_from_worker_id, {})
+        self.assertEqual(session_registry.player_id_from_worker_id, {})
+        self.assertEqual(session_registry.orphaned_at_from_worker_id, {})
@@ -0,0 +1,167 @@
+"""Traces of the socket events received by the server.
+
+A trace is a JSON Lines file (gzipped if its path ends in ``.gz``). The
+first line is a header object holding the format ``version`` and the
+``seed`` for the server's IDs and subjects (see ``models.seed``). Each
+following line is an inbound event, stored compactly as a list::
+
+    [seconds since the recording started, SID, event name, payload]
+
+When the recording stops, a final object holding the ``digest`` of the
+server's state and the ``numEvents`` recorded is appended, so replays
+of the trace can check that they reproduced the same state.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+# constants
+
+VERSION = 1
+
+# the separators for writing compact JSON
+SEPARATORS = (',', ':')
+
+
+# helper functions
+
+def _open_trace(trace_path, mode):
+    """Open ``trace_path`` as text, decompressing it if necessary."""
+    if trace_path.endswith('.gz'):
+        return gzip.open(trace_path, mode + 't', encoding='utf-8')
+    else:
+        return open(trace_path, mode)
+
+
+# main functions
+
+def iter_trace(trace_path):
+    """Yield the records in the trace at ``trace_path``.
+
+    Parameters
+    ----------
+    trace_path : str
+        The path to the trace.
+
+    Yields
+    ------
+    Union[Dict[str, Any], List[Any]]
+        The header, then each event as a list of its time, SID, event
+        name, and payload, then the final digest, if the recording was
+        stopped cleanly.
+    """
+    with _open_trace(trace_path, 'r') as trace_file:
+        for ln in trace_file:
+            yield json.loads(ln)
+
+
+def digest_state(player_router, player_id_from_worker_id):
+    """Return a digest of the server's state.
+
+    Parameters
+    ----------
+    player_router : PlayerRouter
+        The server's player router.
+    player_id_from_worker_id : Dict[str, str]
+        The server's map from worker IDs to player IDs.
+
+    Returns
+    -------
+    str
+        The hex digest of the state.
+    """
+    state = {
+        'players': {
+            player_id: player.to_dict()
+            for player_id, player in player_router.players.items()
+        },
+        'gameRooms': {
+            room_id: game_room.to_dict()
+            for room_id, game_room in player_router.game_rooms.items()
+        },
+        'gameRoomPriorities': player_router.game_room_priorities,
+        'playerMatches': player_router.player_matches,
+        'playerIdFromWorkerId': player_id_from_worker_id
+    }
+
+    return hashlib.sha256(
+        json.dumps(state, sort_keys=True, separators=SEPARATORS)
+        .encode('utf-8')
+    ).hexdigest()
+
+
+# main classes
+
+class TraceRecorder(object):
+    """Record the socket events received by the server to a trace."""
+
+    def __init__(self, trace_path, seed):
+        """Create a new instance.
+
+        Parameters
+        ----------
+        trace_path : str
+            The path to write the trace to. Any existing file is
+            overwritten.
+        seed : int
+            The seed for the server's IDs and subjects.
+
+        Returns
+        -------
+        TraceRecorder
+            The new instance.
+        """
+        self.trace_path = trace_path
+        self.seed = seed
+
+        self.num_events = 0
+
+        self._start = time.monotonic()
+        self._trace_file = _open_trace(trace_path, 'w')
+        self._write({'version': VERSION, 'seed': seed})
+
+    def _write(self, record):
+        """Write ``record`` as a line of the trace."""
+        self._trace_file.write(
+            json.dumps(record, separators=SEPARATORS) + '\n')
+
+    def record(self, sid, event, payload):
+        """Record an event.
+
+        Parameters
+        ----------
+        sid : str
+            The SID the event came from.
+        event : str
+            The name of the event.
+        payload : Any
+            The event's message. It must be JSON serializable.
+        """
+        self._write([
+            round(time.monotonic() - self._start, 6),
+            sid,
+            event,
+            payload
+        ])
+        self.num_events += 1
+
+    def close(self, digest):
+        """Finish the trace with the final state's digest and close it.
+
+        Parameters
+        ----------
+        digest : str
+            The digest of the server's state, from ``digest_state``.
+        """
+        self._write({'digest': digest, 'numEvents': self.num_events})
+        self._trace_file.close()
+
+        logger.info(
+            f'Recorded {self.num_events} events to {self.trace_path}.')
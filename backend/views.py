@@ -1,14 +1,28 @@
 """Views for the backend."""
 
+import atexit
+import functools
+import hmac
+import inspect
+import json
 import logging
-import uuid
+import os
+import random
+import resource
+import time
 
 import flask
 import flask_socketio
 import eventlet
+from eventlet import hubs
 
+from . import blocking
+from . import metrics
 from . import models
+from . import profiling
+from . import sessions
 from . import settings
+from . import tracing
 
 
 logger = logging.getLogger(__name__)
@@ -20,18 +34,22 @@ twentyquestions = flask.Blueprint(
     template_folder='templates',
     static_folder='static')
 
+bytes_sent = metrics.Counter(
+    'twentyquestions_socket_sent_bytes_total',
+    'Bytes of socket.io packets encoded for sending to clients.')
+
 socketio = flask_socketio.SocketIO(
     ping_timeout=settings.TIME_TO_DISCONNECT,
-    ping_interval=settings.TIME_TO_DISCONNECT // 5)
+    ping_interval=settings.TIME_TO_DISCONNECT // 5,
+    # count the bytes sent as the packets are encoded
+    json=metrics.CountingJSON(bytes_sent))
 
 
 # constants / global state
 
 # maps between worker IDs, session IDs, and player IDs
 # these maps are necessary for handling connection events
-player_id_from_worker_id = {}
-worker_id_from_sid = {}
-most_recent_sid_from_worker_id = {}
+session_registry = sessions.SessionRegistry(new_player_id=models.new_id)
 
 player_router = models.PlayerRouter(
     game_rooms={},
@@ -39,9 +57,450 @@ player_router = models.PlayerRouter(
     game_room_priorities=[],
     player_matches={})
 
+# records the inbound socket events when tracing is on
+recorder = None
+
+# when each player waiting to be matched to a game started waiting
+waiting_since_from_player_id = {}
+
+# the profiler can only run one profile at a time
+profiling_lock = eventlet.semaphore.Semaphore()
+
+# how long a socket handler may run before it's logged as slow
+slow_handler_threshold = settings.BLOCKING_THRESHOLD
+
+# maps the code of each socket handler to the name of its event
+event_from_code = {}
+
+# detects green threads blocking the hub, once it's started
+blocking_detector = None
+
+
+# metrics
+
+handler_latency = metrics.Histogram(
+    'twentyquestions_handler_latency_seconds',
+    'Time spent handling socket events.',
+    label_name='event')
+
+emits = metrics.Counter(
+    'twentyquestions_emits_total',
+    'Socket events emitted to clients.',
+    label_name='event')
+
+slow_handlers = metrics.Counter(
+    'twentyquestions_slow_handlers_total',
+    'Socket handlers that ran for longer than the blocking threshold.',
+    label_name='event')
+
+hub_blocks = metrics.Counter(
+    'twentyquestions_hub_blocks_total',
+    'Times a green thread held the eventlet hub for longer than the'
+    ' blocking threshold.',
+    label_name='event')
+
+time_to_match = metrics.Histogram(
+    'twentyquestions_time_to_match_seconds',
+    'Time players spend waiting to be matched to a game.',
+    buckets=(1, 5, 10, 30, 60, 120, 300, 600, 1200, 1800, 3600))
+
+
+def _num_game_rooms_by_state():
+    """Return the number of game rooms in each game state."""
+    return {
+        state: player_router.count_game_rooms(state)
+        for state in models.STATES.values()
+    }
+
+
+def _num_players_by_status():
+    """Return the number of players with each status."""
+    return {
+        status: player_router.count_players(status)
+        for status in models.PLAYERSTATUSES.values()
+    }
+
+
+def _num_green_threads():
+    """Return the approximate number of green threads."""
+    # every green thread that isn't running is either sleeping on a
+    # timer or waiting on a file descriptor in the hub, except for
+    # those blocked on another green thread (e.g., an Event)
+    hub = hubs.get_hub()
+    return (
+        len(hub.timers)
+        + len(hub.next_timers)
+        + sum(len(listeners) for listeners in hub.listeners.values())
+    )
+
+
+METRICS = [
+    handler_latency,
+    slow_handlers,
+    hub_blocks,
+    emits,
+    bytes_sent,
+    time_to_match,
+    metrics.Gauge(
+        'twentyquestions_sessions',
+        'Socket sessions with a worker ID.',
+        lambda: len(session_registry.worker_id_from_sid)),
+    metrics.Gauge(
+        'twentyquestions_workers',
+        'Workers with a player ID.',
+        lambda: len(session_registry.player_id_from_worker_id)),
+    metrics.Gauge(
+        'twentyquestions_disconnected_sessions',
+        'Socket sessions that have disconnected but not been handled.',
+        lambda: len(session_registry.disconnected_at_from_sid)),
+    metrics.Gauge(
+        'twentyquestions_orphaned_workers',
+        'Workers with a player ID whose last socket session was claimed'
+        ' by another worker.',
+        lambda: len(session_registry.orphaned_at_from_worker_id)),
+    metrics.Gauge(
+        'twentyquestions_evicted_sessions',
+        'Orphaned socket sessions evicted from the session registry.',
+        lambda: session_registry.num_evicted_sids),
+    metrics.Gauge(
+        'twentyquestions_evicted_workers',
+        'Orphaned workers evicted from the session registry.',
+        lambda: session_registry.num_evicted_workers),
+    metrics.Gauge(
+        'twentyquestions_evicted_game_rooms',
+        'Abandoned game rooms evicted from the player router.',
+        lambda: player_router.num_evicted_game_rooms),
+    metrics.Gauge(
+        'twentyquestions_players',
+        'Players on the server, by their status.',
+        _num_players_by_status,
+        label_name='status'),
+    metrics.Gauge(
+        'twentyquestions_game_rooms',
+        'Game rooms on the server, by the state of their game.',
+        _num_game_rooms_by_state,
+        label_name='state'),
+    metrics.Gauge(
+        'twentyquestions_green_threads',
+        'Approximate number of green threads, counted as the timers and'
+        ' file descriptor listeners in the eventlet hub.',
+        _num_green_threads)
+]
+
 
 # helper functions
 
+def traced(event):
+    """Return a decorator recording calls to a handler for ``event``.
+
+    Parameters
+    ----------
+    event : str
+        The name of the event to record calls as.
+
+    Returns
+    -------
+    Callable[[Callable], Callable]
+        A decorator which wraps a socket event handler so that, if
+        tracing is on, each call is recorded before it's handled.
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(*args):
+            if recorder is not None:
+                recorder.record(
+                    sid=flask.request.sid,
+                    event=event,
+                    payload=args[0] if len(args) > 0 else None)
+
+            return handler(*args)
+
+        return wrapper
+
+    return decorator
+
+
+def timed(event):
+    """Return a decorator timing calls to a handler for ``event``.
+
+    Parameters
+    ----------
+    event : str
+        The name of the event to label the handler's latencies with.
+
+    Returns
+    -------
+    Callable[[Callable], Callable]
+        A decorator which wraps a socket event handler so that the time
+        spent in each call is recorded in ``handler_latency``, and calls
+        taking longer than ``slow_handler_threshold`` are logged.
+    """
+    def decorator(handler):
+        event_from_code[inspect.unwrap(handler).__code__] = event
+
+        @functools.wraps(handler)
+        def wrapper(*args):
+            start = time.perf_counter()
+            try:
+                return handler(*args)
+            finally:
+                latency = time.perf_counter() - start
+                handler_latency.observe(latency, label=event)
+                if latency > slow_handler_threshold:
+                    slow_handlers.inc(label=event)
+                    # only measure the payload for slow calls, since it
+                    # means serializing it again
+                    payload_size = len(json.dumps(
+                        args[0] if len(args) > 0 else None, default=str))
+                    logger.warning(
+                        f'Handling {event} took {latency:.3f}s'
+                        f' (payload {payload_size} bytes).')
+
+        return wrapper
+
+    return decorator
+
+
+def admin_only(view):
+    """Restrict ``view`` to requests with the admin token.
+
+    Requests must send the token from the environment variable
+    ``settings.ADMIN_TOKEN_ENV_VAR`` in the ``Authorization`` header, as
+    ``Bearer <token>``. If the variable is unset, the view responds
+    with a 404, as though it didn't exist.
+
+    Parameters
+    ----------
+    view : Callable
+        The view to restrict.
+
+    Returns
+    -------
+    Callable
+        The restricted view.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        admin_token = os.environ.get(settings.ADMIN_TOKEN_ENV_VAR)
+        if not admin_token:
+            flask.abort(404)
+
+        authorization = flask.request.headers.get('Authorization', '')
+        if not hmac.compare_digest(
+                authorization.encode('utf-8'),
+                f'Bearer {admin_token}'.encode('utf-8')):
+            flask.abort(401)
+
+        return view(*args, **kwargs)
+
+    return wrapper
+
+
+def _float_arg(name, default, minimum, maximum):
+    """Return the query parameter ``name`` as a float.
+
+    Responds with a 400 if the parameter isn't a number between
+    ``minimum`` and ``maximum``.
+    """
+    try:
+        value = float(flask.request.args.get(name, default))
+    except ValueError:
+        flask.abort(400, f'{name} must be a number.')
+
+    if not minimum <= value <= maximum:
+        flask.abort(400, f'{name} must be between {minimum} and {maximum}.')
+
+    return value
+
+
+def _int_arg(name, default, minimum, maximum):
+    """Return the query parameter ``name`` as an int.
+
+    Responds with a 400 if the parameter isn't an integer between
+    ``minimum`` and ``maximum``.
+    """
+    try:
+        value = int(flask.request.args.get(name, default))
+    except ValueError:
+        flask.abort(400, f'{name} must be an integer.')
+
+    if not minimum <= value <= maximum:
+        flask.abort(400, f'{name} must be between {minimum} and {maximum}.')
+
+    return value
+
+
+def update_time_to_match(player_id):
+    """Record how long ``player_id`` waited to be matched to a game.
+
+    Call this function after any change that might have moved the
+    player into or out of the WAITING status.
+
+    Parameters
+    ----------
+    player_id : str
+        The ID for the player.
+    """
+    player = player_router.players.get(player_id)
+    if (
+            player is not None
+            and player.status == models.PLAYERSTATUSES['WAITING']
+    ):
+        waiting_since_from_player_id.setdefault(
+            player_id, time.monotonic())
+        return
+
+    waiting_since = waiting_since_from_player_id.pop(player_id, None)
+    if (
+            waiting_since is not None
+            and player is not None
+            and player.status == models.PLAYERSTATUSES['READYTOPLAY']
+    ):
+        time_to_match.observe(time.monotonic() - waiting_since)
+
+
+def state_digest():
+    """Return a digest of the server's state.
+
+    See ``tracing.digest_state`` for details.
+
+    Returns
+    -------
+    str
+        The hex digest of the state.
+    """
+    return tracing.digest_state(
+        player_router=player_router,
+        player_id_from_worker_id=session_registry.player_id_from_worker_id)
+
+
+def reset(seed=None):
+    """Reset the server to its initial state.
+
+    Parameters
+    ----------
+    seed : Optional[int], optional (default=None)
+        If provided, seed the IDs and the order of the subjects with
+        ``seed`` (see ``models.seed``).
+    """
+    global player_router, session_registry
+
+    session_registry = sessions.SessionRegistry(new_player_id=models.new_id)
+    waiting_since_from_player_id.clear()
+
+    player_router = models.PlayerRouter(
+        game_rooms={},
+        players={},
+        game_room_priorities=[],
+        player_matches={})
+
+    if seed is not None:
+        models.seed(seed)
+
+
+def start_recording(trace_path):
+    """Record every inbound socket event to a trace.
+
+    The server is reset with a new seed for its IDs and subjects, which
+    is saved in the trace so that it can be replayed exactly. The
+    recording is stopped when the process exits.
+
+    Parameters
+    ----------
+    trace_path : str
+        The path to write the trace to.
+    """
+    global recorder
+
+    if recorder is not None:
+        raise RuntimeError('The server is already recording a trace.')
+
+    seed = random.SystemRandom().getrandbits(32)
+    reset(seed=seed)
+
+    recorder = tracing.TraceRecorder(trace_path=trace_path, seed=seed)
+    atexit.register(stop_recording)
+
+    logger.info(f'Recording socket events to {trace_path}.')
+
+
+def start_blocking_detector(threshold):
+    """Log green threads holding the hub for longer than ``threshold``.
+
+    See ``blocking.BlockingDetector`` for details. Socket handlers
+    running for longer than ``threshold`` are logged as slow, too.
+
+    Parameters
+    ----------
+    threshold : float
+        How long a green thread may hold the hub before it's logged, in
+        seconds.
+    """
+    global blocking_detector, slow_handler_threshold
+
+    if blocking_detector is not None:
+        raise RuntimeError('The blocking detector is already running.')
+
+    slow_handler_threshold = threshold
+    blocking_detector = blocking.BlockingDetector(
+        threshold=threshold,
+        counter=hub_blocks,
+        event_from_code=event_from_code)
+    blocking_detector.start()
+
+
+def sweep():
+    """Evict orphaned sessions, their players, and abandoned game rooms.
+
+    See ``sessions.SessionRegistry.sweep`` and
+    ``models.PlayerRouter.evict_idle_game_rooms`` for details.
+    """
+    for worker_id, player_id in session_registry.sweep(
+            ttl=settings.SESSION_TTL):
+        if player_id not in player_router.players:
+            continue
+
+        logger.warning(
+            f'Deleting player {player_id}, since worker {worker_id}'
+            f' was evicted from the session registry.')
+        room_id = player_router.player_matches[player_id]
+        player_router.delete_player(player_id)
+        update_time_to_match(player_id)
+        if room_id in player_router.game_rooms:
+            update_clients_for_game_room(room_id)
+
+    evicted_game_rooms = player_router.evict_idle_game_rooms(
+        ttl=settings.GAME_ROOM_TTL)
+    for game_room in evicted_game_rooms:
+        for player_id in game_room.player_ids:
+            update_time_to_match(player_id)
+            update_client_for_player(player_id)
+
+
+def start_sweeper():
+    """Call ``sweep`` every ``settings.SWEEP_INTERVAL`` seconds."""
+    def run():
+        while True:
+            eventlet.sleep(settings.SWEEP_INTERVAL)
+            try:
+                sweep()
+            except Exception:
+                logger.exception('Sweeping failed.')
+
+    eventlet.spawn(run)
+
+
+def stop_recording():
+    """Stop recording the trace, writing the digest of the state."""
+    global recorder
+
+    if recorder is None:
+        return
+
+    recorder.close(digest=state_digest())
+    recorder = None
+
+
 def set_player_connection_information(sid, worker_id):
     """Set the connection information for a player.
 
@@ -51,50 +510,20 @@ def set_player_connection_information(sid, worker_id):
         The worker's SID.
     worker_id : str
         The turker's worker ID.
-    """
-    # log relevant information
-    if (
-            worker_id not in most_recent_sid_from_worker_id
-            and worker_id not in player_id_from_worker_id
-    ):
-        # initial connection
-        logger.info(
-            f'Player {worker_id} connecting to server with SID {sid}.')
-        player_id = str(uuid.uuid4()).replace('-', '')
-        logger.info(
-            f'Assigning {worker_id} player ID {player_id}.')
-        player_id_from_worker_id[worker_id] = player_id
-    elif (
-            worker_id in most_recent_sid_from_worker_id
-            and worker_id in player_id_from_worker_id
-    ):
-        # reconnection
-        old_sid = most_recent_sid_from_worker_id[worker_id]
-        logger.info(
-            f'Turker {worker_id} reconnecting to server.'
-            f' Updating SID from {old_sid} to {sid}.')
-    else:
-        logger.error(
-            f'{worker_id} has a connection ({sid}) in an unexpected'
-            f' state. Attempting to recover.')
-        # provide the turker a new player id to try and recover
-        player_id = str(uuid.uuid4()).replace('-', '')
-        logger.info(
-            f'Assigning {worker_id} player ID {player_id}.')
-        player_id_from_worker_id[worker_id] = player_id
 
-    # retreive the player id regardless of which branch above executed
-    # since we'll need it.
-    player_id = player_id_from_worker_id[worker_id]
-
-    # record the sid <-> player_id mappings
-    worker_id_from_sid[sid] = worker_id
-    most_recent_sid_from_worker_id[worker_id] = sid
+    Returns
+    -------
+    str
+        The player ID for the worker.
+    """
+    player_id = session_registry.connect(sid=sid, worker_id=worker_id)
 
     # put the player in a room addressed by player id so that we can
     # communicate with them later.
     flask_socketio.join_room(player_id)
 
+    return player_id
+
 
 def update_client_for_player(player_id):
     """Update the client state for a single player.
@@ -113,7 +542,10 @@ def update_client_for_player(player_id):
     else:
         game_room_data = None
 
-    flask_socketio.emit(
+    emits.inc(label='setClientState')
+    # emit through the server rather than the request, so that clients
+    # can be updated from background tasks like the sweeper
+    socketio.emit(
         'setClientState',
         {
             'player': player_data,
@@ -135,6 +567,82 @@ def update_clients_for_game_room(room_id):
         update_client_for_player(player_id)
 
 
+@timed('handleDisconnect')
+@traced('handleDisconnect')
+def handle_disconnect(sid):
+    """Handle ``sid`` disconnecting from the server.
+
+    Rather than handling a disconnection event immediately, we want to
+    wait and give the player a chance to reconnect, so ``disconnect``
+    calls this function later, in a copy of its request context.
+
+    Parameters
+    ----------
+    sid : str
+        The old session ID for the disconnected player.
+    """
+    worker_id = session_registry.worker_id_from_sid.get(sid)
+    player_id = session_registry.player_id_from_worker_id.get(worker_id)
+    most_recent_sid = session_registry.most_recent_sid_from_worker_id.get(
+        worker_id)
+    if worker_id is None:
+        # the client connected but never started a game
+        logger.info(
+            f'No worker corresponding to SID {sid} found on server.')
+    elif player_id not in player_router.player_matches:
+        logger.info(
+            f'Player {player_id} is not matched to a game. Most likely'
+            f' the player finished a game and has been deleted.')
+        # remove only this connection, since the worker may have
+        # reconnected with a newer SID that's still in use. Once they
+        # have no connections left, it's safe to remove the worker.
+        session_registry.remove_sid(sid)
+        if worker_id not in session_registry.sids_from_worker_id:
+            session_registry.remove_worker(worker_id)
+    elif sid == most_recent_sid:
+        # the player has dropped the connection represented by SID and
+        # hasn't established a new connection yet, so we'll delete the
+        # player.
+        logger.info(
+            f'Disconnecting player {player_id} from server.')
+
+        # fetch the room the player is in
+        room_id = player_router.player_matches[player_id]
+
+        # delete the player
+        player_router.delete_player(player_id)
+        update_time_to_match(player_id)
+
+        # delete the player's connection information
+        session_registry.remove_worker(worker_id)
+
+        if room_id not in player_router.game_rooms:
+            # Normally, the player and the game are deleted when the
+            # player submits the game to MTurk, in which case this
+            # branch of the if / else block won't be executed. If a
+            # player leaves a game in the FINISHGAME state without
+            # having submitted the game, then the game room will have
+            # been deleted when we deleted the player a few lines up. We
+            # don't want to try and update the other members of the game
+            # room in this case since the room doesn't exist.
+            #
+            # It's strange for a turker to abandon the game in the
+            # FINISHGAME state without submitting, since all they have
+            # to do is click a button to get money, so log a warning.
+            logger.warning(
+                f'Player {player_id} disconnecting from a game that'
+                f' does not exist ({room_id}).')
+        elif room_id is not None:
+            update_clients_for_game_room(room_id)
+    else:
+        logger.info(
+            f'Player {player_id} has previously reconnected.'
+            f' Old connection (SID {sid}) has been dropped.')
+
+        # delete the old / unused connection sid
+        session_registry.remove_sid(sid)
+
+
 # Web Page Endpoints
 
 @twentyquestions.route('/game-room')
@@ -147,16 +655,148 @@ def game_room():
 def server_info():
     """Endpoint for reading information about the server."""
     return flask.jsonify({
-        'numSessions': len(worker_id_from_sid),
+        'numSessions': len(session_registry.worker_id_from_sid),
         'numPlayers': len(player_router.players),
         'numGameRooms': len(player_router.game_rooms),
-        'numSubjectsRemaining': len(models.subjects)
+        'numSubjectsRemaining': len(models.get_subjects()),
+        # ru_maxrss is in kilobytes on linux
+        'maxRssKb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    })
+
+
+@twentyquestions.route('/metrics')
+def scrape_metrics():
+    """Endpoint for scraping the server's metrics with Prometheus."""
+    return flask.Response(
+        metrics.render(METRICS),
+        mimetype=metrics.CONTENT_TYPE)
+
+
+@twentyquestions.route('/admin/profile')
+@admin_only
+def profile():
+    """Endpoint for profiling the server while it runs.
+
+    Query Parameters
+    ----------------
+    mode : str, optional (default='stacks')
+        Either ``'stacks'``, to sample the running stack and respond
+        with collapsed stacks for a flamegraph, or ``'memory'``, to
+        respond with the allocations that grew over the profile (see
+        ``profiling.profile_memory``).
+    seconds : float, optional (default=10)
+        How long to profile for.
+    interval : float, optional (default=0.005)
+        The CPU time between samples of the stack, in seconds.
+    limit : int, optional (default=25)
+        The number of tracebacks to report in ``'memory'`` mode.
+    """
+    mode = flask.request.args.get('mode', 'stacks')
+    seconds = _float_arg(
+        'seconds', default=10, minimum=0,
+        maximum=settings.MAX_PROFILE_SECONDS)
+
+    if not profiling_lock.acquire(blocking=False):
+        flask.abort(409, 'A profile is already running.')
+    try:
+        logger.info(f'Profiling {mode} for {seconds}s.')
+        if mode == 'stacks':
+            report = profiling.profile_stacks(
+                seconds=seconds,
+                interval=_float_arg(
+                    'interval', default=0.005, minimum=0.001, maximum=1),
+                sleep=eventlet.sleep)
+        elif mode == 'memory':
+            report = profiling.profile_memory(
+                seconds=seconds,
+                limit=int(_float_arg(
+                    'limit', default=25, minimum=1, maximum=1000)),
+                sleep=eventlet.sleep)
+        else:
+            flask.abort(400, 'mode must be "stacks" or "memory".')
+    finally:
+        profiling_lock.release()
+
+    return flask.Response(report, mimetype='text/plain')
+
+
+def _page(items, count, offset):
+    """Return the JSON response for a page of ``items``."""
+    return flask.jsonify({
+        'count': count,
+        'offset': offset,
+        'items': [item.to_dict() for item in items]
     })
 
 
+def _page_args():
+    """Return the offset and limit query parameters for a page."""
+    offset = _int_arg(
+        'offset', default=0, minimum=0, maximum=settings.MAX_PAGE_OFFSET)
+    limit = _int_arg(
+        'limit', default=100, minimum=1, maximum=settings.MAX_PAGE_LIMIT)
+
+    return offset, limit
+
+
+@twentyquestions.route('/admin/game-rooms')
+@admin_only
+def list_game_rooms():
+    """Endpoint for listing the game rooms in a game state.
+
+    Query Parameters
+    ----------------
+    state : str
+        The game state, from ``models.STATES``.
+    offset : int, optional (default=0)
+        The number of game rooms to skip.
+    limit : int, optional (default=100)
+        The most game rooms to list.
+    """
+    state = flask.request.args.get('state')
+    if state not in models.STATES:
+        flask.abort(400, f'state must be one of {list(models.STATES)}.')
+
+    offset, limit = _page_args()
+
+    return _page(
+        player_router.list_game_rooms(state, offset=offset, limit=limit),
+        count=player_router.count_game_rooms(state),
+        offset=offset)
+
+
+@twentyquestions.route('/admin/players')
+@admin_only
+def list_players():
+    """Endpoint for listing the players with a status.
+
+    Query Parameters
+    ----------------
+    status : str
+        The player status, from ``models.PLAYERSTATUSES``.
+    offset : int, optional (default=0)
+        The number of players to skip.
+    limit : int, optional (default=100)
+        The most players to list.
+    """
+    status = flask.request.args.get('status')
+    if status not in models.PLAYERSTATUSES:
+        flask.abort(
+            400, f'status must be one of {list(models.PLAYERSTATUSES)}.')
+
+    offset, limit = _page_args()
+
+    return _page(
+        player_router.list_players(status, offset=offset, limit=limit),
+        count=player_router.count_players(status),
+        offset=offset)
+
+
 # Web Socket Endpoints
 
 @socketio.on('connect')
+@timed('connect')
+@traced('connect')
 def connect():
     """Websocket endpoint for when a player connects."""
     sid = flask.request.sid
@@ -165,96 +805,27 @@ def connect():
 
 
 @socketio.on('disconnect')
+@timed('disconnect')
+@traced('disconnect')
 def disconnect():
     """Websocket endpoint for when a player disconnects."""
     sid = flask.request.sid
 
     logger.info(f'Disconnecting (SID {sid}).')
 
-    @flask.copy_current_request_context
-    def handle_disconnect(sid):
-        """Handle ``sid`` disconnecting from the server.
-
-        Rather than handling a disconnection event immediately, we want to
-        wait and give the player a chance to reconnect.
-
-        Parameters
-        ----------
-        sid : str
-            The old session ID for the disconnected player.
-        """
-        worker_id = worker_id_from_sid.get(sid)
-        player_id = player_id_from_worker_id.get(worker_id)
-        most_recent_sid = most_recent_sid_from_worker_id.get(worker_id)
-        if worker_id is None:
-            # the client connected but never started a game
-            logger.info(
-                f'No worker corresponding to SID {sid} found on server.')
-        elif player_id not in player_router.player_matches:
-            logger.info(
-                f'Player {player_id} is not matched to a game. Most likely'
-                f' the player finished a game and has been deleted.')
-            # since the player has been deleted, it's safe to remove the
-            # connection information
-            if worker_id in most_recent_sid_from_worker_id:
-                del most_recent_sid_from_worker_id[worker_id]
-            if worker_id in player_id_from_worker_id:
-                del player_id_from_worker_id[worker_id]
-            if sid in worker_id_from_sid:
-                del worker_id_from_sid[sid]
-        elif sid == most_recent_sid:
-            # the player has dropped the connection represented by SID and
-            # hasn't established a new connection yet, so we'll delete the
-            # player.
-            logger.info(
-                f'Disconnecting player {player_id} from server.')
-
-            # fetch the room the player is in
-            room_id = player_router.player_matches[player_id]
-
-            # delete the player
-            player_router.delete_player(player_id)
-
-            # delete the player's connection information
-            del most_recent_sid_from_worker_id[worker_id]
-            del player_id_from_worker_id[worker_id]
-            del worker_id_from_sid[sid]
-
-            if room_id not in player_router.game_rooms:
-                # Normally, the player and the game are deleted when the
-                # player submits the game to MTurk, in which case this
-                # branch of the if / else block won't be executed. If a
-                # player leaves a game in the FINISHGAME state without
-                # having submitted the game, then the game room will have
-                # been deleted when we deleted the player a few lines up. We
-                # don't want to try and update the other members of the game
-                # room in this case since the room doesn't exist.
-                #
-                # It's strange for a turker to abandon the game in the
-                # FINISHGAME state without submitting, since all they have
-                # to do is click a button to get money, so log a warning.
-                logger.warning(
-                    f'Player {player_id} disconnecting from a game that'
-                    f' does not exist ({room_id}).')
-            elif room_id is not None:
-                update_clients_for_game_room(room_id)
-        else:
-            logger.info(
-                f'Player {player_id} has previously reconnected.'
-                f' Old connection (SID {sid}) has been dropped.')
-
-            # delete the old / unused connection sid
-            del worker_id_from_sid[sid]
+    session_registry.disconnect(sid)
 
     # we need to wait before handling the disconnection event so that
     # players have a chance to reconnect before we delete them.
     eventlet.spawn_after(
         settings.TIME_TO_RECONNECT,
-        handle_disconnect,
+        flask.copy_current_request_context(handle_disconnect),
         sid)
 
 
 @socketio.on('updatePlayerConnection')
+@timed('updatePlayerConnection')
+@traced('updatePlayerConnection')
 def update_player_connection(message):
     """Update the connection information associated with a player.
 
@@ -273,15 +844,16 @@ def update_player_connection(message):
             f'SID {sid} is previewing the server.')
         return
 
-    set_player_connection_information(sid=sid, worker_id=worker_id)
-
-    player_id = player_id_from_worker_id[worker_id]
+    player_id = set_player_connection_information(
+        sid=sid, worker_id=worker_id)
     # update the client
     if player_id in player_router.players:
         update_client_for_player(player_id)
 
 
 @socketio.on('joinServer')
+@timed('joinServer')
+@traced('joinServer')
 def join_server(message):
     """Websocket endpoint for a player to join the server.
 
@@ -302,9 +874,8 @@ def join_server(message):
             f'SID {sid} is previewing the server.')
         return
 
-    set_player_connection_information(sid=sid, worker_id=worker_id)
-
-    player_id = player_id_from_worker_id[worker_id]
+    player_id = set_player_connection_information(
+        sid=sid, worker_id=worker_id)
     if player_id not in player_router.players:
         player_router.create_player(player_id)
 
@@ -317,6 +888,8 @@ def join_server(message):
 
 
 @socketio.on('setServerGameState')
+@timed('setServerGameState')
+@traced('setServerGameState')
 def set_server_game_state(message):
     """Websocket endpoint for clients to set the server's game state.
 
@@ -345,6 +918,8 @@ def set_server_game_state(message):
 
 
 @socketio.on('takePlayerAction')
+@timed('takePlayerAction')
+@traced('takePlayerAction')
 def take_player_action(message):
     """Websocket endpoint for clients to take a player action.
 
@@ -375,11 +950,18 @@ def take_player_action(message):
     else:
         raise ValueError('Action not recognized.')
 
+    # matching a player can move the other players in the room out of
+    # WAITING, too
+    room_id = player_router.player_matches.get(player_id)
+    update_time_to_match(player_id)
+    if room_id is not None:
+        for a_player_id in player_router.game_rooms[room_id].player_ids:
+            update_time_to_match(a_player_id)
+
     # update the clients
 
     # the logic for updating clients depends on whether or not the
     # player changed rooms.
-    room_id = player_router.player_matches.get(player_id)
     if player_id not in player_router.players:
         # the player has been deleted (probably from finishing a game)
         pass
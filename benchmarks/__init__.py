@@ -0,0 +1,9 @@
+"""Benchmarks for twentyquestions.
+
+Each benchmark is a module that can be run with ``python -m``, e.g.:
+
+    $ python -m benchmarks.extraction --help
+    $ python -m benchmarks.import_time --help
+    $ python -m benchmarks.player_router --help
+    $ python -m benchmarks.synthetic_batch --help
+"""
@@ -0,0 +1,31 @@
+"""Utilities for twentyquestions' benchmarks."""
+
+import os
+import subprocess
+
+
+# constants
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def git_commit():
+    """Return the commit the repo is on.
+
+    Returns
+    -------
+    Optional[str]
+        The hash of the commit, or ``None`` if it can't be determined
+        (e.g., git isn't installed).
+    """
+    try:
+        process = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            cwd=REPO_DIR,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            universal_newlines=True)
+    except OSError:
+        return None
+
+    return process.stdout.strip() if process.returncode == 0 else None
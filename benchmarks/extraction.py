@@ -0,0 +1,196 @@
+"""Benchmark the extraction pipeline on synthetic batches of HITs.
+
+See ``python -m benchmarks.extraction --help`` for more information.
+"""
+
+import json
+import logging
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import click
+
+from benchmarks import _utils, synthetic_batch
+
+
+logger = logging.getLogger(__name__)
+
+
+# constants
+
+# the steps of the pipeline, in the order they run. Each step runs a
+# manage.py command on either a synthetic batch of HITs (named by its
+# HIT type) or the output of an earlier step, and writes its output to
+# a path relative to the work directory.
+STEPS = [
+    ('extractgames', 'twenty-questions', 'games.jsonl'),
+    ('extractquestions', 'twenty-questions', 'questions.jsonl'),
+    ('groupbysubject', 'questions.jsonl', 'grouped.jsonl'),
+    ('extractquality', 'questions-quality-control', 'quality.jsonl'),
+    ('extractlabels', 'question-labeling', 'labels.jsonl'),
+    ('extracttypes', 'commonsense-types', 'types.jsonl'),
+    ('extractmirrorsubjects', 'mirror-subjects', 'mirror-subjects.jsonl'),
+    ('create_splits', 'labels.jsonl', 'splits')
+]
+
+NUM_HITS = 1000
+
+
+# helper functions
+
+def _count_rows(path):
+    """Return the number of rows at ``path``.
+
+    ``path`` may be an XML directory, where each file is a row, a JSON
+    Lines file, or a directory of JSON Lines files.
+    """
+    if os.path.isdir(path):
+        return sum(
+            1 if name.endswith('.xml')
+            else _count_rows(os.path.join(path, name))
+            for name in os.listdir(path))
+
+    with open(path, 'rb') as data_file:
+        return sum(1 for ln in data_file if ln.strip())
+
+
+def _run(args, log_path):
+    """Run python ``args`` and return its wall time and peak RSS.
+
+    Returns
+    -------
+    Tuple[float, int]
+        The wall time in seconds and the peak resident set size of the
+        process in kilobytes.
+    """
+    with open(log_path, 'w') as log_file:
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, *args],
+            cwd=_utils.REPO_DIR,
+            stdout=log_file,
+            stderr=subprocess.STDOUT)
+        # wait4 reports the resource usage of just this process, unlike
+        # getrusage(RUSAGE_CHILDREN)
+        _, status, rusage = os.wait4(process.pid, 0)
+        seconds = time.perf_counter() - start
+
+    # the process was reaped by wait4, so tell Popen how it exited
+    process.returncode = (
+        os.WEXITSTATUS(status)
+        if os.WIFEXITED(status)
+        else -os.WTERMSIG(status)
+    )
+    if process.returncode != 0:
+        raise click.ClickException(
+            f'{" ".join(args)} failed. See {log_path} for its output.')
+
+    return seconds, rusage.ru_maxrss
+
+
+# main function
+
+@click.command(
+    context_settings={
+        'help_option_names': ['-h', '--help']
+    })
+@click.argument(
+    'output_path',
+    type=click.Path(exists=False, file_okay=True, dir_okay=False),
+    default=None,
+    required=False)
+@click.option(
+    '--num-hits',
+    type=click.IntRange(min=1),
+    default=NUM_HITS,
+    help='The number of HITs to generate for each HIT type.')
+@click.option(
+    '--work-dir',
+    type=click.Path(exists=False, file_okay=False, dir_okay=True),
+    default=None,
+    help='The directory to write the batches and outputs to. Defaults'
+         ' to a temporary directory, which is deleted afterwards.')
+@click.option(
+    '--seed',
+    type=int,
+    default=0,
+    help='The random seed.')
+def extraction(output_path, num_hits, work_dir, seed):
+    """Time each extraction command on synthetic batches of HITs.
+
+    Generate a synthetic AMTI XML directory with --num-hits HITs for
+    each HIT type in mturk-definitions/ (see benchmarks.synthetic_batch),
+    then run each extract command on its batch, groupbysubject on the
+    extracted questions, and create_splits on the extracted labels, and
+    print the wall time, rows per second, and peak RSS of each one.
+    Every command runs in its own process, so the peak RSS includes
+    starting the interpreter.
+
+    If OUTPUT_PATH is provided, also write the results to it as JSON,
+    along with the commit they were measured on, so runs on different
+    commits can be compared.
+    """
+    temp_dir = None
+    if work_dir is None:
+        work_dir = temp_dir = tempfile.mkdtemp(prefix='extraction-')
+
+    results = {
+        'commit': _utils.git_commit(),
+        'python_version': platform.python_version(),
+        'num_hits': num_hits,
+        'seed': seed,
+        'steps': {}
+    }
+
+    try:
+        for hit_type in synthetic_batch.HIT_TYPES:
+            start = time.perf_counter()
+            num_assignments = synthetic_batch.write_batch(
+                hit_type=hit_type,
+                xml_dir=os.path.join(work_dir, hit_type),
+                num_hits=num_hits,
+                seed=seed)
+            click.echo(
+                f'Generated {num_assignments} {hit_type} assignments'
+                f' in {time.perf_counter() - start:.1f}s.')
+
+        for command, input_name, output_name in STEPS:
+            input_path = os.path.join(work_dir, input_name)
+            output_path_ = os.path.join(work_dir, output_name)
+            if command == 'create_splits':
+                os.makedirs(output_path_, exist_ok=True)
+
+            seconds, max_rss_kb = _run(
+                ['manage.py', command, input_path, output_path_],
+                log_path=os.path.join(work_dir, f'{command}.log'))
+
+            input_rows = _count_rows(input_path)
+            results['steps'][command] = {
+                'input_rows': input_rows,
+                'output_rows': _count_rows(output_path_),
+                'seconds': seconds,
+                'rows_per_second': input_rows / seconds,
+                'max_rss_kb': max_rss_kb
+            }
+            click.echo(
+                f'  {command:<24}'
+                f' {input_rows:8d} rows'
+                f'  {seconds:7.2f}s'
+                f'  {input_rows / seconds:9.1f} rows/s'
+                f'  {max_rss_kb / 1024:7.1f}MB')
+    finally:
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir)
+
+    if output_path is not None:
+        with open(output_path, 'w') as output_file:
+            json.dump(results, output_file, indent=2)
+
+
+if __name__ == '__main__':
+    extraction()
@@ -0,0 +1,96 @@
+"""Benchmark the startup time of manage.py and the backend.
+
+See ``python -m benchmarks.import_time --help`` for more information.
+"""
+
+import json
+import logging
+import statistics
+import subprocess
+import sys
+import time
+
+import click
+
+from benchmarks import _utils
+
+
+logger = logging.getLogger(__name__)
+
+
+# constants
+
+# the commands to time, as arguments to the python interpreter
+COMMANDS = {
+    'manage --help': ['manage.py', '--help'],
+    'manage extractquestions --help': [
+        'manage.py', 'extractquestions', '--help'],
+    'manage serve --help': ['manage.py', 'serve', '--help'],
+    'import backend.models': ['-c', 'import backend.models'],
+    'create app': [
+        '-c', 'from backend import app; app.create_app()'],
+}
+
+NUM_RUNS = 10
+
+
+# helper functions
+
+def _time_command(args, num_runs):
+    """Return the wall times, in seconds, of running python ``args``."""
+    times = []
+    for _ in range(num_runs):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, *args],
+            cwd=_utils.REPO_DIR,
+            stdout=subprocess.DEVNULL,
+            check=True)
+        times.append(time.perf_counter() - start)
+
+    return times
+
+
+# main function
+
+@click.command(
+    context_settings={
+        'help_option_names': ['-h', '--help']
+    })
+@click.argument(
+    'output_path',
+    type=click.Path(exists=False, file_okay=True, dir_okay=False),
+    default=None,
+    required=False)
+@click.option(
+    '--num-runs',
+    type=click.IntRange(min=1),
+    default=NUM_RUNS,
+    help='The number of times to run each command.')
+def import_time(output_path, num_runs):
+    """Time cold starts of manage.py and the backend.
+
+    Run each command in a fresh interpreter --num-runs times and print
+    the median and minimum wall time. If OUTPUT_PATH is provided, also
+    write the results to it as JSON.
+    """
+    results = {}
+    for name, args in COMMANDS.items():
+        times = _time_command(args, num_runs)
+        results[name] = {
+            'median': statistics.median(times),
+            'min': min(times),
+            'runs': times
+        }
+        click.echo(
+            f'{name:<36}'
+            f' median {results[name]["median"] * 1000:7.1f}ms'
+            f'  min {results[name]["min"] * 1000:7.1f}ms')
+
+    if output_path is not None:
+        with open(output_path, 'w') as output_file:
+            json.dump(results, output_file, indent=2)
+
+
+if __name__ == '__main__':
+    import_time()
@@ -0,0 +1,350 @@
+"""Benchmark the operations on ``PlayerRouter`` at realistic scales.
+
+See ``python -m benchmarks.player_router --help`` for more information.
+"""
+
+import gc
+import json
+import logging
+import platform
+import random
+import time
+import tracemalloc
+import uuid
+
+import click
+import numpy as np
+
+from backend import models
+from benchmarks import _utils
+
+
+logger = logging.getLogger(__name__)
+
+
+# constants
+
+# the numbers of players to populate the router with
+SCALES = [1000, 10000, 100000]
+
+NUM_SAMPLES = 1000
+
+# the fraction of players in the population who have gone inactive,
+# leaving their partner waiting alone in a game room
+INACTIVE_FRACTION = 0.1
+
+PERCENTILES = [50, 90, 99]
+
+
+# helper functions
+
+def _new_player_id():
+    """Return a new, unique player ID."""
+    return uuid.uuid4().hex
+
+
+def _ensure_subjects(num_subjects):
+    """Make sure at least ``num_subjects`` seed subjects remain.
+
+    Every new game room uses up a seed subject, and there are fewer
+    seed subjects than game rooms in the larger benchmarks.
+    """
+    subjects = models.get_subjects()
+    subjects.extend(
+        f'benchmark subject {i}'
+        for i in range(len(subjects), num_subjects))
+
+
+def _populate(num_players, rng):
+    """Return a router with ``num_players`` players in game rooms.
+
+    The players are paired up into game rooms and start playing, then
+    ``INACTIVE_FRACTION`` of them go inactive, leaving their partners
+    waiting in the game room priority queue.
+
+    Returns
+    -------
+    Tuple[PlayerRouter, List[str]]
+        The router and the IDs of the players who are playing.
+    """
+    _ensure_subjects(num_players)
+
+    router = models.PlayerRouter(
+        game_rooms={},
+        players={},
+        game_room_priorities=[],
+        player_matches={})
+
+    player_ids = [_new_player_id() for _ in range(num_players)]
+    for player_id in player_ids:
+        router.create_player(player_id)
+        router.finish_reading_instructions(player_id)
+    for player_id in player_ids:
+        if router.players[player_id].status \
+                == models.PLAYERSTATUSES['READYTOPLAY']:
+            router.start_playing(player_id)
+
+    inactive_player_ids = set(rng.sample(
+        player_ids, int(INACTIVE_FRACTION * num_players)))
+    for player_id in inactive_player_ids:
+        router.go_inactive(player_id)
+
+    playing_ids = [
+        player_id
+        for player_id in player_ids
+        if router.players[player_id].status
+        == models.PLAYERSTATUSES['PLAYING']
+    ]
+
+    return router, playing_ids
+
+
+def _ready_pair(router):
+    """Add two players to ``router``, matching at least one of them.
+
+    Returns
+    -------
+    Tuple[str, List[str]]
+        The ID of a new player who is ready to play, and the IDs of both
+        new players.
+    """
+    player_ids = [_new_player_id(), _new_player_id()]
+    for player_id in player_ids:
+        router.create_player(player_id)
+        router.finish_reading_instructions(player_id)
+
+    # the second player always joins a waiting game room, if the first
+    # didn't already
+    ready_id = next(
+        player_id
+        for player_id in player_ids
+        if router.players[player_id].status
+        == models.PLAYERSTATUSES['READYTOPLAY'])
+
+    return ready_id, player_ids
+
+
+# Each setup function prepares the router for one call to an operation,
+# returning the arguments for the call and the IDs of any players to
+# delete afterwards, so that the router stays at the same scale.
+
+def _setup_create_player(router, playing_ids, rng):
+    player_id = _new_player_id()
+    return (player_id,), [player_id]
+
+
+def _setup_finish_reading_instructions(router, playing_ids, rng):
+    player_id = _new_player_id()
+    router.create_player(player_id)
+    return (player_id,), [player_id]
+
+
+def _setup_start_playing(router, playing_ids, rng):
+    ready_id, player_ids = _ready_pair(router)
+    return (ready_id,), player_ids
+
+
+def _setup_go_inactive(router, playing_ids, rng):
+    ready_id, player_ids = _ready_pair(router)
+    router.start_playing(ready_id)
+    return (ready_id,), player_ids
+
+
+def _setup_go_active(router, playing_ids, rng):
+    ready_id, player_ids = _ready_pair(router)
+    router.start_playing(ready_id)
+    router.go_inactive(ready_id)
+    return (ready_id,), player_ids
+
+
+def _setup_update_game(router, playing_ids, rng):
+    player_id = rng.choice(playing_ids)
+    game = router.game_rooms[router.player_matches[player_id]].game
+    return (player_id, game.copy()), []
+
+
+def _setup_delete_player(router, playing_ids, rng):
+    player_id = _new_player_id()
+    router.create_player(player_id)
+    router.finish_reading_instructions(player_id)
+    return (player_id,), []
+
+
+# the operations to benchmark, mapped to their setup functions
+OPERATIONS = {
+    'create_player': _setup_create_player,
+    'finish_reading_instructions': _setup_finish_reading_instructions,
+    'start_playing': _setup_start_playing,
+    'go_inactive': _setup_go_inactive,
+    'go_active': _setup_go_active,
+    'update_game': _setup_update_game,
+    'delete_player': _setup_delete_player
+}
+
+
+def _clean_up(router, player_ids):
+    """Delete the players in ``player_ids`` that are still around."""
+    for player_id in player_ids:
+        if player_id in router.players:
+            router.delete_player(player_id)
+
+
+def _measure(router, playing_ids, name, num_samples, rng):
+    """Return the latencies and allocations for an operation.
+
+    Latencies and allocations are measured in separate passes, since
+    tracing allocations slows everything down.
+
+    Returns
+    -------
+    Tuple[List[float], List[int], List[int]]
+        The latency of each call in seconds, and the number of memory
+        blocks each call left allocated and the peak number of bytes it
+        allocated.
+    """
+    setup = OPERATIONS[name]
+    operation = getattr(router, name)
+
+    # every sample might create a game room in each pass
+    _ensure_subjects(2 * num_samples)
+
+    latencies = []
+    for _ in range(num_samples):
+        args, player_ids = setup(router, playing_ids, rng)
+        start = time.perf_counter()
+        operation(*args)
+        latencies.append(time.perf_counter() - start)
+        _clean_up(router, player_ids)
+
+    blocks = []
+    peak_bytes = []
+    for _ in range(num_samples):
+        args, player_ids = setup(router, playing_ids, rng)
+        tracemalloc.start()
+        try:
+            operation(*args)
+            _, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+        finally:
+            tracemalloc.stop()
+        blocks.append(len(snapshot.traces))
+        peak_bytes.append(peak)
+        _clean_up(router, player_ids)
+
+    return latencies, blocks, peak_bytes
+
+
+def _summarize(latencies, blocks, peak_bytes):
+    """Return the summary statistics for an operation's measurements."""
+    latencies_us = np.array(latencies) * 1e6
+
+    summary = {'mean_us': float(np.mean(latencies_us))}
+    for q in PERCENTILES:
+        summary[f'p{q}_us'] = float(np.percentile(latencies_us, q))
+    summary['max_us'] = float(np.max(latencies_us))
+    summary['blocks_mean'] = float(np.mean(blocks))
+    summary['blocks_max'] = int(np.max(blocks))
+    summary['peak_bytes_mean'] = float(np.mean(peak_bytes))
+    summary['peak_bytes_max'] = int(np.max(peak_bytes))
+
+    return summary
+
+
+# main function
+
+@click.command(
+    context_settings={
+        'help_option_names': ['-h', '--help']
+    })
+@click.argument(
+    'output_path',
+    type=click.Path(exists=False, file_okay=True, dir_okay=False),
+    default=None,
+    required=False)
+@click.option(
+    '--scale',
+    'scales',
+    type=click.IntRange(min=2),
+    multiple=True,
+    help='The number of players to populate the router with. May be'
+         ' given several times. Defaults to 1000, 10000, and 100000.')
+@click.option(
+    '--num-samples',
+    type=click.IntRange(min=1),
+    default=NUM_SAMPLES,
+    help='The number of times to call each operation.')
+@click.option(
+    '--seed',
+    type=int,
+    default=0,
+    help='The random seed.')
+def player_router(output_path, scales, num_samples, seed):
+    """Time each public operation on PlayerRouter at several scales.
+
+    For each --scale, populate a router with that many players, paired
+    into game rooms (a tenth of them inactive, leaving their partners
+    waiting for a match), then call each operation --num-samples times
+    and print its median and 99th percentile latency along with the
+    number of memory blocks it leaves allocated. Garbage collection is
+    disabled while measuring.
+
+    If OUTPUT_PATH is provided, also write each operation's summary
+    statistics (the mean, 50th, 90th, and 99th percentile, and maximum
+    latency, and the mean and maximum allocated blocks and peak bytes)
+    to it as JSON, along with the commit they were measured on, so runs
+    on different commits can be compared.
+    """
+    scales = sorted(scales) if len(scales) > 0 else SCALES
+    rng = random.Random(seed)
+    random.seed(seed)
+
+    results = {
+        'commit': _utils.git_commit(),
+        'python_version': platform.python_version(),
+        'num_samples': num_samples,
+        'seed': seed,
+        'scales': {}
+    }
+
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for scale in scales:
+            start = time.perf_counter()
+            router, playing_ids = _populate(scale, rng)
+            populate_seconds = time.perf_counter() - start
+
+            click.echo(
+                f'{scale} players, {len(router.game_rooms)} game rooms'
+                f' (populated in {populate_seconds:.1f}s)')
+
+            operations = {}
+            for name in OPERATIONS:
+                operations[name] = _summarize(*_measure(
+                    router, playing_ids, name, num_samples, rng))
+                click.echo(
+                    f'  {name:<28}'
+                    f' p50 {operations[name]["p50_us"]:8.1f}us'
+                    f'  p99 {operations[name]["p99_us"]:8.1f}us'
+                    f'  blocks {operations[name]["blocks_mean"]:6.1f}')
+
+            results['scales'][str(scale)] = {
+                'num_players': len(router.players),
+                'num_game_rooms': len(router.game_rooms),
+                'populate_seconds': populate_seconds,
+                'operations': operations
+            }
+
+            del router, playing_ids
+            gc.collect()
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    if output_path is not None:
+        with open(output_path, 'w') as output_file:
+            json.dump(results, output_file, indent=2)
+
+
+if __name__ == '__main__':
+    player_router()
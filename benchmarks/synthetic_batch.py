@@ -0,0 +1,401 @@
+"""Generate synthetic AMTI XML directories for twentyquestions' HITs.
+
+See ``python -m benchmarks.synthetic_batch --help`` for more
+information.
+"""
+
+import html
+import json
+import logging
+import os
+import random
+from xml.sax import saxutils
+
+import click
+
+from backend import models, settings
+from benchmarks import _utils
+
+
+logger = logging.getLogger(__name__)
+
+
+# constants
+
+MTURK_DEFINITIONS_DIR = os.path.join(_utils.REPO_DIR, 'mturk-definitions')
+
+HIT_TYPES = [
+    'commonsense-types',
+    'mirror-subjects',
+    'question-labeling',
+    'questions-quality-control',
+    'twenty-questions'
+]
+
+# the number of rows in each HIT that labels questions, matching the
+# blocks written by the groupbysubject command
+ROWS_PER_HIT = 20
+
+# the number of players who submit a copy of each game
+PLAYERS_PER_GAME = 2
+
+NUM_WORKERS = 200
+
+# the number of times to draw a question and answer for a subject that
+# have already been used before moving on to another subject
+MAX_COLLISIONS = 100
+
+QUESTION_TEMPLATES = [
+    'Is it {adjective}?',
+    'Is it bigger than a {noun}?',
+    'Can you {verb} it?',
+    'Would you find it in a {place}?',
+    'Is it made of {material}?',
+    'Does it have a {part}?'
+]
+
+WORDS = {
+    'adjective': [
+        'alive', 'soft', 'heavy', 'edible', 'expensive', 'loud', 'round'],
+    'noun': ['car', 'breadbox', 'house', 'person', 'dog', 'phone'],
+    'verb': ['eat', 'hold', 'ride', 'wear', 'buy', 'break'],
+    'place': ['kitchen', 'forest', 'office', 'garage', 'ocean'],
+    'material': ['wood', 'metal', 'plastic', 'cloth', 'glass'],
+    'part': ['handle', 'tail', 'screen', 'wheel', 'lid']
+}
+
+ANSWER_VALUES = [
+    'always', 'usually', 'sometimes', 'rarely', 'never', 'irrelevant']
+
+QUALITIES = [
+    'good', 'guess', 'not-yes-no', 'about-word', 'not-playing', 'other']
+
+# the probability of a worker choosing "good" for the quality of a
+# question, rather than one of the other qualities
+GOOD_QUALITY_RATE = 0.7
+
+LABELS = ['always', 'usually', 'sometimes', 'rarely', 'never', 'bad']
+
+TYPES = [
+    'ontological',
+    'capability',
+    'location',
+    'physical',
+    'non-physical',
+    'meronymy',
+    'association'
+]
+
+# the probability of a worker checking each commonsense type
+TYPE_RATE = 0.3
+
+
+# helper functions
+
+def _max_assignments(hit_type):
+    """Return the number of assignments for each HIT of ``hit_type``."""
+    hit_properties_path = os.path.join(
+        MTURK_DEFINITIONS_DIR, hit_type, 'definition', 'hitproperties.json')
+    with open(hit_properties_path, 'r') as hit_properties_file:
+        return json.load(hit_properties_file)['MaxAssignments']
+
+
+def _random_id(rng, num_chars):
+    """Return a random upper case alphanumeric ID like MTurk's."""
+    return ''.join(
+        rng.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789')
+        for _ in range(num_chars))
+
+
+def _question(rng):
+    """Return a random question."""
+    template = rng.choice(QUESTION_TEMPLATES)
+    return template.format(**{
+        slot: rng.choice(words) for slot, words in WORDS.items()
+    })
+
+
+def _assignment_xml(assignment_id, worker_id, hit_id, answers):
+    """Return the XML for an assignment.
+
+    Parameters
+    ----------
+    assignment_id : str
+        The ID of the assignment.
+    worker_id : str
+        The ID of the worker who submitted the assignment.
+    hit_id : str
+        The ID of the assignment's HIT.
+    answers : Dict[str, str]
+        The form data, mapping each question identifier to its value.
+
+    Returns
+    -------
+    str
+        The assignment as XML. Like the XML from MTurk, the values are
+        HTML escaped before being escaped for XML.
+    """
+    answer_xmls = [
+        f'<Answer>'
+        f'<QuestionIdentifier>{saxutils.escape(identifier)}'
+        f'</QuestionIdentifier>'
+        f'<FreeText>{saxutils.escape(html.escape(value))}</FreeText>'
+        f'</Answer>'
+        for identifier, value in answers.items()
+    ]
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<Assignment>'
+        f'<AssignmentId>{assignment_id}</AssignmentId>'
+        f'<WorkerId>{worker_id}</WorkerId>'
+        f'<HITId>{hit_id}</HITId>'
+        '<QuestionFormAnswers>'
+        + ''.join(answer_xmls) +
+        '</QuestionFormAnswers>'
+        '</Assignment>\n'
+    )
+
+
+def _game_room_json(rng, subject):
+    """Return the JSON for a finished game of 20 Questions."""
+    asker_id, answerer_id = (
+        f'{rng.getrandbits(128):032x}' for _ in range(2))
+    game_room = models.GameRoom(
+        room_id=f'{rng.getrandbits(128):032x}',
+        game=models.Game(
+            state=models.STATES['SUBMITRESULTS'],
+            answerer_id=answerer_id,
+            asker_id=asker_id,
+            round_=models.Round(
+                subject=subject,
+                guess_and_answer=models.GuessAndAnswer(
+                    guess=models.Guess(
+                        asker_id=asker_id,
+                        guess_text=rng.choice(WORDS['noun'])),
+                    guess_answer=models.GuessAnswer(
+                        answerer_id=answerer_id,
+                        correct=rng.random() < 0.5)),
+                question_and_answers=[
+                    models.QuestionAndAnswer(
+                        question=models.Question(
+                            asker_id=asker_id,
+                            question_text=_question(rng)),
+                        answer=models.Answer(
+                            answerer_id=answerer_id,
+                            answer_value=rng.choice(ANSWER_VALUES)))
+                    for _ in range(models.MAXQUESTIONS)
+                ])),
+        player_ids=[answerer_id, asker_id])
+
+    return json.dumps(game_room.to_dict())
+
+
+def _rows(rng, subjects, seen):
+    """Return the rows shown in a HIT that labels questions.
+
+    The rows have every attribute the HITs use, formatted the way the
+    HIT templates render them into the form. Like the blocks written by
+    groupbysubject, the rows share a subject, until its questions run
+    out. Each row's subject, question, and answer is distinct from those
+    in ``seen``, since the extractors expect every triple to be labeled
+    by exactly one HIT, and is added to it.
+    """
+    subject = rng.choice(subjects)
+    rows = []
+    num_collisions = 0
+    while len(rows) < ROWS_PER_HIT:
+        question = _question(rng)
+        answer = rng.choice(ANSWER_VALUES)
+        if (subject, question, answer) in seen:
+            num_collisions += 1
+            if num_collisions > MAX_COLLISIONS:
+                subject = rng.choice(subjects)
+                num_collisions = 0
+            continue
+        seen.add((subject, question, answer))
+
+        quality_labels = [
+            'good' if rng.random() < GOOD_QUALITY_RATE
+            else rng.choice(QUALITIES[1:])
+            for _ in range(3)
+        ]
+        score = quality_labels.count('good')
+        labels = [rng.choice(LABELS) for _ in range(3)]
+        true_votes = sum(
+            label in ['always', 'usually', 'sometimes']
+            for label in labels)
+        rows.append({
+            'subject': subject,
+            'question': question,
+            'answer': answer,
+            'quality_labels': repr(quality_labels),
+            'score': str(score),
+            'high_quality': str(score >= 2),
+            'labels': repr(labels),
+            'is_bad': str(labels.count('bad') >= 2),
+            'true_votes': str(true_votes),
+            'majority': str(int(true_votes >= 2))
+        })
+
+    return rows
+
+
+def _answers(rng, hit_type, rows):
+    """Return a worker's form data for a HIT showing ``rows``."""
+    answers = {}
+    for i, row in enumerate(rows):
+        if hit_type == 'questions-quality-control':
+            attributes = ['subject', 'question', 'answer']
+        elif hit_type in ['question-labeling', 'commonsense-types']:
+            attributes = [
+                'subject', 'question', 'answer',
+                'quality_labels', 'score', 'high_quality'
+            ]
+        elif hit_type == 'mirror-subjects':
+            attributes = [
+                'subject', 'question', 'answer',
+                'quality_labels', 'score', 'high_quality',
+                'labels', 'is_bad', 'true_votes', 'majority'
+            ]
+        else:
+            raise ValueError(f'Unrecognized HIT type: {hit_type}.')
+
+        for attribute in attributes:
+            answers[f'{attribute}-{i}'] = row[attribute]
+
+        if hit_type == 'questions-quality-control':
+            answers[f'quality-{i}'] = (
+                'good' if rng.random() < GOOD_QUALITY_RATE
+                else rng.choice(QUALITIES[1:])
+            )
+        elif hit_type == 'question-labeling':
+            answers[f'label-{i}'] = rng.choice(LABELS)
+        elif hit_type == 'commonsense-types':
+            # unchecked checkboxes aren't submitted
+            for type_ in TYPES:
+                if rng.random() < TYPE_RATE:
+                    answers[f'{type_}-{i}'] = '1'
+        elif hit_type == 'mirror-subjects':
+            answers[f'new_subject-{i}'] = rng.choice(WORDS['noun'])
+
+    return answers
+
+
+# main functions
+
+def write_batch(hit_type, xml_dir, num_hits, seed=0):
+    """Write a synthetic AMTI XML directory for a batch of HITs.
+
+    Parameters
+    ----------
+    hit_type : str
+        The HIT type, one of ``HIT_TYPES``.
+    xml_dir : str
+        The directory to write the XML files to. It's created if it
+        doesn't exist.
+    num_hits : int
+        The number of HITs in the batch. Each HIT gets as many
+        assignments as its ``hitproperties.json`` allows, except for
+        ``twenty-questions``, where each HIT is a game submitted by both
+        of its players.
+    seed : int, optional (default=0)
+        The random seed.
+
+    Returns
+    -------
+    int
+        The number of assignments written.
+    """
+    if hit_type not in HIT_TYPES:
+        raise ValueError(f'Unrecognized HIT type: {hit_type}.')
+
+    rng = random.Random(seed)
+
+    with open(settings.SUBJECTS_FILE_PATH, 'r') as subjects_file:
+        subjects = [ln.strip().lower() for ln in subjects_file]
+    worker_ids = [
+        'A' + _random_id(rng, 13) for _ in range(NUM_WORKERS)]
+
+    num_assignments = (
+        PLAYERS_PER_GAME
+        if hit_type == 'twenty-questions'
+        else _max_assignments(hit_type)
+    )
+
+    os.makedirs(xml_dir, exist_ok=True)
+    seen = set()
+    num_written = 0
+    for _ in range(num_hits):
+        hit_id = _random_id(rng, 30)
+
+        if hit_type == 'twenty-questions':
+            game_room_json = _game_room_json(rng, rng.choice(subjects))
+        else:
+            rows = _rows(rng, subjects, seen)
+
+        for worker_id in rng.sample(worker_ids, num_assignments):
+            if hit_type == 'twenty-questions':
+                answers = {'gameRoomJson': game_room_json}
+            else:
+                answers = _answers(rng, hit_type, rows)
+
+            assignment_id = _random_id(rng, 30)
+            xml_path = os.path.join(xml_dir, f'{assignment_id}.xml')
+            with open(xml_path, 'w') as xml_file:
+                xml_file.write(_assignment_xml(
+                    assignment_id=assignment_id,
+                    worker_id=worker_id,
+                    hit_id=hit_id,
+                    answers=answers))
+            num_written += 1
+
+    logger.info(
+        f'Wrote {num_written} {hit_type} assignments to {xml_dir}.')
+
+    return num_written
+
+
+# main function
+
+@click.command(
+    context_settings={
+        'help_option_names': ['-h', '--help']
+    })
+@click.argument(
+    'hit_type',
+    type=click.Choice(HIT_TYPES))
+@click.argument(
+    'xml_dir',
+    type=click.Path(exists=False, file_okay=False, dir_okay=True))
+@click.option(
+    '--num-hits',
+    type=click.IntRange(min=1),
+    default=1000,
+    help='The number of HITs in the batch.')
+@click.option(
+    '--seed',
+    type=int,
+    default=0,
+    help='The random seed.')
+def synthetic_batch(hit_type, xml_dir, num_hits, seed):
+    """Write a synthetic batch of HIT_TYPE results to XML_DIR.
+
+    Write an XML directory like the ones AMTI extracts from MTurk, with
+    one file per assignment, for a batch of --num-hits HITs of
+    HIT_TYPE. The form data uses the same question identifiers as the
+    HIT definitions in mturk-definitions/, with the attribute-idx
+    encoding for the labeling HITs and a gameRoomJson payload for
+    twenty-questions, so the batch can be read by the matching extract
+    command.
+    """
+    num_assignments = write_batch(
+        hit_type=hit_type,
+        xml_dir=xml_dir,
+        num_hits=num_hits,
+        seed=seed)
+
+    click.echo(f'Wrote {num_assignments} assignments to {xml_dir}.')
+
+
+if __name__ == '__main__':
+    synthetic_batch()
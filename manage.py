@@ -1,19 +1,114 @@
 """Management commands for twentyquestions."""
 
+import importlib
 import logging
 import sys
 
 import click
 
-import scripts
-
 
 logger = logging.getLogger(__name__)
 
 LOG_FORMAT = '%(asctime)s:%(levelname)s:%(name)s:%(message)s'
 
+# the subcommands, each defined in the module of the same name in
+# ``scripts``, and their short help for ``manage.py --help``. Keep the
+# short help in sync with the first sentence of each command's
+# docstring.
+SUBCOMMANDS = {
+    'build': 'Build twentyquestions.',
+    'buildindex': 'Build offset indexes for DATA_PATHS.',
+    'create_splits':
+        'Write splits for the 20Qs data at DATA_PATH to OUTPUT_DIR.',
+    'deploy': 'Deploy twentyquestions to ENV.',
+    'dockerize': 'Create the docker image for running twentyquestions.',
+    'extractgames': 'Extract games from XML_DIR and write to OUTPUT_PATH.',
+    'extractlabels':
+        'Extract labeling data from XML_DIR and write to OUTPUT_PATH.',
+    'extractmirrorsubjects':
+        'Extract mirror subjects from XML_DIR and write to OUTPUT_PATH.',
+    'extractquality':
+        'Extract quality labels from XML_DIR and write to OUTPUT_PATH.',
+    'extractquestions':
+        'Extract questions from XML_DIR and write to OUTPUT_PATH.',
+    'extracttypes':
+        'Extract commonsense types from XML_DIR and write to OUTPUT_PATH.',
+    'groupbysubject': 'Group the data in blocks of at most 20 by subject.',
+    'loaddb': 'Load DATA_PATHS into DATASET in the database at DB_PATH.',
+    'loadtest': 'Load test the twentyquestions server at URL.',
+    'lookup': 'Look up rows in DATA_PATH and write them to OUTPUT_PATH.',
+    'promote': 'Promote the docker image from SOURCE to DEST.',
+    'query': 'Query the database at DB_PATH and write to OUTPUT_PATH.',
+    'replay': 'Replay the socket events in TRACE_PATH.',
+    'serve': 'Serve twentyquestions on port 5000.'
+}
+
+
+class LazyGroup(click.Group):
+    """A click group that imports subcommands only when they're used.
+
+    Importing every subcommand up front would import all of their
+    dependencies (e.g. flask and eventlet for ``serve``) just to run
+    one of them, so instead each subcommand's module is imported the
+    first time the subcommand is looked up. The group's help lists the
+    subcommands with their stored short help, so it doesn't import any
+    of them.
+    """
+
+    def __init__(self, *args, lazy_subcommands=None, **kwargs):
+        """Create a new instance.
+
+        Parameters
+        ----------
+        lazy_subcommands : Optional[Dict[str, str]], optional
+            (default=None)
+            A dictionary mapping the names of the subcommands to load
+            lazily to their short help. The subcommand ``name`` is the
+            attribute ``name`` of ``scripts.name``.
+        *args, **kwargs
+            Passed through to ``click.Group``.
+
+        Returns
+        -------
+        LazyGroup
+            The new instance.
+        """
+        super().__init__(*args, **kwargs)
+
+        self.lazy_subcommands = lazy_subcommands or {}
+
+    def list_commands(self, ctx):
+        """See ``click.Group``."""
+        return sorted(
+            set(super().list_commands(ctx)) | set(self.lazy_subcommands))
+
+    def get_command(self, ctx, cmd_name):
+        """See ``click.Group``."""
+        if cmd_name in self.lazy_subcommands \
+                and cmd_name not in self.commands:
+            module = importlib.import_module(f'scripts.{cmd_name}')
+            self.add_command(getattr(module, cmd_name))
+
+        return super().get_command(ctx, cmd_name)
+
+    def format_commands(self, ctx, formatter):
+        """See ``click.MultiCommand``."""
+        rows = []
+        for subcommand in self.list_commands(ctx):
+            if subcommand in self.commands:
+                help = self.commands[subcommand].short_help or ''
+            else:
+                help = self.lazy_subcommands[subcommand]
+            rows.append((subcommand, help))
+
+        if len(rows) > 0:
+            with formatter.section('Commands'):
+                formatter.write_dl(rows)
+
 
 @click.group(
+    cls=LazyGroup,
+    lazy_subcommands=SUBCOMMANDS,
     context_settings={
         'help_option_names': ['-h', '--help']
     })
@@ -42,25 +137,5 @@ def manage(verbose, log_file):
             level=log_level)
 
 
-subcommands = [
-    scripts.build,
-    scripts.create_splits,
-    scripts.deploy,
-    scripts.dockerize,
-    scripts.extractgames,
-    scripts.extractlabels,
-    scripts.extractmirrorsubjects,
-    scripts.extractquality,
-    scripts.extractquestions,
-    scripts.extracttypes,
-    scripts.groupbysubject,
-    scripts.promote,
-    scripts.serve
-]
-
-for subcommand in subcommands:
-    manage.add_command(subcommand)
-
-
 if __name__ == '__main__':
     manage()
@@ -1,15 +1,7 @@
-"""Scripts for automating development and admin tasks."""
+"""Scripts for automating development and admin tasks.
 
-from scripts.build import build
-from scripts.create_splits import create_splits
-from scripts.deploy import deploy
-from scripts.dockerize import dockerize
-from scripts.extractgames import extractgames
-from scripts.extractlabels import extractlabels
-from scripts.extractmirrorsubjects import extractmirrorsubjects
-from scripts.extractquality import extractquality
-from scripts.extractquestions import extractquestions
-from scripts.extracttypes import extracttypes
-from scripts.groupbysubject import groupbysubject
-from scripts.promote import promote
-from scripts.serve import serve
+Each command lives in the module of the same name, e.g.
+``scripts.extractquestions.extractquestions``. The modules aren't
+imported here, so that running one command doesn't import the
+dependencies of all the others.
+"""
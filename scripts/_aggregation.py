@@ -0,0 +1,244 @@
+"""Label aggregation for twentyquestions' scripts."""
+
+import logging
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+
+# constants
+
+MAX_ITERATIONS = 50
+TOLERANCE = 1e-3
+# the pseudo-counts of the Dirichlet prior on each row of a worker's
+# confusion matrix: every label gets PRIOR_COUNT, and the labels that
+# vote for the row's class get DIAGONAL_PRIOR_COUNT more, so workers
+# are assumed to be somewhat reliable until their votes say otherwise
+PRIOR_COUNT = 2.
+DIAGONAL_PRIOR_COUNT = 2.
+
+
+# main functions
+
+def dawid_skene(
+        item_idxs,
+        worker_idxs,
+        label_idxs,
+        label_to_class,
+        max_iterations=MAX_ITERATIONS,
+        tolerance=TOLERANCE,
+        prior_count=PRIOR_COUNT,
+        diagonal_prior_count=DIAGONAL_PRIOR_COUNT):
+    """Return posterior class probabilities for items using Dawid-Skene.
+
+    Estimate a confusion matrix for each worker, giving the probability
+    that the worker uses each label when the item belongs to each
+    class, and use those confusion matrices to compute the posterior
+    probability of each class for each item. The posteriors are
+    initialized from majority vote and then refined with expectation
+    maximization until they stop changing. All votes are processed as
+    flat arrays, so each iteration costs a handful of passes over the
+    votes regardless of how many items or workers there are.
+
+    Parameters
+    ----------
+    item_idxs : Sequence[int]
+        The index of the item for each vote. Indices must run from 0 to
+        the number of items minus 1.
+    worker_idxs : Sequence[int]
+        The index of the worker for each vote. Indices must run from 0
+        to the number of workers minus 1.
+    label_idxs : Sequence[int]
+        The index of the label for each vote, i.e. the index into
+        ``label_to_class``.
+    label_to_class : Sequence[int]
+        A sequence mapping each label index to the class that the label
+        votes for. This mapping is only used to initialize the
+        posteriors with majority vote.
+    max_iterations : int, optional (default=MAX_ITERATIONS)
+        The maximum number of EM iterations to run.
+    tolerance : float, optional (default=TOLERANCE)
+        Stop once no posterior changes by more than ``tolerance``
+        between iterations.
+    prior_count : float, optional (default=PRIOR_COUNT)
+        A pseudo-count added to every cell of each worker's confusion
+        matrix, so workers with few votes don't get degenerate
+        estimates.
+    diagonal_prior_count : float, optional
+        (default=DIAGONAL_PRIOR_COUNT)
+        A pseudo-count added to the cells of each worker's confusion
+        matrix where the label votes for the class.
+
+    Returns
+    -------
+    np.ndarray
+        An array with shape ``(num_items, num_classes)`` giving the
+        posterior probability of each class for each item.
+    """
+    item_idxs = np.asarray(item_idxs, dtype=np.int64)
+    worker_idxs = np.asarray(worker_idxs, dtype=np.int64)
+    label_idxs = np.asarray(label_idxs, dtype=np.int64)
+    label_to_class = np.asarray(label_to_class, dtype=np.int64)
+
+    num_labels = len(label_to_class)
+    num_classes = int(label_to_class.max()) + 1
+
+    if len(item_idxs) == 0:
+        return np.zeros((0, num_classes))
+
+    num_items = int(item_idxs.max()) + 1
+    num_workers = int(worker_idxs.max()) + 1
+
+    # initialize the posteriors with (soft) majority vote
+    vote_classes = label_to_class[label_idxs]
+    posteriors = np.zeros((num_items, num_classes))
+    for class_ in range(num_classes):
+        posteriors[:, class_] = np.bincount(
+            item_idxs,
+            weights=(vote_classes == class_).astype(np.float64),
+            minlength=num_items)
+    # items without votes (gaps in the item indices) start uniform, and
+    # end up with the class priors
+    has_votes = posteriors.sum(axis=1) > 0
+    posteriors[~has_votes] = 1. / num_classes
+    posteriors /= posteriors.sum(axis=1, keepdims=True)
+
+    # the Dirichlet prior on each row of the confusion matrices
+    prior = np.full((num_classes, num_labels), prior_count)
+    prior[label_to_class, np.arange(num_labels)] += diagonal_prior_count
+
+    # each (worker, label) pair gets a single flat index so that the
+    # confusion matrices can be accumulated with ``np.bincount``.
+    worker_label_idxs = worker_idxs * num_labels + label_idxs
+
+    for iteration in range(max_iterations):
+        # M-step: estimate the class priors and confusion matrices
+
+        priors = posteriors[has_votes].sum(axis=0) + prior_count
+        priors /= priors.sum()
+        # confusions[w, k, l] : P(worker w uses label l | class k)
+        confusions = np.empty((num_workers, num_classes, num_labels))
+        for class_ in range(num_classes):
+            confusions[:, class_, :] = np.bincount(
+                worker_label_idxs,
+                weights=posteriors[item_idxs, class_],
+                minlength=num_workers * num_labels
+            ).reshape(num_workers, num_labels)
+        confusions += prior
+        confusions /= confusions.sum(axis=2, keepdims=True)
+
+        # E-step: recompute the posteriors in log space
+
+        log_confusions = np.log(confusions)
+        log_posteriors = np.empty((num_items, num_classes))
+        for class_ in range(num_classes):
+            log_posteriors[:, class_] = np.bincount(
+                item_idxs,
+                weights=log_confusions[worker_idxs, class_, label_idxs],
+                minlength=num_items)
+        log_posteriors += np.log(priors)
+        log_posteriors -= log_posteriors.max(axis=1, keepdims=True)
+
+        new_posteriors = np.exp(log_posteriors)
+        new_posteriors /= new_posteriors.sum(axis=1, keepdims=True)
+
+        change = np.abs(new_posteriors - posteriors).max()
+        posteriors = new_posteriors
+
+        logger.debug(
+            f'Dawid-Skene iteration {iteration}: max change {change}.')
+
+        if change < tolerance:
+            logger.info(
+                f'Dawid-Skene converged after {iteration + 1} iterations.')
+            break
+    else:
+        logger.warning(
+            f'Dawid-Skene did not converge after {max_iterations}'
+            f' iterations.')
+
+    return posteriors
+
+
+def index(values):
+    """Return integer indices for ``values`` and the index mapping.
+
+    Parameters
+    ----------
+    values : Iterable[Hashable]
+        The values to index.
+
+    Returns
+    -------
+    Tuple[List[int], Dict[Hashable, int]]
+        A list giving the index of each value in ``values`` and a
+        dictionary mapping each distinct value to its index. Indices are
+        assigned in order of first appearance.
+    """
+    value_to_idx = {}
+    idxs = [
+        value_to_idx.setdefault(value, len(value_to_idx))
+        for value in values
+    ]
+    return idxs, value_to_idx
+
+
+def estimate_probabilities(key_to_labels, key_to_worker_ids, label_to_bit):
+    """Return a dict mapping keys to the probability they're true.
+
+    Index the workers, then run ``dawid_skene`` with two classes: 0 for
+    false and 1 for true. Each label is replaced by the class it votes
+    for before fitting, so each worker's confusion matrix is 2x2. With
+    only a few dozen votes per worker, confusion matrices over every
+    label overfit, giving confident probabilities even when the labels
+    are random.
+
+    Parameters
+    ----------
+    key_to_labels : Dict[tuple, List[str]]
+        A dictionary mapping each instance's key to its labels.
+    key_to_worker_ids : Dict[tuple, List[Optional[str]]]
+        A dictionary mapping each instance's key to the IDs of the
+        workers who gave each of its labels. Labels without a worker ID
+        are pooled as a single worker.
+    label_to_bit : Dict[str, int]
+        A dictionary mapping each label to 1 if it votes that the
+        instance is true, and 0 otherwise.
+
+    Returns
+    -------
+    Dict[tuple, float]
+        A dictionary mapping each instance's key to the posterior
+        probability that it's true.
+    """
+    keys = list(key_to_labels.keys())
+
+    item_idxs = []
+    worker_ids = []
+    label_idxs = []
+    for item_idx, key in enumerate(keys):
+        for label, worker_id in zip(
+                key_to_labels[key], key_to_worker_ids[key]):
+            item_idxs.append(item_idx)
+            worker_ids.append(worker_id)
+            label_idxs.append(label_to_bit[label])
+
+    if None in worker_ids:
+        logger.warning(
+            'Some labels have no worker ID. Pooling them as a single'
+            ' worker.')
+
+    worker_idxs, _ = index(worker_ids)
+
+    posteriors = dawid_skene(
+        item_idxs=item_idxs,
+        worker_idxs=worker_idxs,
+        label_idxs=label_idxs,
+        label_to_class=[0, 1])
+
+    return {
+        key: float(probability)
+        for key, probability in zip(keys, posteriors[:, 1])
+    }
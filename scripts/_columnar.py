@@ -0,0 +1,332 @@
+"""A columnar format for the twentyquestions dataset.
+
+A columnar dataset is a directory with a ``columns.json`` file
+describing the columns and a few ``.npy`` files per column. Integer and
+boolean columns are stored as arrays directly. String columns, and any
+other values (serialized as JSON), are dictionary-encoded: each row
+stores an integer code into a dictionary of the distinct values, and
+the dictionary stores the values as UTF-8 bytes concatenated together
+with an array of offsets. Since every file is a plain array,
+``load`` memory maps them instead of parsing anything.
+"""
+
+import array
+import json
+import logging
+import os
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+
+# constants
+
+METADATA_FILE_NAME = 'columns.json'
+
+KINDS = {
+    'bool': 'bool',
+    'int': 'int',
+    'dictionary': 'dictionary',
+    'json': 'json'
+}
+
+
+# helper functions
+
+def _kind(value):
+    """Return the kind of column for storing ``value``."""
+    # check bool before int since bool is a subclass of int
+    if isinstance(value, bool):
+        return KINDS['bool']
+    elif isinstance(value, int):
+        return KINDS['int']
+    elif value is None or isinstance(value, str):
+        return KINDS['dictionary']
+    else:
+        return KINDS['json']
+
+
+def _fits(value, kind):
+    """Return whether ``value`` can be stored in a column of ``kind``."""
+    if kind == KINDS['json']:
+        return True
+    return _kind(value) == kind
+
+
+# main classes
+
+class StringDictionary(object):
+    """The distinct values of a dictionary-encoded column."""
+
+    def __init__(self, values, offsets):
+        """Create a new instance.
+
+        Parameters
+        ----------
+        values : np.ndarray
+            A uint8 array of the UTF-8 encoded strings, concatenated.
+        offsets : np.ndarray
+            An int64 array with one more element than there are strings,
+            where the i'th string is ``values[offsets[i]:offsets[i+1]]``.
+
+        Returns
+        -------
+        StringDictionary
+            The new instance.
+        """
+        self.values = values
+        self.offsets = offsets
+
+    def __len__(self):
+        """Return the number of strings in the dictionary."""
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        """Return the i'th string in the dictionary."""
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return self.values[start:end].tobytes().decode('utf-8')
+
+
+class DictionaryColumn(object):
+    """A dictionary-encoded column."""
+
+    def __init__(self, codes, dictionary, is_json):
+        """Create a new instance.
+
+        Parameters
+        ----------
+        codes : np.ndarray
+            An int32 array giving the index into ``dictionary`` for each
+            row, or -1 if the row's value is ``None``.
+        dictionary : StringDictionary
+            The distinct values in the column.
+        is_json : bool
+            Whether the values in the dictionary are serialized as JSON.
+
+        Returns
+        -------
+        DictionaryColumn
+            The new instance.
+        """
+        self.codes = codes
+        self.dictionary = dictionary
+        self.is_json = is_json
+
+    def __len__(self):
+        """Return the number of rows in the column."""
+        return len(self.codes)
+
+    def __getitem__(self, i):
+        """Return the value for the i'th row."""
+        code = self.codes[i]
+        if code == -1:
+            return None
+
+        value = self.dictionary[code]
+        if self.is_json:
+            value = json.loads(value)
+
+        return value
+
+
+class ColumnarWriter(object):
+    """A class for writing rows to a columnar dataset.
+
+    Rows are added one at a time with ``add``, and ``close`` writes the
+    dataset to disk. Only the dictionaries of distinct values and a few
+    bytes per row are held in memory. The columns, and their kinds, are
+    determined by the first row. If a later row has a value that doesn't
+    fit its column's kind (e.g. an integer in a boolean column, or
+    ``None`` in an integer column), then the column is widened to JSON,
+    which can hold any value, so no value is ever changed.
+    """
+
+    def __init__(self, path):
+        """Create a new instance.
+
+        Parameters
+        ----------
+        path : str
+            The directory to write the dataset to. It's created if it
+            doesn't exist.
+
+        Returns
+        -------
+        ColumnarWriter
+            The new instance.
+        """
+        self.path = path
+
+        self._num_rows = 0
+        self._kinds = None
+        self._columns = None
+        self._dictionaries = None
+
+    def _widen(self, attribute):
+        """Widen the column for ``attribute`` to a JSON column."""
+        kind = self._kinds[attribute]
+
+        logger.warning(
+            f'Row {self._num_rows} has a value for {attribute} that'
+            f' does not fit its {kind} column. Widening the column to'
+            f' JSON.')
+
+        if kind in [KINDS['bool'], KINDS['int']]:
+            to_value = bool if kind == KINDS['bool'] else int
+            dictionary = {}
+            codes = array.array('l')
+            for value in self._columns[attribute]:
+                codes.append(
+                    dictionary.setdefault(
+                        json.dumps(to_value(value)), len(dictionary)))
+            self._columns[attribute] = codes
+        else:
+            # serializing distinct strings gives distinct JSON, so the
+            # codes stay the same
+            dictionary = {
+                json.dumps(value): code
+                for value, code in self._dictionaries[attribute].items()
+            }
+
+        self._kinds[attribute] = KINDS['json']
+        self._dictionaries[attribute] = dictionary
+
+    def add(self, row):
+        """Add ``row`` to the dataset.
+
+        Parameters
+        ----------
+        row : Dict[str, Any]
+            The row to add.
+        """
+        if self._kinds is None:
+            self._kinds = {
+                attribute: _kind(value)
+                for attribute, value in row.items()
+            }
+            self._columns = {
+                attribute: array.array(
+                    'b' if kind == KINDS['bool']
+                    else 'q' if kind == KINDS['int']
+                    else 'l')
+                for attribute, kind in self._kinds.items()
+            }
+            self._dictionaries = {
+                attribute: {}
+                for attribute, kind in self._kinds.items()
+                if kind in [KINDS['dictionary'], KINDS['json']]
+            }
+
+        if row.keys() != self._kinds.keys():
+            raise ValueError(
+                f'Row {self._num_rows} has attributes {list(row.keys())}'
+                f' but expected {list(self._kinds.keys())}.')
+
+        for attribute, value in row.items():
+            if not _fits(value, self._kinds[attribute]):
+                self._widen(attribute)
+
+            kind = self._kinds[attribute]
+            if kind in [KINDS['bool'], KINDS['int']]:
+                self._columns[attribute].append(value)
+            elif value is None:
+                self._columns[attribute].append(-1)
+            else:
+                if kind == KINDS['json']:
+                    value = json.dumps(value)
+                dictionary = self._dictionaries[attribute]
+                self._columns[attribute].append(
+                    dictionary.setdefault(value, len(dictionary)))
+
+        self._num_rows += 1
+
+    def close(self):
+        """Write the dataset to disk."""
+        os.makedirs(self.path, exist_ok=True)
+
+        kinds = self._kinds or {}
+        for attribute, kind in kinds.items():
+            column = self._columns[attribute]
+            if kind == KINDS['bool']:
+                np.save(
+                    os.path.join(self.path, f'{attribute}.npy'),
+                    np.array(column, dtype=bool))
+            elif kind == KINDS['int']:
+                np.save(
+                    os.path.join(self.path, f'{attribute}.npy'),
+                    np.array(column, dtype=np.int64))
+            else:
+                encoded = [
+                    value.encode('utf-8')
+                    for value in self._dictionaries[attribute]
+                ]
+                offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+                np.cumsum([len(e) for e in encoded], out=offsets[1:])
+                np.save(
+                    os.path.join(self.path, f'{attribute}.codes.npy'),
+                    np.array(column, dtype=np.int32))
+                np.save(
+                    os.path.join(self.path, f'{attribute}.values.npy'),
+                    np.frombuffer(b''.join(encoded), dtype=np.uint8))
+                np.save(
+                    os.path.join(self.path, f'{attribute}.offsets.npy'),
+                    offsets)
+
+        metadata = {
+            'num_rows': self._num_rows,
+            'columns': [
+                {'name': attribute, 'kind': kind}
+                for attribute, kind in kinds.items()
+            ]
+        }
+        with open(os.path.join(self.path, METADATA_FILE_NAME), 'w') \
+                as metadata_file:
+            json.dump(metadata, metadata_file)
+
+        logger.info(f'Wrote {self._num_rows} rows to {self.path}.')
+
+
+# main functions
+
+def load(path):
+    """Return the columns of the columnar dataset at ``path``.
+
+    The arrays are memory mapped, so loading is nearly instant and the
+    data is only read from disk as it's accessed.
+
+    Parameters
+    ----------
+    path : str
+        The directory containing the dataset.
+
+    Returns
+    -------
+    Dict[str, Union[np.ndarray, DictionaryColumn]]
+        A dictionary mapping each attribute to its column. Boolean and
+        integer columns are arrays, and all other columns are
+        ``DictionaryColumn`` instances.
+    """
+    with open(os.path.join(path, METADATA_FILE_NAME), 'r') \
+            as metadata_file:
+        metadata = json.load(metadata_file)
+
+    def load_array(file_name):
+        """Return the memory mapped array in ``file_name``."""
+        return np.load(os.path.join(path, file_name), mmap_mode='r')
+
+    columns = {}
+    for column in metadata['columns']:
+        name, kind = column['name'], column['kind']
+        if kind in [KINDS['bool'], KINDS['int']]:
+            columns[name] = load_array(f'{name}.npy')
+        else:
+            columns[name] = DictionaryColumn(
+                codes=load_array(f'{name}.codes.npy'),
+                dictionary=StringDictionary(
+                    values=load_array(f'{name}.values.npy'),
+                    offsets=load_array(f'{name}.offsets.npy')),
+                is_json=kind == KINDS['json'])
+
+    return columns
@@ -0,0 +1,192 @@
+"""A SQLite store for the datasets produced by twentyquestions' scripts."""
+
+import json
+import logging
+import os
+import sqlite3
+import urllib.request
+
+
+logger = logging.getLogger(__name__)
+
+
+# constants
+
+# the number of rows to insert at once
+BATCH_SIZE = 10000
+
+# the attributes stored in their own indexed columns. The full row is
+# always stored as JSON in the data column.
+KEY_ATTRIBUTES = ['subject', 'question', 'answer']
+
+SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS rows (
+        id INTEGER PRIMARY KEY,
+        dataset TEXT NOT NULL,
+        subject TEXT,
+        question TEXT,
+        answer TEXT,
+        data TEXT NOT NULL
+    )
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS rows_key
+    ON rows (dataset, subject, question, answer)
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS rows_question
+    ON rows (dataset, question)
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS rows_answer
+    ON rows (dataset, answer)
+    '''
+]
+
+
+# helper functions
+
+def _insert(connection, batch):
+    """Insert ``batch`` into the rows table without committing."""
+    connection.executemany(
+        'INSERT INTO rows (dataset, subject, question, answer, data)'
+        ' VALUES (?, ?, ?, ?, ?)',
+        batch)
+
+
+# main functions
+
+def connect(db_path, read_only=False):
+    """Return a connection to the database at ``db_path``.
+
+    The database is created if it doesn't exist, and is put in WAL mode
+    so that readers don't block on bulk loads.
+
+    Parameters
+    ----------
+    db_path : str
+        The path to the SQLite database.
+    read_only : bool, optional (default=False)
+        If ``True``, open the database read-only, so that any statement
+        that would modify it fails. The database must already exist.
+
+    Returns
+    -------
+    sqlite3.Connection
+        A connection to the database.
+    """
+    if read_only:
+        db_url = urllib.request.pathname2url(os.path.abspath(db_path))
+        return sqlite3.connect(f'file:{db_url}?mode=ro', uri=True)
+
+    connection = sqlite3.connect(db_path)
+    connection.execute('PRAGMA journal_mode = WAL')
+    connection.execute('PRAGMA synchronous = NORMAL')
+    with connection:
+        for statement in SCHEMA:
+            connection.execute(statement)
+
+    return connection
+
+
+def write(db_path, dataset, row_strs, replace=True, batch_size=BATCH_SIZE):
+    """Write ``row_strs`` to ``dataset`` in the database at ``db_path``.
+
+    Parameters
+    ----------
+    db_path : str
+        The path to the SQLite database.
+    dataset : str
+        The name of the dataset to write the rows to.
+    row_strs : Iterable[str]
+        The rows to write, each serialized as a JSON object.
+    replace : bool, optional (default=True)
+        If ``True``, replace any rows already in ``dataset``, otherwise
+        append to them. Rows are replaced in a single transaction, so
+        readers never see a partly replaced dataset, and the old rows
+        are kept if writing fails.
+    batch_size : int, optional (default=BATCH_SIZE)
+        The number of rows to insert at once. When appending, each
+        batch is committed in its own transaction.
+
+    Returns
+    -------
+    int
+        The number of rows written.
+    """
+    connection = connect(db_path)
+    try:
+        # the connection commits when the block exits, and rolls back
+        # whatever is uncommitted if it raises.
+        with connection:
+            if replace:
+                connection.execute(
+                    'DELETE FROM rows WHERE dataset = ?', (dataset,))
+
+            num_rows = 0
+            batch = []
+            for row_str in row_strs:
+                row = json.loads(row_str)
+                batch.append((
+                    dataset,
+                    *[row.get(attribute) for attribute in KEY_ATTRIBUTES],
+                    row_str
+                ))
+                if len(batch) == batch_size:
+                    _insert(connection, batch)
+                    if not replace:
+                        connection.commit()
+                    num_rows += len(batch)
+                    batch = []
+
+            if len(batch) > 0:
+                _insert(connection, batch)
+                num_rows += len(batch)
+    finally:
+        connection.close()
+
+    logger.info(f'Wrote {num_rows} rows to {dataset} in {db_path}.')
+
+    return num_rows
+
+
+def read(db_path, dataset, **key):
+    """Yield the rows from ``dataset`` in the database at ``db_path``.
+
+    Rows are yielded in the order they were written.
+
+    Parameters
+    ----------
+    db_path : str
+        The path to the SQLite database.
+    dataset : str
+        The name of the dataset to read.
+    **key : Dict[str, str]
+        Optional values for the attributes in ``KEY_ATTRIBUTES``. Only
+        rows matching all of them are yielded.
+
+    Returns
+    -------
+    Iterator[Dict[str, Any]]
+        The rows from the dataset.
+    """
+    for attribute in key:
+        if attribute not in KEY_ATTRIBUTES:
+            raise ValueError(
+                f'{attribute} is not one of {KEY_ATTRIBUTES}.')
+
+    conditions = ['dataset = ?'] + [
+        f'{attribute} = ?' for attribute in key
+    ]
+    connection = connect(db_path)
+    try:
+        cursor = connection.execute(
+            f'SELECT data FROM rows'
+            f' WHERE {" AND ".join(conditions)}'
+            f' ORDER BY id',
+            (dataset, *key.values()))
+        for (data,) in cursor:
+            yield json.loads(data)
+    finally:
+        connection.close()
@@ -0,0 +1,157 @@
+"""A persistent index of fingerprints for deduplicating across runs.
+
+The index is a ``.npy`` file holding a sorted array of 64 bit
+fingerprints. It's memory mapped and searched with binary search, so
+checking a key never reads more than a few pages of the file, and new
+fingerprints are merged in and the file atomically replaced on
+``save``.
+"""
+
+import array
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+
+# constants
+
+# the number of bytes in each fingerprint. With 8 bytes, the chance of
+# any collision among 10 million keys is about 1 in 400,000.
+DIGEST_SIZE = 8
+
+
+# helper functions
+
+def _file_mode(path):
+    """Return the permissions for a new version of the file at ``path``.
+
+    Existing files keep their permissions, and new files get the
+    permissions ``open`` would give them under the current umask.
+    """
+    if os.path.exists(path):
+        return os.stat(path).st_mode & 0o777
+
+    # the umask can only be read by setting it
+    umask = os.umask(0)
+    os.umask(umask)
+
+    return 0o666 & ~umask
+
+
+# main functions
+
+def fingerprint(key):
+    """Return the fingerprint for ``key``.
+
+    Parameters
+    ----------
+    key : Sequence[Any]
+        The key to fingerprint. It must be JSON serializable.
+
+    Returns
+    -------
+    int
+        The fingerprint of ``key``, as an unsigned 64 bit integer.
+    """
+    digest = hashlib.blake2b(
+        json.dumps(key).encode('utf-8'),
+        digest_size=DIGEST_SIZE
+    ).digest()
+    return int.from_bytes(digest, 'little')
+
+
+# main classes
+
+class FingerprintIndex(object):
+    """A persistent set of keys, stored as fingerprints.
+
+    Keys are checked against the fingerprints saved in the index file
+    with ``in``. Keys passed to ``add`` are held in memory, and aren't
+    visible to ``in`` until the index is saved with ``save`` and opened
+    again. That way, a run can check every key against the previous
+    runs, and only record its own keys once it has succeeded.
+    """
+
+    def __init__(self, path):
+        """Create a new instance.
+
+        Parameters
+        ----------
+        path : str
+            The path to the index file. If it doesn't exist, the index
+            starts out empty and is created by ``save``.
+
+        Returns
+        -------
+        FingerprintIndex
+            The new instance.
+        """
+        self.path = path
+
+        if os.path.exists(path):
+            self._fingerprints = np.load(path, mmap_mode='r')
+        else:
+            self._fingerprints = np.zeros(0, dtype=np.uint64)
+        self._new_fingerprints = array.array('Q')
+
+    def __len__(self):
+        """Return the number of fingerprints saved in the index."""
+        return len(self._fingerprints)
+
+    def __contains__(self, key):
+        """Return whether ``key`` is saved in the index."""
+        value = np.uint64(fingerprint(key))
+        i = np.searchsorted(self._fingerprints, value)
+        return (
+            i < len(self._fingerprints)
+            and self._fingerprints[i] == value
+        )
+
+    def add(self, key):
+        """Add ``key`` to the index the next time it's saved.
+
+        Parameters
+        ----------
+        key : Sequence[Any]
+            The key to add. It must be JSON serializable.
+        """
+        self._new_fingerprints.append(fingerprint(key))
+
+    def save(self):
+        """Merge the added keys into the index and save it to disk.
+
+        The index file is replaced atomically, so it's never left
+        partially written. It keeps its permissions if it already
+        exists, otherwise it's created with the permissions allowed by
+        the umask, like any other file.
+        """
+        fingerprints = np.union1d(
+            self._fingerprints,
+            np.array(self._new_fingerprints, dtype=np.uint64))
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        mode = _file_mode(self.path)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.npy')
+        try:
+            with os.fdopen(fd, 'wb') as tmp_file:
+                np.save(tmp_file, fingerprints)
+            # mkstemp creates the file readable only by its owner
+            os.chmod(tmp_path, mode)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+        logger.info(
+            f'Saved {len(fingerprints) - len(self._fingerprints)} new'
+            f' fingerprints to {self.path}.')
+
+        self._fingerprints = np.load(self.path, mmap_mode='r')
+        self._new_fingerprints = array.array('Q')
@@ -0,0 +1,415 @@
+"""Simulated clients for load testing the twentyquestions server."""
+
+import logging
+import queue
+import random
+import threading
+import time
+import uuid
+
+from backend import models
+
+
+logger = logging.getLogger(__name__)
+
+
+# constants
+
+# how long to wait for the server to update a client before checking
+# whether the load test is over, in seconds
+POLL_INTERVAL = 0.5
+
+ANSWER_VALUES = [
+    'always',
+    'usually',
+    'sometimes',
+    'rarely',
+    'never',
+    'irrelevant'
+]
+
+
+# helper functions
+
+def _has_status(*statuses):
+    """Return a predicate for replies where the player has a status.
+
+    Parameters
+    ----------
+    *statuses : str
+        The player statuses to accept.
+
+    Returns
+    -------
+    Callable[[Dict], bool]
+        A function returning whether a ``setClientState`` message has
+        the player in one of ``statuses``.
+    """
+    def is_reply(message):
+        return message['player']['status'] in statuses
+
+    return is_reply
+
+
+def _has_game(game):
+    """Return a predicate for replies where the game has reached ``game``.
+
+    Parameters
+    ----------
+    game : Dict
+        The game sent to the server.
+
+    Returns
+    -------
+    Callable[[Dict], bool]
+        A function returning whether a ``setClientState`` message has
+        the game in the same state, with the same number of questions,
+        as ``game``.
+    """
+    progress = (game['state'], len(game['round']['questionAndAnswers']))
+
+    def is_reply(message):
+        game_room = message['gameRoom']
+        if game_room is None:
+            return False
+
+        reply_game = game_room['game']
+        return progress == (
+            reply_game['state'],
+            len(reply_game['round']['questionAndAnswers']))
+
+    return is_reply
+
+
+def _any_message(message):
+    """Return ``True``, accepting any message as the reply."""
+    return True
+
+
+# main classes
+
+class SimulatedClient(threading.Thread):
+    """A thread that plays games of 20 Questions against the server.
+
+    The client speaks the same Socket.IO protocol as the frontend: it
+    joins the server with ``joinServer``, moves itself through the
+    player statuses with ``takePlayerAction``, and plays each round
+    with ``setServerGameState``, reacting to the ``setClientState``
+    updates from the server. Between actions it waits a random think
+    time, and with some probability it drops its connection and
+    reconnects instead of acting.
+
+    After the thread finishes, its measurements are available as
+    attributes: ``num_sent`` and ``num_received`` count the events,
+    ``latencies`` holds the time from each event that expects a reply
+    to the ``setClientState`` that reflects it, ``match_times`` holds
+    the time from finishing the instructions to being ready to play, and
+    ``num_games_finished``, ``num_reconnects``, and ``num_errors``
+    count what happened.
+    """
+
+    def __init__(
+            self,
+            url,
+            num_games,
+            think_time,
+            disconnect_rate,
+            deadline):
+        """Create a new instance.
+
+        Parameters
+        ----------
+        url : str
+            The URL of the server.
+        num_games : int
+            The number of games to play before stopping.
+        think_time : float
+            The mean number of seconds to wait before each action. Think
+            times are drawn from an exponential distribution.
+        disconnect_rate : float
+            The probability of disconnecting and reconnecting before
+            each action.
+        deadline : float
+            The time (from ``time.monotonic``) at which to stop, even if
+            the games aren't finished.
+
+        Returns
+        -------
+        SimulatedClient
+            The new instance.
+        """
+        super().__init__(daemon=True)
+
+        self.url = url
+        self.num_games = num_games
+        self.think_time = think_time
+        self.disconnect_rate = disconnect_rate
+        self.deadline = deadline
+
+        self.num_sent = 0
+        self.num_received = 0
+        self.latencies = []
+        self.match_times = []
+        self.num_games_finished = 0
+        self.num_reconnects = 0
+        self.num_errors = 0
+
+        self._worker_id = None
+        self._messages = queue.Queue()
+        # the time the event awaiting a reply was sent, and a predicate
+        # recognizing its reply, so that updates caused by the partner
+        # aren't counted as replies. The socket client calls
+        # ``_on_set_client_state`` from its own thread, so access to
+        # them is guarded by the lock.
+        self._lock = threading.Lock()
+        self._sent_at = None
+        self._is_reply = None
+        self._waiting_since = None
+        self._socket = None
+
+    # helper methods
+
+    def _connect(self):
+        """Connect to the server and join it."""
+        # import socketio here, since it's only needed for load testing
+        import socketio
+
+        self._socket = socketio.Client(reconnection=False)
+        self._socket.on('setClientState', self._on_set_client_state)
+        self._socket.connect(self.url)
+        self._emit(
+            'joinServer',
+            {'workerId': self._worker_id},
+            is_reply=_any_message)
+
+    def _reconnect(self):
+        """Drop the connection and reconnect, like a flaky network."""
+        self._socket.disconnect()
+        self.num_reconnects += 1
+        self._socket.connect(self.url)
+        self._emit(
+            'updatePlayerConnection',
+            {'workerId': self._worker_id},
+            is_reply=_any_message)
+
+    def _on_set_client_state(self, message):
+        """Record a ``setClientState`` event from the server."""
+        received_at = time.monotonic()
+        with self._lock:
+            self.num_received += 1
+            if self._is_reply is not None and self._is_reply(message):
+                self.latencies.append(received_at - self._sent_at)
+                self._sent_at = None
+                self._is_reply = None
+        self._messages.put(message)
+
+    def _emit(self, event, message, is_reply=None):
+        """Send ``event`` to the server.
+
+        Parameters
+        ----------
+        event : str
+            The name of the event.
+        message : Dict
+            The message to send with the event.
+        is_reply : Optional[Callable[[Dict], bool]], optional
+            (default=None)
+            A function recognizing the ``setClientState`` message that
+            replies to the event, or ``None`` if it has no reply. Only
+            one event awaits a reply at a time, so a new event replaces
+            any earlier one whose reply hasn't arrived.
+        """
+        with self._lock:
+            self.num_sent += 1
+            self._sent_at = time.monotonic()
+            self._is_reply = is_reply
+        self._socket.emit(event, message)
+
+    def _take_player_action(self, player, action, is_reply=None):
+        """Send a ``takePlayerAction`` event to the server."""
+        self._emit(
+            'takePlayerAction',
+            {'player': player, 'action': action},
+            is_reply=is_reply)
+
+    def _next_game(self, game, player_id):
+        """Return the game after ``player_id``'s turn, if it's theirs."""
+        state = game['state']
+        round_ = game['round']
+        is_asker = game['askerId'] == player_id
+        is_answerer = game['answererId'] == player_id
+
+        if state == models.STATES['ASKQUESTION'] and is_asker:
+            question_number = len(round_['questionAndAnswers']) + 1
+            question_and_answer = {
+                'question': {
+                    'askerId': player_id,
+                    'questionText': f'Is it thing {question_number}?'
+                },
+                'answer': None
+            }
+            return dict(
+                game,
+                state=models.STATES['PROVIDEANSWER'],
+                round=dict(
+                    round_,
+                    questionAndAnswers=[
+                        question_and_answer,
+                        *round_['questionAndAnswers']
+                    ]))
+        elif state == models.STATES['PROVIDEANSWER'] and is_answerer:
+            latest, *rest = round_['questionAndAnswers']
+            latest = dict(
+                latest,
+                answer={
+                    'answererId': player_id,
+                    'answerValue': random.choice(ANSWER_VALUES)
+                })
+            questions_left = 1 + len(rest) < models.MAXQUESTIONS
+            return dict(
+                game,
+                state=(
+                    models.STATES['ASKQUESTION']
+                    if questions_left
+                    else models.STATES['MAKEGUESS']
+                ),
+                round=dict(round_, questionAndAnswers=[latest, *rest]))
+        elif state == models.STATES['MAKEGUESS'] and is_asker:
+            return dict(
+                game,
+                state=models.STATES['ANSWERGUESS'],
+                round=dict(
+                    round_,
+                    guessAndAnswer={
+                        'guess': {
+                            'askerId': player_id,
+                            'guessText': 'a thing'
+                        },
+                        'guessAnswer': None
+                    }))
+        elif state == models.STATES['ANSWERGUESS'] and is_answerer:
+            return dict(
+                game,
+                state=models.STATES['SUBMITRESULTS'],
+                round=dict(
+                    round_,
+                    guessAndAnswer=dict(
+                        round_['guessAndAnswer'],
+                        guessAnswer={
+                            'answererId': player_id,
+                            'correct': random.random() < 0.5
+                        })))
+        else:
+            return None
+
+    def _act(self, message):
+        """Take this client's next action given the latest state.
+
+        Returns
+        -------
+        bool
+            ``True`` if the client finished a game.
+        """
+        player = message['player']
+        game_room = message['gameRoom']
+        status = player['status']
+
+        if status == models.PLAYERSTATUSES['READINGINSTRUCTIONS']:
+            self._waiting_since = time.monotonic()
+            self._take_player_action(
+                player,
+                models.PLAYERACTIONS['FINISHREADINGINSTRUCTIONS'],
+                is_reply=_has_status(
+                    models.PLAYERSTATUSES['WAITING'],
+                    models.PLAYERSTATUSES['READYTOPLAY']))
+        elif status == models.PLAYERSTATUSES['READYTOPLAY']:
+            if self._waiting_since is not None:
+                self.match_times.append(
+                    time.monotonic() - self._waiting_since)
+                self._waiting_since = None
+            self._take_player_action(
+                player,
+                models.PLAYERACTIONS['STARTPLAYING'],
+                is_reply=_has_status(models.PLAYERSTATUSES['PLAYING']))
+        elif status == models.PLAYERSTATUSES['INACTIVE']:
+            self._take_player_action(
+                player,
+                models.PLAYERACTIONS['GOACTIVE'],
+                is_reply=_has_status(
+                    models.PLAYERSTATUSES['WAITING'],
+                    models.PLAYERSTATUSES['READYTOPLAY']))
+        elif status == models.PLAYERSTATUSES['PLAYING'] \
+                and game_room is not None:
+            game = game_room['game']
+            if game['state'] == models.STATES['SUBMITRESULTS']:
+                # the server deletes the player, so there's no reply
+                self._take_player_action(
+                    player, models.PLAYERACTIONS['FINISHGAME'])
+                return True
+
+            next_game = self._next_game(game, player['playerId'])
+            if next_game is not None:
+                self._emit(
+                    'setServerGameState',
+                    {
+                        'player': player,
+                        'gameRoom': dict(game_room, game=next_game)
+                    },
+                    is_reply=_has_game(next_game))
+
+        return False
+
+    def _latest_message(self):
+        """Return the latest message from the server, or ``None``."""
+        try:
+            message = self._messages.get(timeout=POLL_INTERVAL)
+        except queue.Empty:
+            return None
+
+        # only the latest state matters
+        while not self._messages.empty():
+            message = self._messages.get_nowait()
+
+        return message
+
+    def _play_game(self):
+        """Play one game, returning whether it finished in time."""
+        self._worker_id = f'loadtest-{uuid.uuid4().hex}'
+        self._connect()
+        try:
+            while time.monotonic() < self.deadline:
+                message = self._latest_message()
+                if message is None:
+                    continue
+
+                if self.think_time > 0:
+                    time.sleep(random.expovariate(1 / self.think_time))
+
+                if random.random() < self.disconnect_rate:
+                    self._reconnect()
+                    continue
+
+                # drop any updates that arrived while thinking
+                while not self._messages.empty():
+                    message = self._messages.get_nowait()
+
+                if self._act(message):
+                    return True
+        finally:
+            self._socket.disconnect()
+
+        return False
+
+    # main methods
+
+    def run(self):
+        """Play games until ``num_games`` finish or the deadline."""
+        for _ in range(self.num_games):
+            try:
+                if not self._play_game():
+                    break
+                self.num_games_finished += 1
+            except Exception:
+                logger.exception('Simulated client failed.')
+                self.num_errors += 1
+                break
@@ -0,0 +1,284 @@
+"""Near-duplicate detection with MinHash and LSH for twentyquestions."""
+
+import logging
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+
+# constants
+
+NUM_HASHES = 64
+SHINGLE_SIZE = 3
+SIMILARITY_THRESHOLD = 0.6
+
+# shingles are packed into 32 bit integers, one byte per character
+MAX_SHINGLE_SIZE = 4
+
+# how many strings to compute signatures for at once
+CHUNK_SIZE = 1024
+
+
+# helper functions
+
+def _shingle_ids(chunk, shingle_size):
+    """Return the shingles for ``chunk`` packed as integers.
+
+    Shingles are taken over the UTF-8 bytes of each string, and each
+    shingle's bytes are packed into a single integer, so all the
+    shingles for the chunk are computed with a few array operations.
+    Strings shorter than ``shingle_size`` are padded with null bytes,
+    so every string has at least one shingle.
+
+    Parameters
+    ----------
+    chunk : List[str]
+        The strings to shingle.
+    shingle_size : int
+        The number of bytes in each shingle.
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray]
+        An array of the shingle IDs for all the strings, concatenated,
+        and an array giving the offset at which each string's shingles
+        start.
+    """
+    encoded = [
+        s.encode('utf-8').ljust(shingle_size, b'\0')
+        for s in chunk
+    ]
+    lengths = np.array([len(e) for e in encoded], dtype=np.int64)
+    data = np.frombuffer(b''.join(encoded), dtype=np.uint8)\
+        .astype(np.uint64)
+
+    starts = np.cumsum(lengths) - lengths
+    num_shingles = lengths - shingle_size + 1
+    offsets = np.cumsum(num_shingles) - num_shingles
+    positions = (
+        np.arange(num_shingles.sum())
+        + np.repeat(starts - offsets, num_shingles)
+    )
+
+    shingle_ids = np.zeros(len(positions), dtype=np.uint64)
+    for i in range(shingle_size):
+        shingle_ids |= data[positions + i] << np.uint64(8 * i)
+
+    return shingle_ids, offsets
+
+
+def _choose_bands(num_hashes, threshold):
+    """Return the number of bands and rows per band for LSH.
+
+    LSH makes two strings with similarity ``s`` candidates with
+    probability ``1 - (1 - s ** rows) ** bands``, which rises steeply
+    around ``(1 / bands) ** (1 / rows)``. Choose the banding whose
+    steepest point is closest to, but not above, ``threshold`` so that
+    few true near-duplicates are missed. False positives are filtered
+    out afterwards by comparing signatures.
+
+    Parameters
+    ----------
+    num_hashes : int
+        The number of hashes in each signature.
+    threshold : float
+        The similarity threshold for near-duplicates.
+
+    Returns
+    -------
+    Tuple[int, int]
+        The number of bands and the number of rows per band.
+    """
+    best = (num_hashes, 1)
+    for rows in range(1, num_hashes + 1):
+        bands = num_hashes // rows
+        if (1 / bands) ** (1 / rows) <= threshold:
+            best = (bands, rows)
+
+    return best
+
+
+# main functions
+
+def signatures(
+        strs,
+        num_hashes=NUM_HASHES,
+        shingle_size=SHINGLE_SIZE,
+        seed=0):
+    """Return the MinHash signatures for ``strs``.
+
+    Parameters
+    ----------
+    strs : List[str]
+        The strings to compute signatures for.
+    num_hashes : int, optional (default=NUM_HASHES)
+        The number of hash functions to use in each signature.
+    shingle_size : int, optional (default=SHINGLE_SIZE)
+        The number of bytes in each shingle. Must be at most
+        ``MAX_SHINGLE_SIZE``.
+    seed : int, optional (default=0)
+        The seed for choosing the hash functions.
+
+    Returns
+    -------
+    np.ndarray
+        An array of shape ``(len(strs), num_hashes)`` whose i'th row is
+        the signature for the i'th string. The fraction of positions
+        where two signatures agree estimates the Jaccard similarity of
+        the two strings' shingles.
+    """
+    if shingle_size > MAX_SHINGLE_SIZE:
+        raise ValueError(
+            f'shingle_size must be at most {MAX_SHINGLE_SIZE}.')
+
+    # use multiply-shift hashing, ``(a * x + b) >> 32`` modulo 2 ** 64
+    # with odd ``a``, which is universal for 32 bit keys and avoids any
+    # division.
+    rng = np.random.RandomState(seed)
+    a = rng.randint(0, 2 ** 62, size=(num_hashes, 1)).astype(np.uint64)
+    a |= np.uint64(1)
+    b = rng.randint(0, 2 ** 62, size=(num_hashes, 1)).astype(np.uint64)
+    shift = np.uint64(32)
+
+    sigs = np.empty((len(strs), num_hashes), dtype=np.uint32)
+    for start in range(0, len(strs), CHUNK_SIZE):
+        chunk = strs[start:start+CHUNK_SIZE]
+        shingle_ids, offsets = _shingle_ids(chunk, shingle_size)
+        # hashes[h, i] : the h'th hash of the i'th shingle
+        hashes = ((a * shingle_ids + b) >> shift).astype(np.uint32)
+        sigs[start:start+len(chunk)] = np.minimum.reduceat(
+            hashes, offsets, axis=1).T
+
+    return sigs
+
+
+def cluster(
+        strs,
+        threshold=SIMILARITY_THRESHOLD,
+        num_hashes=NUM_HASHES,
+        shingle_size=SHINGLE_SIZE,
+        seed=0):
+    """Return a cluster ID for each string, grouping near-duplicates.
+
+    Near-duplicates are found with locality sensitive hashing over the
+    strings' MinHash signatures, so the time taken grows roughly
+    linearly with the number of strings rather than comparing every
+    pair. Two strings are near-duplicates if their signatures estimate
+    a Jaccard similarity of at least ``threshold`` between their
+    shingles.
+
+    Clusters are stars rather than the transitive closure of the
+    near-duplicate relation, since the closure chains templated
+    strings (e.g., "is it a cat", "is it a car", "is it a cap", ...)
+    into a few giant clusters. The strings are visited in order, and
+    each string that isn't in a cluster yet becomes the center of a new
+    one, taking every unclustered candidate from its LSH buckets that
+    is a near-duplicate of it. So every string is a near-duplicate of
+    its cluster's center.
+
+    Parameters
+    ----------
+    strs : List[str]
+        The strings to cluster.
+    threshold : float, optional (default=SIMILARITY_THRESHOLD)
+        The minimum estimated similarity for two strings to be
+        near-duplicates.
+    num_hashes : int, optional (default=NUM_HASHES)
+        The number of hash functions to use in each signature.
+    shingle_size : int, optional (default=SHINGLE_SIZE)
+        The number of bytes in each shingle. Must be at most
+        ``MAX_SHINGLE_SIZE``.
+    seed : int, optional (default=0)
+        The seed for choosing the hash functions.
+
+    Returns
+    -------
+    List[int]
+        A list whose i'th element is the cluster ID for the i'th
+        string. Cluster IDs run from 0 to the number of clusters minus
+        1, in the order of the clusters' centers.
+    """
+    if len(strs) == 0:
+        return []
+
+    sigs = signatures(
+        strs,
+        num_hashes=num_hashes,
+        shingle_size=shingle_size,
+        seed=seed)
+
+    num_bands, rows_per_band = _choose_bands(num_hashes, threshold)
+    logger.debug(
+        f'Using {num_bands} bands of {rows_per_band} rows for LSH.')
+
+    # bucket the strings in each band by sorting them on a hash of the
+    # band. orders[band] lists the string indices sorted into buckets.
+    # The bucket containing string i starts at starts[band, i] and ends
+    # at bucket_ends[band][bucket_idxs[band, i]], where the ends are
+    # moved down as strings are clustered and dropped from the bucket.
+    rng = np.random.RandomState(seed)
+    multipliers = rng.randint(
+        1, 2 ** 62, size=rows_per_band).astype(np.uint64) | np.uint64(1)
+    orders = np.empty((num_bands, len(strs)), dtype=np.int64)
+    starts = np.empty((num_bands, len(strs)), dtype=np.int64)
+    bucket_idxs = np.empty((num_bands, len(strs)), dtype=np.int64)
+    bucket_ends = []
+    has_candidates = np.zeros(len(strs), dtype=bool)
+    for band in range(num_bands):
+        band_sigs = sigs[:, band * rows_per_band:(band + 1) * rows_per_band]
+        keys = (band_sigs * multipliers).sum(axis=1, dtype=np.uint64)
+        order = np.argsort(keys, kind='mergesort')
+        sorted_keys = keys[order]
+
+        is_first = np.ones(len(strs), dtype=bool)
+        is_first[1:] = sorted_keys[1:] != sorted_keys[:-1]
+        band_bucket_starts = np.flatnonzero(is_first)
+        band_bucket_ends = np.append(band_bucket_starts[1:], len(strs))
+        band_bucket_idxs = np.cumsum(is_first) - 1
+
+        orders[band] = order
+        starts[band, order] = band_bucket_starts[band_bucket_idxs]
+        bucket_idxs[band, order] = band_bucket_idxs
+        bucket_ends.append(band_bucket_ends)
+        has_candidates[order] |= (
+            band_bucket_ends - band_bucket_starts > 1)[band_bucket_idxs]
+
+    # grow a star around each unclustered string, in order. Strings
+    # alone in all their buckets are their own clusters, so skip them.
+    cluster_ids = np.full(len(strs), -1, dtype=np.int64)
+    num_clusters = 0
+    for center in range(len(strs)):
+        if cluster_ids[center] != -1:
+            continue
+
+        cluster_ids[center] = num_clusters
+        num_clusters += 1
+
+        if not has_candidates[center]:
+            continue
+
+        for band in range(num_bands):
+            start = starts[band, center]
+            bucket_idx = bucket_idxs[band, center]
+            end = bucket_ends[band][bucket_idx]
+            if end - start <= 1:
+                continue
+
+            candidates = orders[band, start:end]
+            candidates = candidates[cluster_ids[candidates] == -1]
+            similarities = (sigs[candidates] == sigs[center]).mean(axis=1)
+            is_similar = similarities >= threshold
+            cluster_ids[candidates[is_similar]] = cluster_ids[center]
+
+            # drop the clustered strings from the bucket so later
+            # centers don't scan them again.
+            remaining = candidates[~is_similar]
+            orders[band, start:start + len(remaining)] = remaining
+            bucket_ends[band][bucket_idx] = start + len(remaining)
+
+    logger.info(
+        f'Clustered {len(strs)} strings into {num_clusters} clusters.')
+
+    return cluster_ids.tolist()
@@ -0,0 +1,286 @@
+"""Byte-offset indexes for random access into JSON Lines files.
+
+An offset index is a sidecar file, ``{data_path}.offsets.npy``, holding
+the byte offset at which each line of the data file starts, followed by
+the size of the file and its modification time in nanoseconds. A key
+index adds two more sidecar files for some attribute of the rows (e.g.
+``subject``), whose values must be strings: ``{data_path}.{key}.npy``
+holds the line numbers grouped by the attribute's value, and
+``{data_path}.{key}.json`` maps each value to the slice of that array
+holding its lines, along with the size and modification time of the
+file. Lookups memory map the data file and the indexes, so only the
+requested lines are ever read. An index whose size or modification
+time doesn't match the data file is out of date and must be rebuilt.
+"""
+
+import array
+import json
+import logging
+import mmap
+import os
+
+import numpy as np
+
+from scripts import _utils
+
+
+logger = logging.getLogger(__name__)
+
+
+# constants
+
+OFFSETS_SUFFIX = '.offsets.npy'
+
+
+# helper functions
+
+def _offsets_path(data_path):
+    """Return the path to the offset index for ``data_path``."""
+    return data_path + OFFSETS_SUFFIX
+
+
+def _key_paths(data_path, key):
+    """Return the paths to the ``key`` index for ``data_path``."""
+    return data_path + f'.{key}.npy', data_path + f'.{key}.json'
+
+
+def _stamp(data_path):
+    """Return the size and modification time of ``data_path``."""
+    stat = os.stat(data_path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _check_exists(index_path, data_path):
+    """Raise a ``ValueError`` if the index at ``index_path`` is missing."""
+    if not os.path.exists(index_path):
+        raise ValueError(
+            f'{data_path} is missing its index at {index_path}. Build it'
+            f' with the buildindex command.')
+
+
+def _check_stamp(stamp, data_path):
+    """Raise a ``ValueError`` if ``stamp`` doesn't match ``data_path``."""
+    if tuple(stamp) != _stamp(data_path):
+        raise ValueError(
+            f'The index for {data_path} is out of date. Rebuild it with'
+            f' the buildindex command.')
+
+
+def _check_uncompressed(data_path):
+    """Raise a ``ValueError`` if ``data_path`` is compressed."""
+    for extension in _utils.COMPRESSION_EXTENSIONS.values():
+        if data_path.endswith(extension):
+            raise ValueError(
+                f"{data_path} is compressed, so it can't be indexed.")
+
+
+def _iter_lines(data_path):
+    """Yield the offset and contents of each line in ``data_path``."""
+    offset = 0
+    with open(data_path, 'rb') as data_file:
+        for line in data_file:
+            yield offset, line
+            offset += len(line)
+
+
+# main classes
+
+class OffsetIndex(object):
+    """Random access to the rows of an indexed JSON Lines file.
+
+    Use ``build`` to create the index first. ``OffsetIndex`` supports
+    ``len``, indexing by line number, and ``lookup`` for any keys that
+    were indexed. Call ``close`` when done, or use it as a context
+    manager.
+    """
+
+    def __init__(self, data_path):
+        """Create a new instance.
+
+        Parameters
+        ----------
+        data_path : str
+            The path to the JSON Lines file. The offset index must have
+            been built with ``build``.
+
+        Returns
+        -------
+        OffsetIndex
+            The new instance.
+
+        Raises
+        ------
+        ValueError
+            If ``data_path`` is compressed, or its offset index is
+            missing or out of date.
+        """
+        _check_uncompressed(data_path)
+
+        self.data_path = data_path
+
+        offsets_path = _offsets_path(data_path)
+        _check_exists(offsets_path, data_path)
+        offsets = np.load(offsets_path, mmap_mode='r')
+        _check_stamp(offsets[-2:].tolist(), data_path)
+
+        self._offsets = offsets[:-1]
+        self._key_indexes = {}
+
+        data_size = int(self._offsets[-1])
+
+        self._data_file = open(data_path, 'rb')
+        # mmap can't map empty files
+        self._data = (
+            mmap.mmap(self._data_file.fileno(), 0, access=mmap.ACCESS_READ)
+            if data_size > 0
+            else b''
+        )
+
+    def _key_index(self, key):
+        """Return the line numbers and slices for the ``key`` index."""
+        if key not in self._key_indexes:
+            lines_path, slices_path = _key_paths(self.data_path, key)
+            if not os.path.exists(slices_path):
+                raise ValueError(
+                    f'{self.data_path} has no index for {key}.')
+            _check_exists(lines_path, self.data_path)
+            with open(slices_path, 'r') as slices_file:
+                key_index = json.load(slices_file)
+            _check_stamp(
+                (key_index['size'], key_index['mtime_ns']),
+                self.data_path)
+            self._key_indexes[key] = (
+                np.load(lines_path, mmap_mode='r'),
+                key_index['slices']
+            )
+
+        return self._key_indexes[key]
+
+    def __len__(self):
+        """Return the number of rows in the data file."""
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        """Return the i'th row of the data file."""
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(f'Row {i} is out of range.')
+
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        return json.loads(self._data[start:end].decode('utf-8'))
+
+    def lookup(self, key, value):
+        """Return the rows whose ``key`` attribute equals ``value``.
+
+        Parameters
+        ----------
+        key : str
+            The attribute to look up. It must have been indexed by
+            ``build``.
+        value : str
+            The value to look up.
+
+        Returns
+        -------
+        List[Dict[str, Any]]
+            The matching rows, in the order they appear in the data
+            file.
+
+        Raises
+        ------
+        ValueError
+            If ``key`` wasn't indexed, or its index is missing or out of
+            date.
+        """
+        lines, slices = self._key_index(key)
+        if value not in slices:
+            return []
+
+        start, end = slices[value]
+        return [self[int(i)] for i in lines[start:end]]
+
+    def close(self):
+        """Close the data file."""
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._data_file.close()
+
+    def __enter__(self):
+        """Return the instance."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Close the data file."""
+        self.close()
+
+
+# main functions
+
+def build(data_path, keys=()):
+    """Build the offset index for ``data_path`` in one streaming pass.
+
+    Parameters
+    ----------
+    data_path : str
+        The path to the JSON Lines file to index.
+    keys : Sequence[str], optional (default=())
+        Attributes of the rows to also build key indexes for. Rows
+        missing the attribute are left out of its index.
+
+    Returns
+    -------
+    int
+        The number of rows indexed.
+
+    Raises
+    ------
+    ValueError
+        If ``data_path`` is compressed, or a row has a value for one of
+        ``keys`` that isn't a string.
+    """
+    _check_uncompressed(data_path)
+
+    # take the modification time before reading, so that changes made
+    # while indexing leave the index out of date.
+    _, mtime_ns = _stamp(data_path)
+
+    offsets = array.array('q')
+    key_to_value_to_lines = {key: {} for key in keys}
+    end = 0
+    for i, (offset, line) in enumerate(_iter_lines(data_path)):
+        offsets.append(offset)
+        end = offset + len(line)
+        if len(keys) > 0:
+            row = json.loads(line.decode('utf-8'))
+            for key, value_to_lines in key_to_value_to_lines.items():
+                if key not in row:
+                    continue
+                if not isinstance(row[key], str):
+                    raise ValueError(
+                        f'Line {i} of {data_path} has a'
+                        f' {type(row[key]).__name__} for {key}, but only'
+                        f' strings can be indexed.')
+                value_to_lines.setdefault(row[key], []).append(i)
+    offsets.append(end)
+    offsets.append(mtime_ns)
+
+    np.save(_offsets_path(data_path), np.array(offsets, dtype=np.int64))
+    for key, value_to_lines in key_to_value_to_lines.items():
+        lines = array.array('q')
+        slices = {}
+        for value, value_lines in value_to_lines.items():
+            slices[value] = [len(lines), len(lines) + len(value_lines)]
+            lines.extend(value_lines)
+
+        lines_path, slices_path = _key_paths(data_path, key)
+        np.save(lines_path, np.array(lines, dtype=np.int64))
+        with open(slices_path, 'w') as slices_file:
+            json.dump(
+                {'size': end, 'mtime_ns': mtime_ns, 'slices': slices},
+                slices_file)
+
+    num_rows = len(offsets) - 2
+    logger.info(f'Indexed {num_rows} rows in {data_path}.')
+
+    return num_rows
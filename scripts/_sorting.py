@@ -0,0 +1,166 @@
+"""External memory sorting for twentyquestions' scripts."""
+
+import heapq
+import itertools
+import logging
+import os
+import sys
+import tempfile
+
+
+logger = logging.getLogger(__name__)
+
+
+# constants
+
+# the default memory budget for sorting, in megabytes
+MEMORY_BUDGET = 1024
+
+# the maximum number of spill files to merge at once
+MERGE_FAN_IN = 64
+
+
+# main classes
+
+class ExternalSorter(object):
+    """A class for sorting more strings than fit in memory.
+
+    Strings are added one at a time with ``add``. Once the strings held
+    in memory exceed the memory budget, they're sorted and spilled to a
+    temporary file. Iterating over the sorter then yields all the
+    strings in sorted order by k-way merging the spill files. The
+    strings must not contain newlines, which is the case for any string
+    produced by ``json.dumps``.
+
+    ``ExternalSorter`` should only be iterated over once. The spill
+    files are removed once iteration finishes.
+    """
+
+    def __init__(
+            self,
+            memory_budget=MEMORY_BUDGET,
+            unique=False):
+        """Create a new instance.
+
+        Parameters
+        ----------
+        memory_budget : int, optional (default=MEMORY_BUDGET)
+            The approximate number of megabytes of strings to hold in
+            memory before spilling them to disk. It's estimated as the
+            sum of ``sys.getsizeof`` for the strings, so it doesn't
+            count the list holding them or anything else the process
+            uses.
+        unique : bool, optional (default=False)
+            If ``True``, only yield one copy of each distinct string.
+
+        Returns
+        -------
+        ExternalSorter
+            The new instance.
+        """
+        self.memory_budget = memory_budget * 2 ** 20
+        self.unique = unique
+
+        self._strs = []
+        self._size = 0
+        self._tmp_dir = None
+        self._spill_paths = []
+        self._num_spill_files = 0
+
+    def _make_spill_path(self):
+        """Return a path for a new spill file."""
+        if self._tmp_dir is None:
+            self._tmp_dir = tempfile.TemporaryDirectory(
+                prefix='twentyquestions-sort-')
+
+        spill_path = os.path.join(
+            self._tmp_dir.name,
+            f'{self._num_spill_files}.txt')
+        self._num_spill_files += 1
+
+        return spill_path
+
+    def _write_spill_file(self, strs):
+        """Write ``strs`` to a new spill file and record its path."""
+        spill_path = self._make_spill_path()
+        with open(spill_path, 'w', encoding='utf-8') as spill_file:
+            for s in strs:
+                spill_file.write(s + '\n')
+
+        self._spill_paths.append(spill_path)
+
+    def _spill(self):
+        """Sort the strings in memory and spill them to disk."""
+        logger.debug(
+            f'Spilling {len(self._strs)} strings to disk.')
+
+        self._strs.sort()
+        self._write_spill_file(self._strs)
+
+        self._strs = []
+        self._size = 0
+
+    def _merge(self, spill_paths):
+        """Yield the strings from ``spill_paths`` in sorted order."""
+        spill_files = [
+            open(spill_path, 'r', encoding='utf-8')
+            for spill_path in spill_paths
+        ]
+        try:
+            yield from heapq.merge(*[
+                (ln[:-1] for ln in spill_file)
+                for spill_file in spill_files
+            ])
+        finally:
+            for spill_file in spill_files:
+                spill_file.close()
+
+    def add(self, s):
+        """Add ``s`` to the strings being sorted.
+
+        Parameters
+        ----------
+        s : str
+            The string to add. ``s`` must not contain newlines.
+        """
+        self._strs.append(s)
+        self._size += sys.getsizeof(s)
+        if self._size > self.memory_budget:
+            self._spill()
+
+    def __iter__(self):
+        """Yield the strings in sorted order."""
+        try:
+            if len(self._spill_paths) == 0:
+                # everything fit in memory
+                self._strs.sort()
+                strs = iter(self._strs)
+            else:
+                if len(self._strs) > 0:
+                    self._spill()
+
+                # merge the spill files in passes so that we never open
+                # more than MERGE_FAN_IN files at once.
+                while len(self._spill_paths) > MERGE_FAN_IN:
+                    spill_paths = self._spill_paths
+                    self._spill_paths = []
+                    for i in range(0, len(spill_paths), MERGE_FAN_IN):
+                        self._write_spill_file(
+                            self._merge(spill_paths[i:i+MERGE_FAN_IN]))
+                        for spill_path in spill_paths[i:i+MERGE_FAN_IN]:
+                            os.remove(spill_path)
+
+                strs = self._merge(self._spill_paths)
+
+            if self.unique:
+                strs = (s for s, _ in itertools.groupby(strs))
+
+            yield from strs
+        finally:
+            self._strs = []
+            self._size = 0
+            self._spill_paths = []
+            if self._tmp_dir is not None:
+                self._tmp_dir.cleanup()
+                self._tmp_dir = None
+
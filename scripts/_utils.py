@@ -1,15 +1,53 @@
 """Utilities for twentyquestions' scripts."""
 
 import collections
+import gzip
 import html
+import io
+import json
 import logging
+import multiprocessing
 import os
+import tarfile
+import zipfile
 from xml.dom import minidom
 
+import click
+
+from scripts import _db
+
 
 logger = logging.getLogger(__name__)
 
 
+# constants
+
+WORKER_ID_KEY = 'WorkerId'
+
+# the extensions of archives that can be read in place of an XML
+# directory
+TAR_EXTENSIONS = ['.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tar.xz']
+ZIP_EXTENSIONS = ['.zip']
+
+# the number of zip members for each worker process to parse at once
+ZIP_CHUNK_SIZE = 512
+
+# the extensions for each compression format supported by ``open_file``
+COMPRESSION_EXTENSIONS = {
+    'gzip': '.gz',
+    'zstd': '.zst'
+}
+
+# fast compression levels, since the data files are written once and
+# read a few times, and compression is the bottleneck. gzip's level is
+# lower than its default of 9, and zstd's is its default.
+GZIP_COMPRESSION_LEVEL = 6
+ZSTD_COMPRESSION_LEVEL = 3
+
+# the size of the buffer for writing data files, in bytes
+WRITE_BUFFER_SIZE = 2 ** 20
+
+
 def get_node_text(node):
     """Return the text from a node that has only text as content.
 
@@ -39,63 +77,210 @@ def get_node_text(node):
     return node.childNodes[0].wholeText
 
 
-def extract_xml_dir(xml_dir):
-    """Extract MTurk form data from ``xml_dir`` to a list of dicts.
+def _parse_xml(xml, name, include_worker_id):
+    """Return the form data from the XML document ``xml``.
 
-    Extract the form data returned by Mechanical Turk in the AMTI XML
-    directory, ``xml_dir``, into a list of python dictionaries. Note
-    that the field ``"doNotRedirect"`` is ignored as some turkers
-    automatically submit this value with their form data.
+    See ``extract_xml_dir`` for details.
 
     Parameters
     ----------
-    xml_dir : str
-        The path to the AMTI XML directory from which to extract the
-        data.
+    xml : Union[str, bytes]
+        The contents of the XML file.
+    name : str
+        The name of the XML file, for logging.
+    include_worker_id : bool
+        If ``True``, add the ID of the worker who submitted the
+        assignment under ``WORKER_ID_KEY``.
 
     Returns
     -------
-    List[Dict[str, str]]
-        A list of dictionaries containing the form data. Note that all
-        keys and values will have type ``str`` -- type coercion is up to
-        the caller as a post processing step.
+    Dict[str, str]
+        The form data.
     """
-    rows = []
+    xml = minidom.parseString(xml)
+
+    row = {}
+    for answer_tag in xml.getElementsByTagName('Answer'):
+        [question_identifier_tag] = answer_tag.getElementsByTagName(
+            'QuestionIdentifier')
+        question_identifier = get_node_text(
+            question_identifier_tag)
+
+        if question_identifier == 'doNotRedirect':
+            # some turkers have modifications to their browser that send
+            # a "doNotRedirect" field when posting results back to
+            # mturk.
+            continue
+
+        [free_text_tag] = answer_tag.getElementsByTagName(
+            'FreeText')
+        free_text = html.unescape(get_node_text(
+            free_text_tag))
+
+        row[question_identifier] = free_text
+
+    if include_worker_id:
+        worker_id_tags = xml.getElementsByTagName(WORKER_ID_KEY)
+        if len(worker_id_tags) > 0:
+            row[WORKER_ID_KEY] = get_node_text(worker_id_tags[0])
+        else:
+            logger.debug(f'{name} has no worker ID.')
+            row[WORKER_ID_KEY] = None
+
+    return row
+
+
+def _is_xml(name):
+    """Return whether the file ``name`` should be parsed as XML."""
+    if not '.xml' in name:
+        logger.debug(f'{name} is not XML. Skipping.')
+        return False
+
+    return True
+
+
+def _iter_dir(xml_dir, include_worker_id):
+    """Yield the form data from the XML files in ``xml_dir``."""
     for dirpath, dirnames, filenames in os.walk(xml_dir):
         for filename in filenames:
             logger.debug(f'Processing {filename}.')
 
             # skip non-xml files
-            if not '.xml' in filename:
-                logger.debug(f'{filename} is not XML. Skipping.')
+            if not _is_xml(filename):
                 continue
 
             with open(os.path.join(dirpath, filename), 'r') as xml_file:
-                xml = minidom.parseString(xml_file.read())
+                yield _parse_xml(xml_file.read(), filename, include_worker_id)
 
-            row = {}
-            for answer_tag in xml.getElementsByTagName('Answer'):
-                [question_identifier_tag] = answer_tag.getElementsByTagName(
-                    'QuestionIdentifier')
-                question_identifier = get_node_text(
-                    question_identifier_tag)
 
-                if question_identifier == 'doNotRedirect':
-                    # some turkers have modifications to their browser
-                    # that send a "doNotRedirect" field when posting
-                    # results back to mturk.
-                    continue
+def _iter_tar(tar_path, include_worker_id):
+    """Yield the form data from the XML files in the tar ``tar_path``."""
+    # open the archive in streaming mode, since compressed tar files
+    # can't be decompressed in parallel or seeked through efficiently.
+    with tarfile.open(tar_path, 'r|*') as tar:
+        for member in tar:
+            if not member.isfile():
+                continue
 
-                [free_text_tag] = answer_tag.getElementsByTagName(
-                    'FreeText')
-                free_text = html.unescape(get_node_text(
-                    free_text_tag))
+            logger.debug(f'Processing {member.name}.')
 
-                row[question_identifier] = free_text
+            # skip non-xml files
+            if not _is_xml(os.path.basename(member.name)):
+                continue
 
-            rows.append(row)
+            xml = tar.extractfile(member).read()
+            yield _parse_xml(xml, member.name, include_worker_id)
 
-    return rows
+
+def _parse_zip_members(args):
+    """Return the form data from some of the XML files in a zip.
+
+    ``_parse_zip_members`` runs in worker processes, so it takes a
+    single tuple of arguments: the path to the zip, the names of the
+    members to parse, and ``include_worker_id``.
+    """
+    zip_path, names, include_worker_id = args
+    with zipfile.ZipFile(zip_path) as zip_file:
+        return [
+            _parse_xml(zip_file.read(name), name, include_worker_id)
+            for name in names
+        ]
+
+
+def _iter_zip(zip_path, include_worker_id, num_workers):
+    """Yield the form data from the XML files in the zip ``zip_path``."""
+    with zipfile.ZipFile(zip_path) as zip_file:
+        names = [
+            info.filename
+            for info in zip_file.infolist()
+            if not info.filename.endswith('/')
+            and _is_xml(os.path.basename(info.filename))
+        ]
+
+    # each member of a zip is compressed separately, so the members can
+    # be decompressed and parsed in parallel.
+    chunks = [
+        (zip_path, names[i:i+ZIP_CHUNK_SIZE], include_worker_id)
+        for i in range(0, len(names), ZIP_CHUNK_SIZE)
+    ]
+    if num_workers == 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            yield from _parse_zip_members(chunk)
+        return
+
+    with multiprocessing.Pool(num_workers) as pool:
+        for rows in pool.imap(_parse_zip_members, chunks):
+            yield from rows
+
+
+def iter_xml_dir(xml_dir, include_worker_id=False, num_workers=None):
+    """Yield MTurk form data from ``xml_dir`` one submission at a time.
+
+    ``iter_xml_dir`` is like ``extract_xml_dir``, except it only holds
+    one submission in memory at a time. See ``extract_xml_dir`` for
+    details.
+
+    Parameters
+    ----------
+    xml_dir : str
+        The path to the AMTI XML directory from which to extract the
+        data, or to a tar or zip archive of it.
+    include_worker_id : bool, optional (default=False)
+        If ``True``, add the ID of the worker who submitted each
+        assignment to its dictionary under ``WORKER_ID_KEY``.
+    num_workers : Optional[int], optional (default=None)
+        The number of processes to use for decompressing and parsing
+        zip archives. Defaults to the number of CPUs.
+
+    Returns
+    -------
+    Iterator[Dict[str, str]]
+        The form data for each submission.
+    """
+    if os.path.isdir(xml_dir):
+        yield from _iter_dir(xml_dir, include_worker_id)
+    elif any(xml_dir.endswith(ext) for ext in TAR_EXTENSIONS):
+        yield from _iter_tar(xml_dir, include_worker_id)
+    elif any(xml_dir.endswith(ext) for ext in ZIP_EXTENSIONS):
+        yield from _iter_zip(
+            xml_dir,
+            include_worker_id,
+            num_workers or multiprocessing.cpu_count())
+    else:
+        raise ValueError(
+            f'{xml_dir} must be a directory or an archive with one of the'
+            f' extensions: {", ".join(TAR_EXTENSIONS + ZIP_EXTENSIONS)}.')
+
+
+def extract_xml_dir(xml_dir, include_worker_id=False):
+    """Extract MTurk form data from ``xml_dir`` to a list of dicts.
+
+    Extract the form data returned by Mechanical Turk in the AMTI XML
+    directory, ``xml_dir``, into a list of python dictionaries. Note
+    that the field ``"doNotRedirect"`` is ignored as some turkers
+    automatically submit this value with their form data.
+
+    Parameters
+    ----------
+    xml_dir : str
+        The path to the AMTI XML directory from which to extract the
+        data, or to a tar (optionally compressed) or zip archive of it.
+        Archives are read in place without unpacking them.
+    include_worker_id : bool, optional (default=False)
+        If ``True``, add the ID of the worker who submitted each
+        assignment to its dictionary under ``WORKER_ID_KEY``. The ID is
+        read from the ``WorkerId`` tag of the XML, and is ``None`` if
+        the file has no such tag.
+
+    Returns
+    -------
+    List[Dict[str, str]]
+        A list of dictionaries containing the form data. Note that all
+        keys and values will have type ``str`` -- type coercion is up to
+        the caller as a post processing step.
+    """
+    return list(iter_xml_dir(
+        xml_dir, include_worker_id=include_worker_id))
 
 
 def decode_attribute_idx_data(submissions):
@@ -105,7 +290,9 @@ def decode_attribute_idx_data(submissions):
     ``"attribute-idx": value`` mappings, where attribute represents the
     attribute encoded and idx is the index of the problem instance. This
     function takes a list of dictionaries in the attribute-idx style and
-    decodes them into the individual problem instances.
+    decodes them into the individual problem instances. Attributes
+    without an index (e.g. ``WORKER_ID_KEY``) describe the whole
+    submission, so they're copied into every instance.
 
     Parameters
     ----------
@@ -122,10 +309,18 @@ def decode_attribute_idx_data(submissions):
     rows = []
     for submission in submissions:
         idx_to_row = collections.defaultdict(dict)
+        shared = {}
         for k, v in submission.items():
+            if '-' not in k:
+                shared[k] = v
+                continue
+
             attribute, idx = k.rsplit('-', 1)
             idx_to_row[idx][attribute] = v
 
+        for row in idx_to_row.values():
+            row.update(shared)
+
         rows.extend(idx_to_row.values())
 
     return rows
@@ -153,3 +348,115 @@ def key(row, key_attributes):
     return tuple([
         row[attribute] for attribute in key_attributes
     ])
+
+
+def open_file(path, mode='r'):
+    """Open the data file at ``path``, compressing it by its extension.
+
+    Files ending in ``.gz`` are gzip compressed, files ending in
+    ``.zst`` are zstd compressed (which requires the ``zstandard``
+    package), and all other files are uncompressed. As with
+    ``click.open_file``, a ``path`` of ``"-"`` means stdin or stdout.
+
+    Parameters
+    ----------
+    path : str
+        The path to the file.
+    mode : str, optional (default='r')
+        The mode to open the file in, one of ``"r"``, ``"w"``, or
+        ``"a"``. The file is always opened in text mode.
+
+    Returns
+    -------
+    io.TextIOBase
+        The open file.
+    """
+    if mode not in ['r', 'w', 'a']:
+        raise ValueError(f'mode must be "r", "w", or "a", not "{mode}".')
+
+    if path.endswith(COMPRESSION_EXTENSIONS['gzip']):
+        binary_file = gzip.open(
+            path, mode + 'b', compresslevel=GZIP_COMPRESSION_LEVEL)
+    elif path.endswith(COMPRESSION_EXTENSIONS['zstd']):
+        try:
+            import zstandard
+        except ImportError:
+            raise click.ClickException(
+                f'Reading or writing {path} requires the zstandard'
+                f' package. Install it with "pip install zstandard".')
+
+        raw_file = open(path, mode + 'b')
+        if mode == 'r':
+            binary_file = zstandard.ZstdDecompressor().stream_reader(
+                raw_file, read_across_frames=True, closefd=True)
+        else:
+            binary_file = zstandard.ZstdCompressor(
+                level=ZSTD_COMPRESSION_LEVEL
+            ).stream_writer(raw_file, closefd=True)
+    elif path == '-' or mode == 'r':
+        return click.open_file(path, mode)
+    else:
+        return open(path, mode, buffering=WRITE_BUFFER_SIZE)
+
+    if mode == 'r':
+        binary_file = io.BufferedReader(binary_file)
+    else:
+        binary_file = io.BufferedWriter(
+            binary_file, buffer_size=WRITE_BUFFER_SIZE)
+
+    return io.TextIOWrapper(binary_file, encoding='utf-8')
+
+
+def read_rows(data_path, dataset=None):
+    """Yield the rows from ``data_path``.
+
+    Parameters
+    ----------
+    data_path : str
+        The path to the data. If ``dataset`` is ``None``, the data
+        should be in JSON Lines format, compressed according to its
+        extension (see ``open_file``), otherwise ``data_path`` should
+        be a SQLite database written by ``_db``.
+    dataset : Optional[str], optional (default=None)
+        The name of the dataset to read from the database at
+        ``data_path``.
+
+    Returns
+    -------
+    Iterator[Dict[str, Any]]
+        The rows from the data, in order.
+    """
+    if dataset is not None:
+        yield from _db.read(data_path, dataset)
+        return
+
+    with open_file(data_path, 'r') as data_file:
+        for ln in data_file:
+            yield json.loads(ln)
+
+
+def write_rows(output_path, row_strs, dataset=None):
+    """Write ``row_strs`` to ``output_path``.
+
+    Parameters
+    ----------
+    output_path : str
+        The path to write the data to. If ``dataset`` is ``None``, the
+        rows are written in JSON Lines format, compressed according to
+        its extension (see ``open_file``), otherwise ``output_path``
+        should be a SQLite database for ``_db``.
+    row_strs : Iterable[str]
+        The rows to write, each serialized as a JSON object.
+    dataset : Optional[str], optional (default=None)
+        The name of the dataset to write to in the database at
+        ``output_path``, replacing any rows already in it.
+    """
+    if dataset is not None:
+        _db.write(output_path, dataset, row_strs)
+        return
+
+    with open_file(output_path, 'w') as output_file:
+        for i, row_str in enumerate(row_strs):
+            if i > 0:
+                output_file.write('\n')
+            output_file.write(row_str)
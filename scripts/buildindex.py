@@ -0,0 +1,49 @@
+"""Build byte-offset indexes for JSON Lines files.
+
+See ``python buildindex.py --help`` for more information.
+"""
+
+import logging
+
+import click
+
+from scripts import _offsets
+
+
+logger = logging.getLogger(__name__)
+
+
+# main function
+
+@click.command(
+    context_settings={
+        'help_option_names': ['-h', '--help']
+    })
+@click.argument(
+    'data_paths',
+    type=click.Path(exists=True, file_okay=True, dir_okay=False),
+    nargs=-1)
+@click.option(
+    '--key',
+    type=str,
+    multiple=True,
+    help='An attribute to index the rows by, such as "subject". Its'
+         ' values must be strings. May be provided multiple times.')
+def buildindex(data_paths, key):
+    """Build offset indexes for DATA_PATHS.
+
+    Scan each JSON Lines file in DATA_PATHS once and write a sidecar
+    index of the byte offset of each row next to it, so the lookup
+    command can read individual rows without scanning the file. Each
+    --key also writes an index from that attribute's values to the
+    rows that have them. Rebuild the indexes whenever the files change.
+    """
+    for data_path in data_paths:
+        try:
+            _offsets.build(data_path, keys=key)
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint='DATA_PATHS')
+
+
+if __name__ == '__main__':
+    buildindex()
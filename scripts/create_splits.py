@@ -3,6 +3,8 @@
 See ``python create_splits.py --help`` for more information.
 """
 
+import array
+import hashlib
 import json
 import logging
 import os
@@ -11,18 +13,36 @@ import re
 
 import click
 
+from scripts import _columnar, _minhash, _utils
+
 
 logger = logging.getLogger(__name__)
 
 
+# constants
+
+# the cumulative portions of subjects and questions that go into train,
+# dev, and test
+SPLIT_PORTIONS = [0.8, 0.9, 1.0]
+
+SPLIT_NAMES = ['train', 'dev', 'test']
+
+# the portion of the rows bucketed into train that stay in train, and
+# the cumulative portion that stay in train or go to dev
+TRAIN_PORTIONS = [0.9, 0.95, 1.0]
+
+WHITESPACE_REGEX = re.compile(r'\s+')
+PUNCTUATION_REGEX = re.compile(r'[^\w\s]')
+
+
 # helper functions
 
 def _normalize(s):
     """Return a normalized version of s."""
     # Remove repeated whitespace characters.
-    s = re.sub(r'\s+', ' ', s)
+    s = WHITESPACE_REGEX.sub(' ', s)
     # Remove non-whitespace or word characters.
-    s = re.sub(r'[^\w\s]', '', s)
+    s = PUNCTUATION_REGEX.sub('', s)
     # Lowercase the string.
     s = s.lower()
     # Strip leading and trailing whitespace.
@@ -31,6 +51,370 @@ def _normalize(s):
     return s
 
 
+def _intern(s, s_to_id):
+    """Return an integer ID for the normalized version of s.
+
+    Parameters
+    ----------
+    s : str
+        The string to intern.
+    s_to_id : Dict[str, int]
+        A dictionary mapping normalized strings to their IDs, which is
+        updated with a new ID if the normalized version of ``s`` hasn't
+        been seen before.
+
+    Returns
+    -------
+    int
+        The ID for the normalized version of ``s``.
+    """
+    return s_to_id.setdefault(_normalize(s), len(s_to_id))
+
+
+def _assign_split_indices(num_ids, weights=None):
+    """Return a random split index for each of ``num_ids`` IDs.
+
+    Parameters
+    ----------
+    num_ids : int
+        The number of IDs to assign to splits.
+    weights : Optional[Sequence[int]], optional (default=None)
+        If provided, the weight of each ID. The IDs are then split so
+        that each split gets its portion of the total weight rather
+        than of the IDs, with each ID going to the split containing
+        the middle of its weight after shuffling.
+
+    Returns
+    -------
+    bytearray
+        A bytearray whose i'th element is the split index for ID i.
+    """
+    ids = list(range(num_ids))
+    random.shuffle(ids)
+
+    split_indices = bytearray(num_ids)
+    if weights is None:
+        start = 0
+        for split_index, portion in enumerate(SPLIT_PORTIONS):
+            end = int(num_ids * portion)
+            for id_ in ids[start:end]:
+                split_indices[id_] = split_index
+            start = end
+    else:
+        total_weight = sum(weights)
+        cumulative_weight = 0
+        split_index = 0
+        for id_ in ids:
+            middle = (cumulative_weight + weights[id_] / 2) / total_weight
+            while (
+                    split_index < len(SPLIT_PORTIONS) - 1
+                    and middle >= SPLIT_PORTIONS[split_index]
+            ):
+                split_index += 1
+            split_indices[id_] = split_index
+            cumulative_weight += weights[id_]
+
+    return split_indices
+
+
+def _split_rows(
+        subject_ids,
+        question_ids,
+        num_subjects,
+        num_questions,
+        question_cluster_ids=None):
+    """Return the split index for each row and its subject and question.
+
+    Parameters
+    ----------
+    subject_ids : Sequence[int]
+        The ID of the normalized subject for each row.
+    question_ids : Sequence[int]
+        The ID of the normalized question for each row.
+    num_subjects : int
+        The number of distinct normalized subjects.
+    num_questions : int
+        The number of distinct normalized questions.
+    question_cluster_ids : Optional[List[int]], optional (default=None)
+        If provided, the cluster ID for each question ID. Questions in
+        the same cluster are assigned to the same split, and the
+        clusters are weighted by their number of questions so that
+        large clusters don't skew the portions of questions in each
+        split.
+
+    Returns
+    -------
+    Tuple[bytearray, bytearray, bytearray]
+        Three bytearrays giving the split index for each row, the final
+        split index for each subject ID, and the final split index for
+        each question ID. The final split index for a subject or
+        question is the lowest split index of any row containing it.
+    """
+    subject_split_indices = _assign_split_indices(num_subjects)
+    if question_cluster_ids is None:
+        question_split_indices = _assign_split_indices(num_questions)
+    else:
+        cluster_sizes = [0] * (max(question_cluster_ids, default=-1) + 1)
+        for cluster_id in question_cluster_ids:
+            cluster_sizes[cluster_id] += 1
+        cluster_split_indices = _assign_split_indices(
+            len(cluster_sizes), weights=cluster_sizes)
+        question_split_indices = bytearray(
+            cluster_split_indices[cluster_id]
+            for cluster_id in question_cluster_ids)
+
+    # subjects and questions from train can go in dev or test, and ones
+    # from dev can go in test, so map each row to the split index that
+    # is the max of its subject's and its question's split indices.
+    row_split_indices = bytearray(
+        max(subject_split_indices[subject_id],
+            question_split_indices[question_id])
+        for subject_id, question_id in zip(subject_ids, question_ids))
+
+    # distribute some of the training data into dev and test so that we
+    # have a point of comparison for subjects and questions that have
+    # both been seen at train time.
+    train_rows = array.array('Q', (
+        i
+        for i, split_index in enumerate(row_split_indices)
+        if split_index == 0
+    ))
+    train_end = int(len(train_rows) * TRAIN_PORTIONS[0])
+    dev_end = int(len(train_rows) * TRAIN_PORTIONS[1])
+    random.shuffle(train_rows)
+    for i in train_rows[train_end:dev_end]:
+        row_split_indices[i] = 1
+    for i in train_rows[dev_end:]:
+        row_split_indices[i] = 2
+
+    # determine the finalized split indices for each subject / question
+    final_subject_split_indices = bytearray([2]) * num_subjects
+    final_question_split_indices = bytearray([2]) * num_questions
+    for subject_id, question_id, split_index in zip(
+            subject_ids, question_ids, row_split_indices):
+        if split_index < final_subject_split_indices[subject_id]:
+            final_subject_split_indices[subject_id] = split_index
+        if split_index < final_question_split_indices[question_id]:
+            final_question_split_indices[question_id] = split_index
+
+    return (
+        row_split_indices,
+        final_subject_split_indices,
+        final_question_split_indices
+    )
+
+
+def _hash_split_index(s, portions, hash_key):
+    """Return a split index for s determined by its keyed hash.
+
+    Parameters
+    ----------
+    s : str
+        The string to hash.
+    portions : List[float]
+        The cumulative portions of strings to assign to each split
+        index.
+    hash_key : bytes
+        The key for the hash.
+
+    Returns
+    -------
+    int
+        The split index for ``s``.
+    """
+    digest = hashlib.blake2b(
+        s.encode('utf-8'),
+        digest_size=8,
+        key=hash_key
+    ).digest()
+    fraction = int.from_bytes(digest, 'big') / 2 ** 64
+    for split_index, portion in enumerate(portions):
+        if fraction < portion:
+            return split_index
+
+    return len(portions) - 1
+
+
+def _append_hashed_splits(
+        data_path,
+        dataset,
+        split_paths,
+        batches_path,
+        hash_key):
+    """Append the rows from ``data_path`` to the hashed splits.
+
+    Each row's split is a function of the keyed hashes of its
+    normalized subject and question, and of the row itself, so that
+    rows can be added to existing splits without moving old ones. The
+    existing split files are only read to find the split indices of
+    the subjects and questions they already contain.
+
+    The new rows are read in two passes rather than one. A new row is
+    written with the split indices of its subject and question, which
+    are the lowest splits of any row containing them, and those aren't
+    known until every new row has been seen. The first pass computes
+    them while holding only a few bytes per row, and the second pass
+    writes the rows.
+
+    A digest of each appended batch is recorded in ``batches_path``,
+    and a batch whose digest is already there is refused, so the same
+    rows can't be appended twice.
+
+    Parameters
+    ----------
+    data_path : str
+        The path to the new rows.
+    dataset : Optional[str]
+        If provided, the dataset to read from the database at
+        ``data_path``.
+    split_paths : List[str]
+        The paths to the train, dev, and test splits, which may or may
+        not exist yet.
+    batches_path : str
+        The path to the digests of the batches already appended, one
+        per line, which may or may not exist yet.
+    hash_key : bytes
+        The key for the hashes.
+
+    Raises
+    ------
+    ValueError
+        If the batch has already been appended, or if it changes
+        between the two passes.
+    """
+    appended_batch_digests = set()
+    if os.path.exists(batches_path):
+        with open(batches_path, 'r') as batches_file:
+            appended_batch_digests = {ln.strip() for ln in batches_file}
+
+    # read the split indices of the subjects and questions that have
+    # already been written, since they must not change.
+    existing_subject_split_indices = {}
+    existing_question_split_indices = {}
+    for split_path in split_paths:
+        if not os.path.exists(split_path):
+            continue
+
+        logger.info(f'Reading existing split {split_path}.')
+
+        with _utils.open_file(split_path, 'r') as split_file:
+            for ln in split_file:
+                row = json.loads(ln)
+                subject = _normalize(row['subject'])
+                question = _normalize(row['question'])
+                existing_subject_split_indices[subject] = \
+                    row['subject_split_index']
+                existing_question_split_indices[question] = \
+                    row['question_split_index']
+
+    # first pass: compute each new row's split and the lowest split for
+    # each new subject and question.
+    logger.info(f'Reading {data_path}.')
+
+    subject_to_id = {}
+    question_to_id = {}
+    subject_ids = array.array('Q')
+    question_ids = array.array('Q')
+    row_split_indices = bytearray()
+    batch_hash = hashlib.sha256()
+    for row in _utils.read_rows(data_path, dataset):
+        row_str = json.dumps(row, sort_keys=True)
+        batch_hash.update(row_str.encode('utf-8') + b'\n')
+
+        subject = _normalize(row['subject'])
+        question = _normalize(row['question'])
+        subject_ids.append(
+            subject_to_id.setdefault(subject, len(subject_to_id)))
+        question_ids.append(
+            question_to_id.setdefault(question, len(question_to_id)))
+
+        split_index = max(
+            _hash_split_index(
+                f'subject:{subject}', SPLIT_PORTIONS, hash_key),
+            _hash_split_index(
+                f'question:{question}', SPLIT_PORTIONS, hash_key))
+        # distribute some of the training data into dev and test,
+        # like in the random splits.
+        if split_index == 0:
+            split_index = _hash_split_index(
+                f'row:{row_str}',
+                TRAIN_PORTIONS,
+                hash_key)
+        # rows must not lower the split index of subjects or
+        # questions that were already written.
+        split_index = max(
+            split_index,
+            existing_subject_split_indices.get(subject, 0),
+            existing_question_split_indices.get(question, 0))
+
+        row_split_indices.append(split_index)
+
+    batch_digest = batch_hash.hexdigest()
+    if batch_digest in appended_batch_digests:
+        raise ValueError(
+            f'The batch at {data_path} has already been appended to the'
+            f' splits.')
+
+    subject_split_indices = bytearray([2]) * len(subject_to_id)
+    for subject, subject_id in subject_to_id.items():
+        if subject in existing_subject_split_indices:
+            subject_split_indices[subject_id] = \
+                existing_subject_split_indices[subject]
+    question_split_indices = bytearray([2]) * len(question_to_id)
+    for question, question_id in question_to_id.items():
+        if question in existing_question_split_indices:
+            question_split_indices[question_id] = \
+                existing_question_split_indices[question]
+    for subject_id, question_id, split_index in zip(
+            subject_ids, question_ids, row_split_indices):
+        if split_index < subject_split_indices[subject_id]:
+            subject_split_indices[subject_id] = split_index
+        if split_index < question_split_indices[question_id]:
+            question_split_indices[question_id] = split_index
+
+    # free the memory used by the normalized strings
+    del existing_subject_split_indices
+    del existing_question_split_indices
+    del subject_to_id
+    del question_to_id
+
+    # second pass: append each row to its split
+    logger.info('Appending rows to splits.')
+
+    split_files = [
+        _utils.open_file(split_path, 'a')
+        for split_path in split_paths
+    ]
+    batch_hash = hashlib.sha256()
+    try:
+        for i, row in enumerate(_utils.read_rows(data_path, dataset)):
+            if i == len(row_split_indices):
+                raise ValueError(
+                    f'The batch at {data_path} changed while it was'
+                    f' being appended, so the splits may be'
+                    f' inconsistent.')
+            batch_hash.update(
+                json.dumps(row, sort_keys=True).encode('utf-8') + b'\n')
+
+            row['subject_split_index'] = \
+                subject_split_indices[subject_ids[i]]
+            row['question_split_index'] = \
+                question_split_indices[question_ids[i]]
+            split_files[row_split_indices[i]].write(
+                json.dumps(row) + '\n')
+    finally:
+        for split_file in split_files:
+            split_file.close()
+
+    if batch_hash.hexdigest() != batch_digest:
+        raise ValueError(
+            f'The batch at {data_path} changed while it was being'
+            f' appended, so the splits may be inconsistent.')
+
+    with open(batches_path, 'a') as batches_file:
+        batches_file.write(batch_digest + '\n')
+
+
 # main function
 
 @click.command(
@@ -43,7 +427,50 @@ def _normalize(s):
 @click.argument(
     'output_dir',
     type=click.Path(exists=True, file_okay=False, dir_okay=True))
-def create_splits(data_path, output_dir):
+@click.option(
+    '--streaming',
+    is_flag=True,
+    help='Read DATA_PATH in two passes rather than holding it in'
+         ' memory. Rows are not shuffled within each split.')
+@click.option(
+    '--hash-key',
+    type=str,
+    default=None,
+    help='Assign splits deterministically using hashes keyed by'
+         ' HASH_KEY, and append to any existing splits in OUTPUT_DIR.'
+         ' Each batch can only be appended once.')
+@click.option(
+    '--question-similarity',
+    type=float,
+    default=None,
+    help='Put near-duplicate questions in the same split, where'
+         ' near-duplicates have an estimated Jaccard similarity of at'
+         ' least QUESTION_SIMILARITY between their character trigrams.')
+@click.option(
+    '--dataset',
+    type=str,
+    default=None,
+    help='Read DATASET from the SQLite database at DATA_PATH, rather'
+         ' than reading DATA_PATH as JSON Lines.')
+@click.option(
+    '--columnar',
+    is_flag=True,
+    help='Also write each split in a columnar format that can be'
+         ' memory mapped.')
+@click.option(
+    '--compression',
+    type=click.Choice(sorted(_utils.COMPRESSION_EXTENSIONS.keys())),
+    default=None,
+    help='Compress the splits with this format.')
+def create_splits(
+        data_path,
+        output_dir,
+        streaming,
+        hash_key,
+        question_similarity,
+        dataset,
+        columnar,
+        compression):
     """Write splits for the 20Qs data at DATA_PATH to OUTPUT_DIR.
 
     Write splits for the 20 Questions data at DATA_PATH to OUTPUT_DIR,
@@ -56,7 +483,107 @@ def create_splits(data_path, output_dir):
     trailing whitespace). Thus, a subject_split_index of 1 means that
     the subject appears in dev (and potentially in test) but not
     train.
+
+    If --streaming is set, DATA_PATH is read twice: once to collect the
+    distinct subjects and questions, and once to write each row
+    directly to its split. Only the subjects, questions, and a few
+    bytes per row are held in memory, and the rows keep the order from
+    DATA_PATH within each split. It can't be combined with --hash-key.
+
+    If --hash-key is set, the splits for subjects and questions are
+    chosen with keyed hashes of their normalized text rather than at
+    random, and the rows are appended to any splits already in
+    OUTPUT_DIR. Running the command again on a new batch with the same
+    key adds the batch to the splits without moving any old rows. The
+    split indices of subjects and questions already in the splits never
+    change, so new rows containing them may be placed in a later split
+    than their hashes would give. The new batch is read twice, since a
+    row's subject_split_index and question_split_index depend on every
+    row in the batch, and the existing splits are read once to find
+    the split indices they already hold. A digest of each appended
+    batch is recorded in twentyquestions-batches.txt in OUTPUT_DIR, and
+    a batch that has already been appended is refused.
+
+    With --hash-key and --dataset, all of DATASET is the batch. Load
+    each new batch into its own dataset rather than appending it to an
+    existing one, since appending a dataset that has grown since it was
+    last used would add its old rows again. DATASET must not change
+    while it's being appended.
+
+    If --question-similarity is set, questions are also clustered with
+    their near-duplicates (e.g., "Is it bigger than a car?" and "is it
+    larger than a car") using MinHash and locality sensitive hashing,
+    and each cluster of questions is assigned to a single split. It
+    can't be combined with --hash-key.
+
+    DATA_PATH is decompressed if it ends in .gz or .zst. If
+    --compression is set, the splits are written compressed with that
+    format instead, e.g. to twentyquestions-train.jsonl.gz for gzip.
+
+    If --dataset is set, DATA_PATH should be a database written by the
+    loaddb command, and the rows are read from DATASET.
+
+    If --columnar is set, each split is also written to a
+    twentyquestions-{train,dev,test} directory in a columnar format,
+    with the subject, question, and answer dictionary-encoded. Load
+    those directories with ``scripts._columnar.load``. It can't be
+    combined with --hash-key.
     """
+    extension = '.jsonl'
+    if compression is not None:
+        extension += _utils.COMPRESSION_EXTENSIONS[compression]
+    split_paths = [
+        os.path.join(output_dir, f'twentyquestions-{split_name}{extension}')
+        for split_name in SPLIT_NAMES
+    ]
+    batches_path = os.path.join(output_dir, 'twentyquestions-batches.txt')
+    if columnar:
+        columnar_writers = [
+            _columnar.ColumnarWriter(
+                os.path.join(output_dir, f'twentyquestions-{split_name}'))
+            for split_name in SPLIT_NAMES
+        ]
+
+    if question_similarity is not None and not 0 <= question_similarity <= 1:
+        raise click.BadParameter(
+            'The question similarity must be between 0 and 1.',
+            param_hint='--question-similarity')
+
+    if hash_key is not None:
+        if question_similarity is not None:
+            raise click.BadParameter(
+                'Near-duplicate questions cannot be clustered with'
+                ' hashed splits.',
+                param_hint='--question-similarity')
+        if columnar:
+            raise click.BadParameter(
+                'Hashed splits cannot be written in a columnar format.',
+                param_hint='--columnar')
+        if streaming:
+            raise click.BadParameter(
+                'Hashed splits are always written in two streaming passes,'
+                ' so they cannot be combined with --streaming.',
+                param_hint='--streaming')
+
+        hash_key = hash_key.encode('utf-8')
+        if len(hash_key) > hashlib.blake2b.MAX_KEY_SIZE:
+            raise click.BadParameter(
+                f'The hash key must be at most'
+                f' {hashlib.blake2b.MAX_KEY_SIZE} bytes.',
+                param_hint='--hash-key')
+
+        try:
+            _append_hashed_splits(
+                data_path=data_path,
+                dataset=dataset,
+                split_paths=split_paths,
+                batches_path=batches_path,
+                hash_key=hash_key)
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint='DATA_PATH')
+
+        return
+
     # The structure of the splits is a bit complicated. We want a
     # train, dev, and test set where the dev and test set have a good
     # number of subjects and questions which do not appear in the
@@ -65,104 +592,92 @@ def create_splits(data_path, output_dir):
     # in train, dev, and test, then we'll put each instance into the
     # nine {subject, question} -> {train, dev, test} buckets, lastly
     # we'll split the buckets into actual train, dev, and test sets.
+    #
+    # Each subject and question is normalized once and interned as an
+    # integer ID, so all the bookkeeping is done on IDs.
 
     logger.info(f'Reading {data_path}.')
 
-    with click.open_file(data_path, 'r') as data_file:
-       rows = []
-       for ln in data_file:
-           rows.append(json.loads(ln))
-
-    logger.info('Bucketing instances by subjects and questions.')
-
-    subjects = list(set([_normalize(row['subject']) for row in rows]))
-    random.shuffle(subjects)
-    questions = list(set([_normalize(row['question']) for row in rows]))
-    random.shuffle(questions)
-
-    subject_to_split_index = {}
-    start = 0
-    for split_index, portion in enumerate([0.8, 0.9, 1.0]):
-        end = int(len(subjects) * portion)
-        for subject in subjects[start:end]:
-            subject_to_split_index[subject] = split_index
-        start = end
-
-    question_to_split_index = {}
-    start = 0
-    for split_index, portion in enumerate([0.8, 0.9, 1.0]):
-        end = int(len(questions) * portion)
-        for question in questions[start:end]:
-            question_to_split_index[question] = split_index
-        start = end
-
-    # subject_question_instances:
-    #   first index: the split index of the subject
-    #   second index: the split index of the question
-    subject_question_instances = [
-        [[], [], []],
-        [[], [], []],
-        [[], [], []]
-    ]
-    for row in rows:
-        subject_question_instances\
-            [subject_to_split_index[_normalize(row['subject'])]]\
-            [question_to_split_index[_normalize(row['question'])]]\
-            .append(row)
+    subject_to_id = {}
+    question_to_id = {}
+    subject_ids = array.array('Q')
+    question_ids = array.array('Q')
+    rows = []
+    for row in _utils.read_rows(data_path, dataset):
+        subject_ids.append(_intern(row['subject'], subject_to_id))
+        question_ids.append(_intern(row['question'], question_to_id))
+        if not streaming:
+            rows.append(row)
+
+    if question_similarity is not None:
+        logger.info('Clustering near-duplicate questions.')
+
+        question_cluster_ids = _minhash.cluster(
+            list(question_to_id.keys()),
+            threshold=question_similarity)
+    else:
+        question_cluster_ids = None
 
     logger.info('Splitting instances into train, dev, and test.')
 
-    # first list is train, second is dev, third is test
-    splits = [[], [], []]
-    # subjects and questions from train can go in dev or test, and ones
-    # from dev can go in test, so map each bucket to the split index
-    # that is the max of the row and column indices.
-    for i, row in enumerate(subject_question_instances):
-        for j, col in enumerate(row):
-            splits[max(i, j)].extend(col)
+    row_split_indices, subject_split_indices, question_split_indices = \
+        _split_rows(
+            subject_ids=subject_ids,
+            question_ids=question_ids,
+            num_subjects=len(subject_to_id),
+            num_questions=len(question_to_id),
+            question_cluster_ids=question_cluster_ids)
+
+    # free the memory used by the normalized strings
+    del subject_to_id
+    del question_to_id
 
-    # distribute some of the training data into dev and test so that we
-    # have a point of comparison for subjects and questions that have
-    # both been seen at train time.
-    train, dev, test = splits
-    train_end = int(len(train) * 0.9)
-    dev_end = int(len(train) * 0.95)
-    random.shuffle(train)
-    test.extend(train[dev_end:])
-    dev.extend(train[train_end:dev_end])
-    train = train[:train_end]
-    splits = [train, dev, test]
-
-    # shuffle all the splits
-    for split in splits:
-        random.shuffle(split)
-
-    # determine the finalized split indices for each subject / question,
-    # then write to disk
     logger.info('Writing splits to disk.')
-    subject_to_final_split_index = {}
-    question_to_final_split_index = {}
-    for final_split_index, split in enumerate(splits):
-        for row in split:
-            normalized_subject = _normalize(row['subject'])
-            if normalized_subject not in subject_to_final_split_index:
-                subject_to_final_split_index[normalized_subject] = \
-                    final_split_index
-            normalized_question = _normalize(row['question'])
-            if normalized_question not in question_to_final_split_index:
-                question_to_final_split_index[normalized_question] = \
-                    final_split_index
-
-    for split_name, split in zip(['train', 'dev', 'test'], splits):
-        split_path = os.path.join(
-            output_dir, f'twentyquestions-{split_name}.jsonl')
-        with click.open_file(split_path, 'w') as split_file:
-            for row in split:
-                row['subject_split_index'] = subject_to_final_split_index[
-                    _normalize(row['subject'])]
-                row['question_split_index'] = question_to_final_split_index[
-                    _normalize(row['question'])]
-                split_file.write(json.dumps(row) + '\n')
+
+    if streaming:
+        split_files = [
+            _utils.open_file(split_path, 'w')
+            for split_path in split_paths
+        ]
+        try:
+            for i, row in enumerate(_utils.read_rows(data_path, dataset)):
+                row['subject_split_index'] = \
+                    subject_split_indices[subject_ids[i]]
+                row['question_split_index'] = \
+                    question_split_indices[question_ids[i]]
+                split_files[row_split_indices[i]].write(
+                    json.dumps(row) + '\n')
+                if columnar:
+                    columnar_writers[row_split_indices[i]].add(row)
+        finally:
+            for split_file in split_files:
+                split_file.close()
+    else:
+        # first list is train, second is dev, third is test
+        splits = [[], [], []]
+        for i, split_index in enumerate(row_split_indices):
+            splits[split_index].append(i)
+
+        # shuffle all the splits
+        for split in splits:
+            random.shuffle(split)
+
+        for split_index, (split_path, split) in enumerate(
+                zip(split_paths, splits)):
+            with _utils.open_file(split_path, 'w') as split_file:
+                for i in split:
+                    row = rows[i]
+                    row['subject_split_index'] = \
+                        subject_split_indices[subject_ids[i]]
+                    row['question_split_index'] = \
+                        question_split_indices[question_ids[i]]
+                    split_file.write(json.dumps(row) + '\n')
+                    if columnar:
+                        columnar_writers[split_index].add(row)
+
+    if columnar:
+        for columnar_writer in columnar_writers:
+            columnar_writer.close()
 
 
 if __name__ == '__main__':
@@ -3,6 +3,7 @@
 See ``python extractgames.py --help`` for more information.
 """
 
+import hashlib
 import json
 import logging
 
@@ -14,6 +15,36 @@ from scripts import _utils
 logger = logging.getLogger(__name__)
 
 
+# constants
+
+# the number of bytes in the hashes used to deduplicate games
+DIGEST_SIZE = 16
+
+
+# helper functions
+
+def _canonical_hash(game):
+    """Return a hash of ``game`` that ignores formatting and key order.
+
+    Parameters
+    ----------
+    game : Dict[str, Any]
+        The game to hash.
+
+    Returns
+    -------
+    bytes
+        The hash of ``game``'s canonical JSON serialization, i.e. with
+        sorted keys and no extra whitespace.
+    """
+    canonical_json = json.dumps(
+        game, sort_keys=True, separators=(',', ':'))
+    return hashlib.blake2b(
+        canonical_json.encode('utf-8'),
+        digest_size=DIGEST_SIZE
+    ).digest()
+
+
 # main function
 
 @click.command(
@@ -22,36 +53,85 @@ logger = logging.getLogger(__name__)
         })
 @click.argument(
     'xml_dir',
-    type=click.Path(exists=True, file_okay=False, dir_okay=True))
+    type=click.Path(exists=True, file_okay=True, dir_okay=True))
 @click.argument(
     'output_path',
     type=click.Path(exists=False, file_okay=True, dir_okay=False))
-def extractgames(xml_dir, output_path):
+@click.option(
+    '--dataset',
+    type=str,
+    default=None,
+    help='Write to DATASET in the SQLite database at OUTPUT_PATH, rather'
+         ' than writing OUTPUT_PATH as JSON Lines.')
+def extractgames(xml_dir, output_path, dataset):
     """Extract games from XML_DIR and write to OUTPUT_PATH.
 
     Extract the 20 Questions game data from a batch of 20 Questions
     HITs. XML_DIR should be the XML directory of one of the 20 Questions
     HIT batches, extracted with AMTI. OUTPUT_PATH is the location to
     which the data will be written.
+
+    Every player in a game submits a copy of it, so games are
+    deduplicated by a hash of their contents that ignores key order and
+    whitespace. Copies of the same game room with different contents
+    are reported and all kept.
+
+    XML_DIR may also be a tar (optionally compressed) or zip archive of
+    the XML directory, which is read without unpacking it.
+
+    If --dataset is set, OUTPUT_PATH should be a SQLite database (see
+    the loaddb command), and the rows are written to DATASET.
     """
     # submissions : the form data submitted from the twentyquestions
-    # HITs as a list of dictionaries mapping the question identifiers to
-    # the free text, i.e.:
+    # HITs as an iterator of dictionaries mapping the question
+    # identifiers to the free text, i.e.:
     #
     #     [{'gameRoomJson': game_room_json_string}, ...]
     #
-    submissions = _utils.extract_xml_dir(xml_dir)
+    submissions = _utils.iter_xml_dir(xml_dir)
 
     # deduplicate the games because each crowdworker who participates in
-    # the game submits a copy of the game data.
-    game_jsons = set([
-        submission['gameRoomJson']
-        for submission in submissions
-    ])
+    # the game submits a copy of the game data. Only the hashes of the
+    # games are kept in memory, and the games are written out as they're
+    # found.
+    seen_hashes = set()
+    room_id_to_hash = {}
+    conflicting_room_ids = set()
+    num_games = 0
+
+    def game_jsons():
+        """Yield each distinct game as JSON."""
+        nonlocal num_games
+
+        for submission in submissions:
+            game = json.loads(submission['gameRoomJson'])
+            game_hash = _canonical_hash(game)
+
+            # copies of the same game should be identical, so report
+            # any that disagree.
+            room_id = game.get('roomId')
+            if room_id is not None:
+                room_hash = room_id_to_hash.setdefault(room_id, game_hash)
+                if room_hash != game_hash \
+                        and room_id not in conflicting_room_ids:
+                    logger.warning(
+                        f'Found copies of the game in room {room_id}'
+                        f' with different contents.')
+                    conflicting_room_ids.add(room_id)
+
+            if game_hash in seen_hashes:
+                continue
+            seen_hashes.add(game_hash)
+
+            num_games += 1
+            yield json.dumps(game)
 
     # write out the data
-    with click.open_file(output_path, 'w') as output_file:
-        output_file.write('\n'.join(game_jsons))
+    _utils.write_rows(output_path, game_jsons(), dataset=dataset)
+
+    logger.info(
+        f'Wrote {num_games} distinct games. {len(conflicting_room_ids)}'
+        f' rooms had conflicting copies, which were all kept.')
 
 
 if __name__ == '__main__':
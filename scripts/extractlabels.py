@@ -3,14 +3,13 @@
 See ``python extractlabels.py --help`` for more information.
 """
 
-import ast
 import collections
 import json
 import logging
 
 import click
 
-from scripts import _utils
+from scripts import _aggregation, _decoding, _sorting, _utils
 
 
 logger = logging.getLogger(__name__)
@@ -24,7 +23,7 @@ KEY_SCHEMA = {
     'subject': str,
     'question': str,
     'answer': lambda x: None if x == 'None' else str(x),
-    'quality_labels': ast.literal_eval,  # List[str]
+    'quality_labels': _decoding.literal,  # List[str]
     'score': int,
     'high_quality': bool
 }
@@ -38,6 +37,8 @@ LABEL_TO_BIT = {
     'bad': 0
 }
 
+AGGREGATIONS = ['majority', 'em']
+
 
 # main function
 
@@ -47,11 +48,31 @@ LABEL_TO_BIT = {
         })
 @click.argument(
     'xml_dir',
-    type=click.Path(exists=True, file_okay=False, dir_okay=True))
+    type=click.Path(exists=True, file_okay=True, dir_okay=True))
 @click.argument(
     'output_path',
     type=click.Path(exists=False, file_okay=True, dir_okay=False))
-def extractlabels(xml_dir, output_path):
+@click.option(
+    '--aggregation',
+    type=click.Choice(AGGREGATIONS),
+    default='majority',
+    help='How to aggregate the labels. "em" additionally estimates'
+         ' worker reliabilities with Dawid-Skene EM. Defaults to'
+         ' "majority".')
+@click.option(
+    '--memory-budget',
+    type=int,
+    default=_sorting.MEMORY_BUDGET,
+    help='The memory (in MB) of rows to hold when sorting the output'
+         ' before spilling to disk. It\'s estimated from the sizes of the'
+         ' serialized rows, not measured, so the process uses more.')
+@click.option(
+    '--dataset',
+    type=str,
+    default=None,
+    help='Write to DATASET in the SQLite database at OUTPUT_PATH, rather'
+         ' than writing OUTPUT_PATH as JSON Lines.')
+def extractlabels(xml_dir, output_path, aggregation, memory_budget, dataset):
     """Extract labeling data from XML_DIR and write to OUTPUT_PATH.
 
     Extract the subject-question pair labeling data from a batch of the
@@ -62,6 +83,17 @@ def extractlabels(xml_dir, output_path):
     giving the majority (true / false) vote, a "true_votes" attribute
     giving the number of votes for "true", and an "is_bad" attribute
     giving whether or not any annotators labeled the assertion as "bad".
+
+    If --aggregation is "em", each instance will also have an
+    "em_probability" attribute giving the posterior probability that
+    the assertion is true, estimated with the Dawid-Skene model of
+    per-worker reliability.
+
+    XML_DIR may also be a tar (optionally compressed) or zip archive of
+    the XML directory, which is read without unpacking it.
+
+    If --dataset is set, OUTPUT_PATH should be a SQLite database (see
+    the loaddb command), and the rows are written to DATASET.
     """
     # submissions : the form data submitted from the question labeling
     # HITs as a list of dictionaries mapping the question identifiers to
@@ -78,7 +110,8 @@ def extractlabels(xml_dir, output_path):
     # See the data for individual attributes and values. The index (idx)
     # is used because each HIT had the worker label multiple instances
     # for efficiency purposes.
-    submissions = _utils.extract_xml_dir(xml_dir)
+    submissions = _utils.extract_xml_dir(
+        xml_dir, include_worker_id=aggregation == 'em')
 
     # decode the data from the ``"attribute-idx": value`` style to the
     # individual rows.
@@ -87,12 +120,23 @@ def extractlabels(xml_dir, output_path):
     # aggregate all the labels for each instance, since we had multiple
     # assignments / workers per instance.
     key_to_labels = collections.defaultdict(list)
+    key_to_worker_ids = collections.defaultdict(list)
     for row in rows:
         key = _utils.key(row, KEY_SCHEMA.keys())
         key_to_labels[key].append(row['label'])
+        key_to_worker_ids[key].append(row.get(_utils.WORKER_ID_KEY))
+
+    # estimate the probability that each assertion is true from the
+    # worker reliabilities.
+    if aggregation == 'em':
+        key_to_probability = _aggregation.estimate_probabilities(
+            key_to_labels=key_to_labels,
+            key_to_worker_ids=key_to_worker_ids,
+            label_to_bit=LABEL_TO_BIT)
 
     # create the new rows by processing the aggregated labels
-    new_row_strs = []
+    decode_key = _decoding.compile_schema(KEY_SCHEMA)
+    sorter = _sorting.ExternalSorter(memory_budget=memory_budget)
     for key, labels in key_to_labels.items():
         assert len(labels) == EXPECTED_NUM_LABELS, (
             f'{key} only has {len(labels)} assertion labels.'
@@ -101,13 +145,9 @@ def extractlabels(xml_dir, output_path):
 
         # create the new row
 
-        # use an OrderedDict so the keys appear in the right order in
-        # the JSON.
-        new_row = collections.OrderedDict([
-            (attribute, as_type(value))
-            for (attribute, as_type), value
-            in zip(KEY_SCHEMA.items(), key)
-        ])
+        # decode_key returns an OrderedDict so the keys appear in the
+        # right order in the JSON.
+        new_row = decode_key(key)
 
         # compute new attributes to add
         is_bad = 'bad' in labels
@@ -119,12 +159,13 @@ def extractlabels(xml_dir, output_path):
         new_row['is_bad'] = is_bad
         new_row['true_votes'] = true_votes
         new_row['majority'] = majority
+        if aggregation == 'em':
+            new_row['em_probability'] = key_to_probability[key]
 
-        new_row_strs.append(json.dumps(new_row))
+        sorter.add(json.dumps(new_row))
 
     # write out the data
-    with click.open_file(output_path, 'w') as output_file:
-        output_file.write('\n'.join(sorted(new_row_strs)))
+    _utils.write_rows(output_path, sorter, dataset=dataset)
 
 
 if __name__ == '__main__':
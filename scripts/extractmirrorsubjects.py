@@ -3,15 +3,13 @@
 See ``python extractmirrorsubjects.py --help`` for more information.
 """
 
-import ast
-import collections
 import json
 import logging
 import re
 
 import click
 
-from scripts import _utils
+from scripts import _decoding, _sorting, _utils
 
 
 logger = logging.getLogger(__name__)
@@ -23,13 +21,13 @@ KEY_SCHEMA = {
     'subject': str,
     'question': str,
     'answer': str,
-    'quality_labels': ast.literal_eval,  # List[str]
+    'quality_labels': _decoding.literal,  # List[str]
     'score': int,
     'high_quality': bool,
-    'labels': ast.literal_eval,  # List[str]
+    'labels': _decoding.literal,  # List[str]
     'is_bad': bool,
     'true_votes': int,
-    'majority': ast.literal_eval
+    'majority': _decoding.literal
 }
 
 
@@ -41,17 +39,36 @@ KEY_SCHEMA = {
         })
 @click.argument(
     'xml_dir',
-    type=click.Path(exists=True, file_okay=False, dir_okay=True))
+    type=click.Path(exists=True, file_okay=True, dir_okay=True))
 @click.argument(
     'output_path',
     type=click.Path(exists=False, file_okay=True, dir_okay=False))
-def extractmirrorsubjects(xml_dir, output_path):
+@click.option(
+    '--memory-budget',
+    type=int,
+    default=_sorting.MEMORY_BUDGET,
+    help='The memory (in MB) of rows to hold when sorting the output'
+         ' before spilling to disk. It\'s estimated from the sizes of the'
+         ' serialized rows, not measured, so the process uses more.')
+@click.option(
+    '--dataset',
+    type=str,
+    default=None,
+    help='Write to DATASET in the SQLite database at OUTPUT_PATH, rather'
+         ' than writing OUTPUT_PATH as JSON Lines.')
+def extractmirrorsubjects(xml_dir, output_path, memory_budget, dataset):
     """Extract mirror subjects from XML_DIR and write to OUTPUT_PATH.
 
     Extract mirror subject data from a batch of the mirror subjects
     HITs. XML_DIR should be an XML directory extracted with AMTI.
     OUTPUT_PATH is the location to which the data will be written in
     JSON Lines format.
+
+    XML_DIR may also be a tar (optionally compressed) or zip archive of
+    the XML directory, which is read without unpacking it.
+
+    If --dataset is set, OUTPUT_PATH should be a SQLite database (see
+    the loaddb command), and the rows are written to DATASET.
     """
     # submissions : the form data submitted from the
     # mirror-subjects HITs as a list of dictionaries mapping the
@@ -76,17 +93,14 @@ def extractmirrorsubjects(xml_dir, output_path):
 
     # coerce the data types correctly and add in the new attribute.
     new_subjects_skipped = 0
-    new_row_strs = []
+    decode_key = _decoding.compile_schema(KEY_SCHEMA)
+    sorter = _sorting.ExternalSorter(memory_budget=memory_budget)
     for row in rows:
         # create the new row
 
-        # use an OrderedDict so that the keys appear in the right order
-        # in the JSON.
-        new_row = collections.OrderedDict([
-            (attribute, as_type(row[attribute]))
-            for attribute, as_type
-            in KEY_SCHEMA.items()
-        ])
+        # decode_key returns an OrderedDict so that the keys appear in
+        # the right order in the JSON.
+        new_row = decode_key(_utils.key(row, KEY_SCHEMA.keys()))
 
         # clean up the raw text of the new subject
         # strip whitespace and lowercase
@@ -124,15 +138,14 @@ def extractmirrorsubjects(xml_dir, output_path):
         del new_row['true_votes']
         del new_row['majority']
 
-        new_row_strs.append(json.dumps(new_row))
+        sorter.add(json.dumps(new_row))
 
     if new_subjects_skipped > 0:
         logger.warning(
             f'{new_subjects_skipped} new subjects were skipped.')
 
     # write out the data
-    with click.open_file(output_path, 'w') as output_file:
-        output_file.write('\n'.join(sorted(new_row_strs)))
+    _utils.write_rows(output_path, sorter, dataset=dataset)
 
 
 if __name__ == '__main__':
@@ -9,7 +9,7 @@ import logging
 
 import click
 
-from scripts import _utils
+from scripts import _aggregation, _sorting, _utils
 
 
 logger = logging.getLogger(__name__)
@@ -35,6 +35,8 @@ QUALITY_TO_BIT = {
     'good': 1
 }
 
+AGGREGATIONS = ['majority', 'em']
+
 
 # main function
 
@@ -44,11 +46,31 @@ QUALITY_TO_BIT = {
         })
 @click.argument(
     'xml_dir',
-    type=click.Path(exists=True, file_okay=False, dir_okay=True))
+    type=click.Path(exists=True, file_okay=True, dir_okay=True))
 @click.argument(
     'output_path',
     type=click.Path(exists=False, file_okay=True, dir_okay=False))
-def extractquality(xml_dir, output_path):
+@click.option(
+    '--aggregation',
+    type=click.Choice(AGGREGATIONS),
+    default='majority',
+    help='How to aggregate the quality labels. "em" additionally'
+         ' estimates worker reliabilities with Dawid-Skene EM. Defaults'
+         ' to "majority".')
+@click.option(
+    '--memory-budget',
+    type=int,
+    default=_sorting.MEMORY_BUDGET,
+    help='The memory (in MB) of rows to hold when sorting the output'
+         ' before spilling to disk. It\'s estimated from the sizes of the'
+         ' serialized rows, not measured, so the process uses more.')
+@click.option(
+    '--dataset',
+    type=str,
+    default=None,
+    help='Write to DATASET in the SQLite database at OUTPUT_PATH, rather'
+         ' than writing OUTPUT_PATH as JSON Lines.')
+def extractquality(xml_dir, output_path, aggregation, memory_budget, dataset):
     """Extract quality labels from XML_DIR and write to OUTPUT_PATH.
 
     Extract the quality annotations from a batch of the quality control
@@ -59,6 +81,17 @@ def extractquality(xml_dir, output_path):
     3 workers rated it 'good'. Note, this script assumes that all
     the batches had all 3 assignments completed. If there are not 3
     completed assignments for each HIT, the script will throw an error.
+
+    If --aggregation is "em", each instance will also have an
+    "em_probability" attribute giving the posterior probability that
+    the question is good, estimated with the Dawid-Skene model of
+    per-worker reliability.
+
+    XML_DIR may also be a tar (optionally compressed) or zip archive of
+    the XML directory, which is read without unpacking it.
+
+    If --dataset is set, OUTPUT_PATH should be a SQLite database (see
+    the loaddb command), and the rows are written to DATASET.
     """
     # submissions : the form data submitted from the quality control
     # HITs as a list of dictionaries mapping the question identifiers to
@@ -75,7 +108,8 @@ def extractquality(xml_dir, output_path):
     # See the data for individual attributes and values. The index (idx)
     # is used because each HIT had the worker label multiple instances
     # for efficiency purposes.
-    submissions = _utils.extract_xml_dir(xml_dir)
+    submissions = _utils.extract_xml_dir(
+        xml_dir, include_worker_id=aggregation == 'em')
 
     # decode the data from the ``"attribute-idx": value`` style to the
     # individual rows.
@@ -84,12 +118,22 @@ def extractquality(xml_dir, output_path):
     # aggregate all the quality labels for each instance, since we had
     # multiple assignments / workers per instance.
     key_to_qualities = collections.defaultdict(list)
+    key_to_worker_ids = collections.defaultdict(list)
     for row in rows:
         key = _utils.key(row, KEY_SCHEMA.keys())
         key_to_qualities[key].append(row['quality'])
+        key_to_worker_ids[key].append(row.get(_utils.WORKER_ID_KEY))
+
+    # estimate the probability that each question is good from the
+    # worker reliabilities.
+    if aggregation == 'em':
+        key_to_probability = _aggregation.estimate_probabilities(
+            key_to_labels=key_to_qualities,
+            key_to_worker_ids=key_to_worker_ids,
+            label_to_bit=QUALITY_TO_BIT)
 
     # create the new rows by processing the aggregated quality labels
-    new_row_strs = []
+    sorter = _sorting.ExternalSorter(memory_budget=memory_budget)
     for key, qualities in key_to_qualities.items():
         assert len(qualities) == EXPECTED_NUM_QUALITIES, (
             f'{key} only has {len(qualities)} quality labels.'
@@ -114,12 +158,13 @@ def extractquality(xml_dir, output_path):
         new_row['quality_labels'] = qualities
         new_row['score'] = score
         new_row['high_quality'] = high_quality
+        if aggregation == 'em':
+            new_row['em_probability'] = key_to_probability[key]
 
-        new_row_strs.append(json.dumps(new_row))
+        sorter.add(json.dumps(new_row))
 
     # write out the data
-    with click.open_file(output_path, 'w') as output_file:
-        output_file.write('\n'.join(sorted(new_row_strs)))
+    _utils.write_rows(output_path, sorter, dataset=dataset)
 
 
 if __name__ == '__main__':
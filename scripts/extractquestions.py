@@ -6,10 +6,11 @@ See ``python extractquestions.py --help`` for more information.
 import collections
 import json
 import logging
+import os
 
 import click
 
-from scripts import _utils
+from scripts import _fingerprints, _sorting, _utils
 
 
 logger = logging.getLogger(__name__)
@@ -23,28 +24,78 @@ logger = logging.getLogger(__name__)
         })
 @click.argument(
     'xml_dir',
-    type=click.Path(exists=True, file_okay=False, dir_okay=True))
+    type=click.Path(exists=True, file_okay=True, dir_okay=True))
 @click.argument(
     'output_path',
     type=click.Path(exists=False, file_okay=True, dir_okay=False))
-def extractquestions(xml_dir, output_path):
+@click.option(
+    '--memory-budget',
+    type=int,
+    default=_sorting.MEMORY_BUDGET,
+    help='The memory (in MB) of rows to hold when sorting the output'
+         ' before spilling to disk. It\'s estimated from the sizes of the'
+         ' serialized rows, not measured, so the process uses more.')
+@click.option(
+    '--dataset',
+    type=str,
+    default=None,
+    help='Write to DATASET in the SQLite database at OUTPUT_PATH, rather'
+         ' than writing OUTPUT_PATH as JSON Lines.')
+@click.option(
+    '--seen-index',
+    type=click.Path(exists=False, file_okay=True, dir_okay=False),
+    default=None,
+    help='An index of the triples extracted from previous batches. Only'
+         ' triples missing from the index are written, and then they are'
+         ' added to it.')
+@click.option(
+    '--batch',
+    type=str,
+    default=None,
+    help='The name of the batch to record with each triple when using'
+         ' --seen-index. Defaults to the name of XML_DIR.')
+def extractquestions(
+        xml_dir,
+        output_path,
+        memory_budget,
+        dataset,
+        seen_index,
+        batch):
     """Extract questions from XML_DIR and write to OUTPUT_PATH.
 
     Extract all unique subject-question-answer triples from a batch of
     20 Questions HITs. XML_DIR should be the XML directory of one of
     the 20 Questions HIT batches, extracted with AMTI. OUTPUT_PATH is
     the location to which the data will be written.
+
+    To extract many batches without repeating triples, pass the same
+    --seen-index to each run. Only the triples not seen in a previous
+    batch are written, each with a "batch" attribute recording the
+    batch it came from, and the index is updated once the output is
+    written.
+
+    XML_DIR may also be a tar (optionally compressed) or zip archive of
+    the XML directory, which is read without unpacking it.
+
+    If --dataset is set, OUTPUT_PATH should be a SQLite database (see
+    the loaddb command), and the rows are written to DATASET.
     """
     # submissions : the form data submitted from the twentyquestions
-    #   HITs as a list of dictionaries mapping the question identifiers
+    #   HITs as an iterator of dictionaries mapping the question identifiers
     #   to the free text, i.e.:
     #
     #     [{'gameRoomJson': game_room_json_string}, ...]
     #
-    submissions = _utils.extract_xml_dir(xml_dir)
+    submissions = _utils.iter_xml_dir(xml_dir)
+
+    if seen_index is not None:
+        index = _fingerprints.FingerprintIndex(seen_index)
+        if batch is None:
+            batch = os.path.basename(os.path.normpath(xml_dir))
 
     # extract the rows from the game room jsons
-    row_strs = set()
+    sorter = _sorting.ExternalSorter(
+        memory_budget=memory_budget, unique=True)
     for submission in submissions:
         data = json.loads(submission['gameRoomJson'])
 
@@ -59,11 +110,22 @@ def extractquestions(xml_dir, output_path):
                 ('question', questionAndAnswer['question']['questionText']),
                 ('answer', questionAndAnswer['answer']['answerValue'])
             ])
-            row_strs.add(json.dumps(row))
+
+            if seen_index is not None:
+                triple = list(row.values())
+                if triple in index:
+                    continue
+                index.add(triple)
+                row['batch'] = batch
+
+            sorter.add(json.dumps(row))
 
     # write out the data
-    with click.open_file(output_path, 'w') as output_file:
-        output_file.write('\n'.join(sorted(row_strs)))
+    _utils.write_rows(output_path, sorter, dataset=dataset)
+
+    # only record the new triples once they've been written
+    if seen_index is not None:
+        index.save()
 
 
 if __name__ == '__main__':
@@ -3,14 +3,13 @@
 See ``python extracttypes.py --help`` for more information.
 """
 
-import ast
 import collections
 import json
 import logging
 
 import click
 
-from scripts import _utils
+from scripts import _decoding, _sorting, _utils
 
 
 logger = logging.getLogger(__name__)
@@ -24,7 +23,7 @@ KEY_SCHEMA = {
     'subject': str,
     'question': str,
     'answer': str,
-    'quality_labels': ast.literal_eval,  # List[str]
+    'quality_labels': _decoding.literal,  # List[str]
     'score': int,
     'high_quality': bool
 }
@@ -38,11 +37,24 @@ KEY_SCHEMA = {
         })
 @click.argument(
     'xml_dir',
-    type=click.Path(exists=True, file_okay=False, dir_okay=True))
+    type=click.Path(exists=True, file_okay=True, dir_okay=True))
 @click.argument(
     'output_path',
     type=click.Path(exists=False, file_okay=True, dir_okay=False))
-def extracttypes(xml_dir, output_path):
+@click.option(
+    '--memory-budget',
+    type=int,
+    default=_sorting.MEMORY_BUDGET,
+    help='The memory (in MB) of rows to hold when sorting the output'
+         ' before spilling to disk. It\'s estimated from the sizes of the'
+         ' serialized rows, not measured, so the process uses more.')
+@click.option(
+    '--dataset',
+    type=str,
+    default=None,
+    help='Write to DATASET in the SQLite database at OUTPUT_PATH, rather'
+         ' than writing OUTPUT_PATH as JSON Lines.')
+def extracttypes(xml_dir, output_path, memory_budget, dataset):
     """Extract commonsense types from XML_DIR and write to OUTPUT_PATH.
 
     Extract the commonsense types for each subject-question pair from a
@@ -53,6 +65,12 @@ def extracttypes(xml_dir, output_path):
     true or false label. Additionally, each instance will also have a
     "type_scores" attribute which gives the raw count of votes for each
     type.
+
+    XML_DIR may also be a tar (optionally compressed) or zip archive of
+    the XML directory, which is read without unpacking it.
+
+    If --dataset is set, OUTPUT_PATH should be a SQLite database (see
+    the loaddb command), and the rows are written to DATASET.
     """
     # submissions : the form data submitted from the commonsense type
     # HITs as a list of dictionaries mapping the question identifiers to
@@ -100,7 +118,8 @@ def extracttypes(xml_dir, output_path):
         key_to_type_scores[key]['association'] += int(row.get('association', 0))
 
     # create the new rows by processing the aggregated types
-    new_row_strs = []
+    decode_key = _decoding.compile_schema(KEY_SCHEMA)
+    sorter = _sorting.ExternalSorter(memory_budget=memory_budget)
     for key, type_scores in key_to_type_scores.items():
         total_votes = type_scores.pop('total_votes')
         assert total_votes == EXPECTED_NUM_VOTES, (
@@ -110,13 +129,9 @@ def extracttypes(xml_dir, output_path):
 
         # create the new row
 
-        # use an OrderedDict so the keys appear in the right order in
-        # the JSON.
-        new_row = collections.OrderedDict([
-            (attribute, as_type(value))
-            for (attribute, as_type), value
-            in zip(KEY_SCHEMA.items(), key)
-        ])
+        # decode_key returns an OrderedDict so the keys appear in the
+        # right order in the JSON.
+        new_row = decode_key(key)
 
         # compute new attributes to add
         types = {
@@ -128,11 +143,10 @@ def extracttypes(xml_dir, output_path):
         new_row['types'] = types
         new_row['type_scores'] = type_scores
 
-        new_row_strs.append(json.dumps(new_row))
+        sorter.add(json.dumps(new_row))
 
     # write out the data
-    with click.open_file(output_path, 'w') as output_file:
-        output_file.write('\n'.join(sorted(new_row_strs)))
+    _utils.write_rows(output_path, sorter, dataset=dataset)
 
 
 if __name__ == '__main__':
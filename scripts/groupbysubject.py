@@ -3,16 +3,90 @@
 See ``python groupbysubject.py --help`` for more information.
 """
 
-import collections
+import heapq
+import itertools
 import json
 import logging
 
 import click
 
+from scripts import _sorting, _utils
+
 
 logger = logging.getLogger(__name__)
 
 
+# constants
+
+BLOCK_SIZE = 20
+
+
+# helper functions
+
+def _pack(groups, capacity, max_groups=None):
+    """Return ``groups`` packed into bins using first-fit-decreasing.
+
+    Groups are placed into bins from largest to smallest, with each
+    group going into the earliest opened bin that has room for it. Ties
+    between groups of the same size keep their original order.
+
+    Parameters
+    ----------
+    groups : List[List[Any]]
+        The groups of items to pack. No group may be larger than
+        ``capacity``.
+    capacity : int
+        The maximum number of items in a bin.
+    max_groups : Optional[int], optional (default=None)
+        The maximum number of groups in a bin. If ``None``, bins may hold
+        any number of groups.
+
+    Returns
+    -------
+    List[List[Any]]
+        The bins, each a list of items, in the order they were opened.
+    """
+    bins = []
+    bin_num_groups = []
+    # open_bins[r] : a heap of the indices of bins with r spaces left
+    # that can still accept groups.
+    open_bins = [[] for _ in range(capacity + 1)]
+    for group in sorted(groups, key=len, reverse=True):
+        size = len(group)
+
+        # find the earliest opened bin with enough room
+        bin_idx = None
+        for remaining in range(size, capacity + 1):
+            if len(open_bins[remaining]) == 0:
+                continue
+            if bin_idx is None or open_bins[remaining][0] < bin_idx:
+                bin_idx = open_bins[remaining][0]
+                bin_remaining = remaining
+
+        if bin_idx is None:
+            bin_idx = len(bins)
+            bin_remaining = capacity
+            bins.append([])
+            bin_num_groups.append(0)
+        else:
+            heapq.heappop(open_bins[bin_remaining])
+
+        bins[bin_idx].extend(group)
+        bin_num_groups[bin_idx] += 1
+
+        # put the bin back if it can still accept groups
+        bin_remaining -= size
+        has_room = bin_remaining > 0
+        under_max_groups = (
+            max_groups is None
+            or bin_num_groups[bin_idx] < max_groups
+        )
+        if has_room and under_max_groups:
+            heapq.heappush(open_bins[bin_remaining], bin_idx)
+
+    return bins
+
+
 # main function
 
 @click.command(
@@ -29,7 +103,38 @@ logger = logging.getLogger(__name__)
     '--ignore-subject',
     is_flag=True,
     help='Ignore the subject and just put rows in groups of 20.')
-def groupbysubject(data_path, output_path, ignore_subject):
+@click.option(
+    '--memory-budget',
+    type=int,
+    default=_sorting.MEMORY_BUDGET,
+    help='The memory (in MB) of rows to hold when grouping before'
+         ' spilling to disk. It\'s estimated from the sizes of the'
+         ' serialized rows, not measured, so the process uses more.')
+@click.option(
+    '--pack',
+    is_flag=True,
+    help='Pack the rows for subjects with fewer than 20 rows together'
+         ' into full blocks.')
+@click.option(
+    '--max-subjects-per-block',
+    type=click.IntRange(min=1),
+    default=None,
+    help='The maximum number of subjects to pack into a block. Requires'
+         ' --pack.')
+@click.option(
+    '--dataset',
+    type=str,
+    default=None,
+    help='Read DATASET from the SQLite database at DATA_PATH, rather'
+         ' than reading DATA_PATH as JSON Lines.')
+def groupbysubject(
+        data_path,
+        output_path,
+        ignore_subject,
+        memory_budget,
+        pack,
+        max_subjects_per_block,
+        dataset):
     """Group the data in blocks of at most 20 by subject.
 
     Group the data in blocks of at most 20 by subject. This script is
@@ -38,34 +143,99 @@ def groupbysubject(data_path, output_path, ignore_subject):
     to reduce scrolling and page loading. The data is read from
     DATA_PATH and written to OUTPUT_PATH. DATA_PATH should be JSON
     Lines formated data with each object having a 'subject' attribute.
+    Subjects are written in the order they first appear in DATA_PATH,
+    and rows keep their order within each subject. Data that doesn't
+    fit in the memory budget is grouped with an external sort.
+
+    If --pack is set, each subject's rows are still split into full
+    blocks of 20 first, but the leftover rows that don't fill a block
+    (all of a subject's rows if it has fewer than 20, otherwise its
+    last partial block) are bin packed with first-fit-decreasing, so
+    that blocks hold several small subjects. A subject's leftover rows
+    are never split across blocks. Packing reduces the number of HITs.
+    Use --max-subjects-per-block to cap how many subjects can share a
+    block. Neither option can be combined with --ignore-subject.
+
+    If --dataset is set, DATA_PATH should be a database written by the
+    loaddb command, and the rows are read from DATASET.
     """
+    if ignore_subject and (pack or max_subjects_per_block is not None):
+        raise click.UsageError(
+            '--pack and --max-subjects-per-block cannot be used with'
+            ' --ignore-subject.')
+
+    if max_subjects_per_block is not None and not pack:
+        raise click.UsageError(
+            '--max-subjects-per-block can only be used with --pack.')
+
     if ignore_subject:
-        rows = []
-        with click.open_file(data_path, 'r') as data_file:
-            for ln in data_file:
-                rows.append(json.loads(ln))
+        with _utils.open_file(output_path, 'w') as output_file:
+            rows = []
+            for row in _utils.read_rows(data_path, dataset):
+                rows.append(row)
+                if len(rows) == BLOCK_SIZE:
+                    output_file.write(json.dumps({'rows': rows}) + '\n')
+                    rows = []
 
-        with click.open_file(output_path, 'w') as output_file:
-            for i in range(0, len(rows), 20):
-                output_file.write(json.dumps({'rows': rows[i:i+20]}) + '\n')
+            if len(rows) > 0:
+                output_file.write(json.dumps({'rows': rows}) + '\n')
 
     else:
-        subjects_to_rows = collections.defaultdict(list)
-        with click.open_file(data_path, 'r') as data_file:
-            for ln in data_file:
-                row = json.loads(ln)
-                subjects_to_rows[row['subject']].append(row)
-
-        with click.open_file(output_path, 'w') as output_file:
-            for subject, rows in subjects_to_rows.items():
-                if len(rows) < 20:
+        # sort the rows by the order in which their subject first
+        # appears, then by their line number. Sorting this way groups
+        # the rows by subject while preserving the input order.
+        sorter = _sorting.ExternalSorter(memory_budget=memory_budget)
+        subject_to_idx = {}
+        rows = _utils.read_rows(data_path, dataset)
+        for line_idx, row in enumerate(rows):
+            subject_idx = subject_to_idx.setdefault(
+                row['subject'], len(subject_to_idx))
+            sorter.add(
+                f'{subject_idx:012d}\t{line_idx:012d}\t{json.dumps(row)}')
+
+        # leftovers : the groups of rows that don't fill a block, which
+        # will be packed together at the end when pack is True.
+        leftovers = []
+        num_blocks = 0
+        with _utils.open_file(output_path, 'w') as output_file:
+            for _, sorted_strs in itertools.groupby(
+                    sorter, key=lambda s: s.split('\t', 1)[0]):
+                rows = [
+                    json.loads(s.split('\t', 2)[2])
+                    for s in sorted_strs
+                ]
+                subject = rows[0]['subject']
+
+                if len(rows) < BLOCK_SIZE:
                     logger.info(f'{subject} only has {len(rows)} assertions.')
 
-                if len(rows) > 20:
+                if len(rows) > BLOCK_SIZE:
                     logger.info(f'{subject} has more than 20 assertions.')
 
-                for i in range(0, len(rows), 20):
-                    output_file.write(json.dumps({'rows': rows[i:i+20]}) + '\n')
+                for i in range(0, len(rows), BLOCK_SIZE):
+                    block = rows[i:i+BLOCK_SIZE]
+                    if pack and len(block) < BLOCK_SIZE:
+                        leftovers.append(block)
+                        continue
+
+                    output_file.write(json.dumps({'rows': block}) + '\n')
+                    num_blocks += 1
+
+            if pack:
+                blocks = _pack(
+                    groups=leftovers,
+                    capacity=BLOCK_SIZE,
+                    max_groups=max_subjects_per_block)
+                for block in blocks:
+                    output_file.write(json.dumps({'rows': block}) + '\n')
+
+                logger.info(
+                    f'Packed {len(leftovers)} partial blocks into'
+                    f' {len(blocks)} blocks.')
+
+                num_blocks += len(blocks)
+
+        logger.info(f'Wrote {num_blocks} blocks.')
 
 
 if __name__ == '__main__':
@@ -0,0 +1,72 @@
+"""Load datasets into a SQLite database.
+
+See ``python loaddb.py --help`` for more information.
+"""
+
+import logging
+
+import click
+
+from scripts import _db, _utils
+
+
+logger = logging.getLogger(__name__)
+
+
+# main function
+
+@click.command(
+    context_settings={
+        'help_option_names': ['-h', '--help']
+    })
+@click.argument(
+    'db_path',
+    type=click.Path(exists=False, file_okay=True, dir_okay=False))
+@click.argument(
+    'dataset',
+    type=str)
+@click.argument(
+    'data_paths',
+    type=click.Path(exists=True, file_okay=True, dir_okay=False),
+    nargs=-1)
+@click.option(
+    '--append',
+    is_flag=True,
+    help='Append to DATASET rather than replacing it.')
+@click.option(
+    '--batch-size',
+    type=click.IntRange(min=1),
+    default=_db.BATCH_SIZE,
+    help='The number of rows to insert at once. With --append, each'
+         ' batch is committed in its own transaction.')
+def loaddb(db_path, dataset, data_paths, append, batch_size):
+    """Load DATA_PATHS into DATASET in the database at DB_PATH.
+
+    Load the JSON Lines files at DATA_PATHS, such as the output of the
+    extract commands, into the dataset named DATASET in the SQLite
+    database at DB_PATH, creating the database if necessary. Each row
+    is stored as JSON along with its subject, question, and answer,
+    which are indexed for fast lookups and joins. Unless --append is
+    set, any rows already in DATASET are replaced in a single
+    transaction, so the old rows are kept if loading fails.
+    """
+    def row_strs():
+        """Yield the rows from each file in DATA_PATHS."""
+        for data_path in data_paths:
+            logger.info(f'Reading {data_path}.')
+            with _utils.open_file(data_path, 'r') as data_file:
+                for ln in data_file:
+                    ln = ln.strip()
+                    if ln:
+                        yield ln
+
+    _db.write(
+        db_path=db_path,
+        dataset=dataset,
+        row_strs=row_strs(),
+        replace=not append,
+        batch_size=batch_size)
+
+
+if __name__ == '__main__':
+    loaddb()
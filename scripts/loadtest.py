@@ -0,0 +1,237 @@
+"""Load test a local twentyquestions server.
+
+See ``python loadtest.py --help`` for more information.
+"""
+
+import json
+import logging
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+import click
+import numpy as np
+
+from scripts import _loadtest
+
+
+logger = logging.getLogger(__name__)
+
+
+# constants
+
+# the hosts that may be load tested
+LOCAL_HOSTS = ['localhost', '127.0.0.1', '::1']
+
+# how often to poll the server for its memory use, in seconds
+SERVER_INFO_INTERVAL = 1.0
+
+
+# helper functions
+
+def _get_server_info(url):
+    """Return the JSON from the server's /server-info endpoint."""
+    with urllib.request.urlopen(f'{url}/server-info') as response:
+        return json.loads(response.read().decode('utf-8'))
+
+
+def _percentile_ms(values, q):
+    """Return the ``q``'th percentile of ``values`` in milliseconds."""
+    if len(values) == 0:
+        return None
+
+    return float(np.percentile(values, q)) * 1000
+
+
+# main function
+
+@click.command(
+    context_settings={
+        'help_option_names': ['-h', '--help']
+    })
+@click.argument(
+    'url',
+    type=str,
+    default='http://127.0.0.1:5000')
+@click.option(
+    '--num-clients',
+    type=click.IntRange(min=1),
+    default=100,
+    help='The number of simulated clients to run at once.')
+@click.option(
+    '--num-games',
+    type=click.IntRange(min=1),
+    default=1,
+    help='The number of games each client plays.')
+@click.option(
+    '--think-time',
+    type=float,
+    default=0.5,
+    help='The mean number of seconds each client waits before acting.')
+@click.option(
+    '--disconnect-rate',
+    type=float,
+    default=0.0,
+    help='The probability that a client drops its connection and'
+         ' reconnects before each action.')
+@click.option(
+    '--ramp-up',
+    type=float,
+    default=5.0,
+    help='The number of seconds over which to start the clients.')
+@click.option(
+    '--timeout',
+    type=float,
+    default=600.0,
+    help='The maximum number of seconds to run for.')
+@click.option(
+    '--output-path',
+    type=click.Path(exists=False, file_okay=True, dir_okay=False),
+    default=None,
+    help='Also write the results to this path as JSON.')
+def loadtest(
+        url,
+        num_clients,
+        num_games,
+        think_time,
+        disconnect_rate,
+        ramp_up,
+        timeout,
+        output_path):
+    """Load test the twentyquestions server at URL.
+
+    Start --num-clients simulated clients against the server at URL
+    (by default, one started locally with the serve command). Each
+    client speaks the same Socket.IO protocol as the frontend and plays
+    --num-games complete games, waiting a random --think-time before
+    each action and dropping and re-establishing its connection with
+    probability --disconnect-rate. Once every client finishes, or
+    --timeout passes, report the events per second, the p50 and p99
+    round trip latency from the server, the time to be matched into a
+    game, and the server's peak memory use.
+
+    URL must be on localhost. Every game uses up one of the server's
+    seed subjects, so restart the server between large load tests.
+    Running the clients requires the python-socketio client, installed
+    with "pip install python-socketio[client]".
+    """
+    host = urllib.parse.urlparse(url).hostname
+    if host not in LOCAL_HOSTS:
+        raise click.BadParameter(
+            f'Only servers on localhost can be load tested, not {host}.',
+            param_hint='URL')
+    if think_time < 0:
+        raise click.BadParameter(
+            'The think time must be non-negative.',
+            param_hint='--think-time')
+    if not 0 <= disconnect_rate <= 1:
+        raise click.BadParameter(
+            'The disconnect rate must be between 0 and 1.',
+            param_hint='--disconnect-rate')
+
+    # python-socketio is installed with the server, but only versions
+    # 4.0 and later have a client.
+    import socketio
+    if not hasattr(socketio, 'Client'):
+        raise click.ClickException(
+            'Load testing requires the python-socketio client. Install'
+            ' it with "pip install python-socketio[client]".')
+
+    try:
+        server_info = _get_server_info(url)
+    except OSError as e:
+        raise click.ClickException(
+            f'Could not reach the server at {url}: {e}')
+    max_rss_kb = server_info['maxRssKb']
+
+    # poll the server's memory use in the background
+    done = threading.Event()
+
+    def poll_server_info():
+        """Track the server's peak memory use until ``done`` is set."""
+        nonlocal max_rss_kb
+
+        while not done.wait(SERVER_INFO_INTERVAL):
+            try:
+                max_rss_kb = max(
+                    max_rss_kb, _get_server_info(url)['maxRssKb'])
+            except OSError:
+                logger.warning('Could not read the server info.')
+
+    poller = threading.Thread(target=poll_server_info, daemon=True)
+    poller.start()
+
+    # the socket.io client logs every packet at the INFO level
+    for logger_name in ['socketio.client', 'engineio.client']:
+        logging.getLogger(logger_name).setLevel(logging.WARNING)
+
+    logger.info(f'Starting {num_clients} clients against {url}.')
+
+    start = time.monotonic()
+    deadline = start + timeout
+    clients = []
+    for _ in range(num_clients):
+        client = _loadtest.SimulatedClient(
+            url=url,
+            num_games=num_games,
+            think_time=think_time,
+            disconnect_rate=disconnect_rate,
+            deadline=deadline)
+        client.start()
+        clients.append(client)
+        time.sleep(ramp_up / num_clients)
+
+    for client in clients:
+        client.join(max(0, deadline - time.monotonic()))
+    elapsed = time.monotonic() - start
+
+    done.set()
+    poller.join()
+    try:
+        max_rss_kb = max(max_rss_kb, _get_server_info(url)['maxRssKb'])
+    except OSError:
+        logger.warning('Could not read the server info.')
+
+    num_events = sum(
+        client.num_sent + client.num_received
+        for client in clients)
+    latencies = [
+        latency
+        for client in clients
+        for latency in client.latencies
+    ]
+    match_times = [
+        match_time
+        for client in clients
+        for match_time in client.match_times
+    ]
+    results = {
+        'num_clients': num_clients,
+        'elapsed_seconds': elapsed,
+        'num_events': num_events,
+        'events_per_second': num_events / elapsed,
+        'num_games_finished': sum(
+            client.num_games_finished for client in clients),
+        'num_reconnects': sum(
+            client.num_reconnects for client in clients),
+        'num_errors': sum(client.num_errors for client in clients),
+        'latency_p50_ms': _percentile_ms(latencies, 50),
+        'latency_p99_ms': _percentile_ms(latencies, 99),
+        'time_to_match_p50_ms': _percentile_ms(match_times, 50),
+        'time_to_match_p99_ms': _percentile_ms(match_times, 99),
+        'server_max_rss_mb': max_rss_kb / 1024
+    }
+
+    for key, value in results.items():
+        if isinstance(value, float):
+            value = f'{value:.2f}'
+        click.echo(f'{key:<24} {value}')
+
+    if output_path is not None:
+        with open(output_path, 'w') as output_file:
+            json.dump(results, output_file, indent=2)
+
+
+if __name__ == '__main__':
+    loadtest()
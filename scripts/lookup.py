@@ -0,0 +1,75 @@
+"""Look up rows in indexed JSON Lines files.
+
+See ``python lookup.py --help`` for more information.
+"""
+
+import json
+import logging
+
+import click
+
+from scripts import _offsets, _utils
+
+
+logger = logging.getLogger(__name__)
+
+
+# main function
+
+@click.command(
+    context_settings={
+        'help_option_names': ['-h', '--help']
+    })
+@click.argument(
+    'data_path',
+    type=click.Path(exists=True, file_okay=True, dir_okay=False))
+@click.argument(
+    'output_path',
+    type=click.Path(exists=False, file_okay=True, dir_okay=False),
+    default='-')
+@click.option(
+    '--row',
+    type=int,
+    multiple=True,
+    help='The line number (starting from 0) of a row to return. May be'
+         ' provided multiple times.')
+@click.option(
+    '--key',
+    type=(str, str),
+    multiple=True,
+    metavar='KEY VALUE',
+    help='Return the rows whose KEY attribute is VALUE. KEY must have'
+         ' been indexed with buildindex. May be provided multiple'
+         ' times.')
+def lookup(data_path, output_path, row, key):
+    """Look up rows in DATA_PATH and write them to OUTPUT_PATH.
+
+    Read the rows selected by --row and --key from the JSON Lines file
+    at DATA_PATH, using the indexes written by the buildindex command,
+    and write them to OUTPUT_PATH (or stdout) in JSON Lines format.
+    Only the requested rows are read from DATA_PATH.
+    """
+    try:
+        index = _offsets.OffsetIndex(data_path)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='DATA_PATH')
+
+    with index, _utils.open_file(output_path, 'w') as output_file:
+        for i in row:
+            try:
+                output_file.write(json.dumps(index[i]) + '\n')
+            except IndexError:
+                raise click.BadParameter(
+                    f'{data_path} has {len(index)} rows.',
+                    param_hint='--row')
+        for attribute, value in key:
+            try:
+                rows = index.lookup(attribute, value)
+            except ValueError as e:
+                raise click.BadParameter(str(e), param_hint='--key')
+            for r in rows:
+                output_file.write(json.dumps(r) + '\n')
+
+
+if __name__ == '__main__':
+    lookup()
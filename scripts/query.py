@@ -0,0 +1,109 @@
+"""Query datasets in a SQLite database.
+
+See ``python query.py --help`` for more information.
+"""
+
+import json
+import logging
+import sqlite3
+
+import click
+
+from scripts import _db, _utils
+
+
+logger = logging.getLogger(__name__)
+
+
+# main function
+
+@click.command(
+    context_settings={
+        'help_option_names': ['-h', '--help']
+    })
+@click.argument(
+    'db_path',
+    type=click.Path(exists=True, file_okay=True, dir_okay=False))
+@click.argument(
+    'output_path',
+    type=click.Path(exists=False, file_okay=True, dir_okay=False),
+    default='-')
+@click.option(
+    '--dataset',
+    type=str,
+    help='The dataset to read rows from.')
+@click.option(
+    '--subject',
+    type=str,
+    help='Only return rows with this subject.')
+@click.option(
+    '--question',
+    type=str,
+    help='Only return rows with this question.')
+@click.option(
+    '--answer',
+    type=str,
+    help='Only return rows with this answer.')
+@click.option(
+    '--sql',
+    type=str,
+    help='Run SQL against the database instead of looking up rows.')
+def query(db_path, output_path, dataset, subject, question, answer, sql):
+    """Query the database at DB_PATH and write to OUTPUT_PATH.
+
+    Look up rows from the SQLite database at DB_PATH, written by the
+    loaddb command, and write them to OUTPUT_PATH (or stdout) in JSON
+    Lines format. Either provide --dataset, optionally with --subject,
+    --question, and --answer to filter the rows using the indexes, or
+    provide --sql to run an arbitrary query. Rows are stored in the
+    "rows" table with the columns "dataset", "subject", "question",
+    "answer", and "data" (the full row as JSON), and the results of
+    --sql queries are written as objects keyed by column name. The
+    database is opened read-only for --sql, so statements that modify
+    it fail. For example, to join the questions to their quality
+    labels:
+
+        SELECT q.subject, q.question, q.answer, l.data
+        FROM rows AS q JOIN rows AS l
+        USING (subject, question, answer)
+        WHERE q.dataset = 'questions' AND l.dataset = 'quality'
+    """
+    if (dataset is None) == (sql is None):
+        raise click.UsageError(
+            'Exactly one of --dataset or --sql must be provided.')
+
+    if sql is not None:
+        connection = _db.connect(db_path, read_only=True)
+        try:
+            try:
+                cursor = connection.execute(sql)
+            except sqlite3.Error as e:
+                raise click.BadParameter(str(e), param_hint='--sql')
+            columns = [
+                description[0]
+                for description in cursor.description or []
+            ]
+            rows = (dict(zip(columns, values)) for values in cursor)
+            with _utils.open_file(output_path, 'w') as output_file:
+                for row in rows:
+                    output_file.write(json.dumps(row) + '\n')
+        finally:
+            connection.close()
+    else:
+        key = {
+            attribute: value
+            for attribute, value in [
+                ('subject', subject),
+                ('question', question),
+                ('answer', answer)
+            ]
+            if value is not None
+        }
+        rows = _db.read(db_path, dataset, **key)
+        with _utils.open_file(output_path, 'w') as output_file:
+            for row in rows:
+                output_file.write(json.dumps(row) + '\n')
+
+
+if __name__ == '__main__':
+    query()
@@ -0,0 +1,165 @@
+"""Replay a trace of socket events against a fresh server.
+
+See ``python replay.py --help`` for more information.
+"""
+
+import json
+import logging
+import time
+
+import click
+import flask
+from flask_socketio import test_client
+import numpy as np
+
+from backend import app, tracing, views
+
+
+logger = logging.getLogger(__name__)
+
+
+# helper functions
+
+def _handle_disconnect(flask_app, sid):
+    """Run the delayed handling of ``sid`` disconnecting."""
+    # the handler normally runs in a copy of the disconnect event's
+    # request context, so recreate that context
+    with flask_app.test_request_context('/socket.io'):
+        flask.request.sid = sid
+        flask.request.namespace = '/'
+        views.handle_disconnect(sid)
+
+
+# main function
+
+@click.command(
+    context_settings={
+        'help_option_names': ['-h', '--help']
+    })
+@click.argument(
+    'trace_path',
+    type=click.Path(exists=True, file_okay=True, dir_okay=False))
+@click.option(
+    '--realtime',
+    is_flag=True,
+    help='Replay the events at the speed they were recorded, rather than'
+         ' as fast as possible.')
+@click.option(
+    '--output-path',
+    type=click.Path(exists=False, file_okay=True, dir_okay=False),
+    default=None,
+    help='Also write the results to this path as JSON.')
+def replay(trace_path, realtime, output_path):
+    """Replay the socket events in TRACE_PATH.
+
+    Feed the events recorded by "serve --record-trace" through the
+    server's socket handlers, starting from a fresh PlayerRouter with
+    the same seed for its IDs and subjects as the recording. Then
+    report the throughput and the latency of handling each event, and
+    check the final state against the digest recorded in the trace.
+
+    Each recorded SID is replayed by a Flask-SocketIO test client, so
+    the replay runs in-process and nothing is sent over the network.
+    Exits with an error if the final state doesn't match.
+    """
+    records = tracing.iter_trace(trace_path)
+
+    header = next(records)
+    if header.get('version') != tracing.VERSION:
+        raise click.BadParameter(
+            f'{trace_path} is not a version {tracing.VERSION} trace.',
+            param_hint='TRACE_PATH')
+
+    views.reset(seed=header['seed'])
+    flask_app = app.create_app()
+    # handle each event before replaying the next one, so that they're
+    # handled in the order they were recorded
+    views.socketio.server.async_handlers = False
+
+    # the views log every event at the INFO level
+    logging.getLogger(views.__name__).setLevel(logging.WARNING)
+
+    test_clients = {}
+    latencies = []
+    num_errors = 0
+    recorded_digest = None
+    start = time.monotonic()
+    for record in records:
+        if isinstance(record, dict):
+            recorded_digest = record['digest']
+            continue
+
+        timestamp, sid, event, payload = record
+
+        if realtime:
+            time.sleep(max(0, start + timestamp - time.monotonic()))
+
+        event_start = time.perf_counter()
+        try:
+            if event == 'connect':
+                test_clients[sid] = views.socketio.test_client(flask_app)
+            elif event == 'disconnect':
+                test_clients[sid].disconnect()
+            elif event == 'handleDisconnect':
+                _handle_disconnect(flask_app, test_clients[payload].sid)
+            else:
+                test_clients[sid].emit(event, payload)
+        except Exception:
+            # the server logs errors in handlers and carries on
+            logger.exception(f'Replaying {event} from SID {sid} failed.')
+            num_errors += 1
+        latencies.append(time.perf_counter() - event_start)
+
+        # the test clients queue every message sent to them, and
+        # nothing reads them, so drop them
+        test_client.SocketIOTestClient.queue.clear()
+
+    elapsed = time.monotonic() - start
+
+    digest = views.state_digest()
+    if recorded_digest is None:
+        logger.warning(
+            f'{trace_path} has no digest, so the final state cannot be'
+            f' checked. The recording may not have been stopped cleanly.')
+
+    if len(latencies) == 0:
+        raise click.BadParameter(
+            f'{trace_path} has no events.',
+            param_hint='TRACE_PATH')
+
+    # the throughput only counts time spent handling events, so it's
+    # comparable between realtime and as fast as possible replays
+    handler_seconds = sum(latencies)
+    latencies_ms = np.array(latencies) * 1000
+    results = {
+        'num_events': len(latencies),
+        'num_errors': num_errors,
+        'elapsed_seconds': elapsed,
+        'handler_seconds': handler_seconds,
+        'events_per_second': len(latencies) / handler_seconds,
+        'latency_p50_ms': float(np.percentile(latencies_ms, 50)),
+        'latency_p99_ms': float(np.percentile(latencies_ms, 99)),
+        'digest': digest,
+        'digest_matches': (
+            digest == recorded_digest
+            if recorded_digest is not None
+            else None
+        )
+    }
+
+    for key, value in results.items():
+        if isinstance(value, float):
+            value = f'{value:.2f}'
+        click.echo(f'{key:<24} {value}')
+
+    if output_path is not None:
+        with open(output_path, 'w') as output_file:
+            json.dump(results, output_file, indent=2)
+
+    if results['digest_matches'] is False:
+        raise click.ClickException(
+            'The final state does not match the recorded digest.')
+
+
+if __name__ == '__main__':
+    replay()
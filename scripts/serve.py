@@ -4,11 +4,13 @@ See ``python serve.py --help`` for more information.
 """
 
 import logging
+import signal
+import sys
 
 import click
+import eventlet
 
-import backend
-from backend import views
+from backend import app, settings, views
 
 
 logger = logging.getLogger(__name__)
@@ -18,13 +20,49 @@ logger = logging.getLogger(__name__)
     context_settings={
         'help_option_names': ['-h', '--help']
     })
-def serve():
+@click.option(
+    '--record-trace',
+    type=click.Path(exists=False, file_okay=True, dir_okay=False),
+    default=None,
+    help='Record every inbound socket event to this path, for replaying'
+         ' with the replay command. Use a .gz extension to compress the'
+         ' trace.')
+@click.option(
+    '--blocking-threshold',
+    type=float,
+    default=settings.BLOCKING_THRESHOLD,
+    help='Log any socket handler or green thread that holds the eventlet'
+         ' hub for longer than this many seconds, with its stack. Pass 0'
+         ' to turn the detector off.')
+def serve(record_trace, blocking_threshold):
     """Serve twentyquestions on port 5000."""
+    if blocking_threshold < 0:
+        raise click.BadParameter(
+            'must be non-negative.',
+            param_hint='--blocking-threshold')
+
+    if blocking_threshold > 0:
+        # start the detector once the hub is running
+        eventlet.spawn(views.start_blocking_detector, blocking_threshold)
+    else:
+        # don't log slow handlers either
+        views.slow_handler_threshold = float('inf')
+
+    if record_trace is not None:
+        views.start_recording(record_trace)
+        # exit normally on SIGTERM (e.g., from kubernetes), so that the
+        # trace is finished
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    else:
+        # evictions depend on the timing of events, so they can't be
+        # replayed from a trace
+        views.start_sweeper()
+
     logger.info('Running prod server on http://127.0.0.1:5000/')
 
     # flask socketio has it's own functionality for serving the app
     views.socketio.run(
-        backend.app,
+        app.create_app(),
         host='0.0.0.0',
         port='5000',
         debug=False)
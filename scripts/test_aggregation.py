@@ -0,0 +1,128 @@
+"""Test label aggregation."""
+
+import unittest
+
+import numpy as np
+
+from . import _aggregation
+
+
+class DawidSkeneTestCase(unittest.TestCase):
+    """Test the ``dawid_skene`` function."""
+
+    def test_dawid_skene(self):
+        """Test ``dawid_skene``."""
+        # items 0-2 are class 1 and items 3-5 are class 0. Workers 0 and
+        # 1 are always right and worker 2 is always wrong.
+        item_idxs = []
+        worker_idxs = []
+        label_idxs = []
+        for item_idx in range(6):
+            true_class = 1 if item_idx < 3 else 0
+            for worker_idx in range(3):
+                item_idxs.append(item_idx)
+                worker_idxs.append(worker_idx)
+                label_idxs.append(
+                    true_class if worker_idx < 2 else 1 - true_class)
+
+        posteriors = _aggregation.dawid_skene(
+            item_idxs=item_idxs,
+            worker_idxs=worker_idxs,
+            label_idxs=label_idxs,
+            label_to_class=[0, 1])
+
+        self.assertEqual(posteriors.shape, (6, 2))
+        np.testing.assert_allclose(posteriors.sum(axis=1), 1.)
+        self.assertEqual(
+            posteriors.argmax(axis=1).tolist(),
+            [1, 1, 1, 0, 0, 0])
+        # learning that worker 2 is unreliable makes the posteriors
+        # more confident than majority vote's 2/3
+        self.assertTrue((posteriors.max(axis=1) > 0.9).all())
+
+        # check that items without votes get the class priors
+        posteriors = _aggregation.dawid_skene(
+            item_idxs=[0, 0, 2, 2],
+            worker_idxs=[0, 1, 0, 1],
+            label_idxs=[1, 1, 0, 1],
+            label_to_class=[0, 1])
+
+        self.assertFalse(np.isnan(posteriors).any())
+        np.testing.assert_allclose(posteriors.sum(axis=1), 1.)
+        self.assertLess(posteriors[1].max(), posteriors[0].max())
+
+        # check that random labels don't give confident posteriors
+        rng = np.random.RandomState(0)
+        item_idxs = np.repeat(np.arange(1000), 3)
+        worker_idxs = rng.randint(100, size=len(item_idxs))
+        label_idxs = rng.randint(2, size=len(item_idxs))
+        posteriors = _aggregation.dawid_skene(
+            item_idxs=item_idxs,
+            worker_idxs=worker_idxs,
+            label_idxs=label_idxs,
+            label_to_class=[0, 1])
+
+        confident = (posteriors[:, 1] < 0.1) | (posteriors[:, 1] > 0.9)
+        self.assertLess(confident.mean(), 0.2)
+        # more true votes make an item more likely true, and unanimous
+        # items are never confidently flipped
+        num_true_votes = np.bincount(item_idxs, weights=label_idxs)
+        medians = [
+            np.median(posteriors[num_true_votes == num_votes, 1])
+            for num_votes in range(4)
+        ]
+        self.assertEqual(medians, sorted(medians))
+        self.assertLess(posteriors[num_true_votes == 0, 1].max(), 0.9)
+        self.assertGreater(posteriors[num_true_votes == 3, 1].min(), 0.1)
+
+        # check that no votes give no posteriors
+        posteriors = _aggregation.dawid_skene(
+            item_idxs=[],
+            worker_idxs=[],
+            label_idxs=[],
+            label_to_class=[0, 0, 1])
+
+        self.assertEqual(posteriors.shape, (0, 2))
+
+
+class IndexTestCase(unittest.TestCase):
+    """Test the ``index`` function."""
+
+    def test_index(self):
+        """Test ``index``."""
+        idxs, value_to_idx = _aggregation.index(
+            ['foo', 'bar', 'foo', None, 'bar'])
+
+        self.assertEqual(idxs, [0, 1, 0, 2, 1])
+        self.assertEqual(value_to_idx, {'foo': 0, 'bar': 1, None: 2})
+
+        self.assertEqual(_aggregation.index([]), ([], {}))
+
+
+class EstimateProbabilitiesTestCase(unittest.TestCase):
+    """Test the ``estimate_probabilities`` function."""
+
+    def test_estimate_probabilities(self):
+        """Test ``estimate_probabilities``."""
+        key_to_probability = _aggregation.estimate_probabilities(
+            key_to_labels={
+                ('a',): ['yes', 'yes', 'no'],
+                ('b',): ['no', 'no', 'maybe']
+            },
+            key_to_worker_ids={
+                ('a',): ['w1', 'w2', None],
+                ('b',): ['w1', 'w2', None]
+            },
+            label_to_bit={'yes': 1, 'maybe': 1, 'no': 0})
+
+        self.assertEqual(set(key_to_probability), {('a',), ('b',)})
+        self.assertGreater(key_to_probability[('a',)], 0.5)
+        self.assertLess(key_to_probability[('b',)], 0.5)
+
+        # check that no labels give no probabilities
+        self.assertEqual(
+            _aggregation.estimate_probabilities(
+                key_to_labels={},
+                key_to_worker_ids={},
+                label_to_bit={'yes': 1, 'no': 0}),
+            {})
@@ -0,0 +1,66 @@
+"""Test the columnar format."""
+
+import tempfile
+import unittest
+
+from . import _columnar
+
+
+class ColumnarWriterTestCase(unittest.TestCase):
+    """Test the ``ColumnarWriter`` class."""
+
+    def write_and_load(self, rows):
+        """Return the columns after writing ``rows`` and loading them."""
+        with tempfile.TemporaryDirectory() as path:
+            writer = _columnar.ColumnarWriter(path)
+            for row in rows:
+                writer.add(row)
+            writer.close()
+
+            columns = _columnar.load(path)
+
+            return {
+                attribute: [
+                    column[i].item() if hasattr(column[i], 'item')
+                    else column[i]
+                    for i in range(len(column))
+                ]
+                for attribute, column in columns.items()
+            }
+
+    def test_add(self):
+        """Test ``add``."""
+        rows = [
+            {'a': True, 'b': 1, 'c': 'foo', 'd': ['x']},
+            {'a': False, 'b': 2, 'c': None, 'd': None},
+            {'a': True, 'b': 3, 'c': 'foo', 'd': {'y': 1}}
+        ]
+
+        self.assertEqual(
+            self.write_and_load(rows),
+            {
+                'a': [True, False, True],
+                'b': [1, 2, 3],
+                'c': ['foo', None, 'foo'],
+                'd': [['x'], None, {'y': 1}]
+            })
+
+        # check that columns are widened when a value doesn't fit
+
+        self.assertEqual(
+            self.write_and_load([{'a': True}, {'a': 5}, {'a': False}]),
+            {'a': [True, 5, False]})
+        self.assertEqual(
+            self.write_and_load([{'a': 1}, {'a': None}, {'a': 1}]),
+            {'a': [1, None, 1]})
+        self.assertEqual(
+            self.write_and_load(
+                [{'a': 'foo'}, {'a': None}, {'a': True}, {'a': 'foo'}]),
+            {'a': ['foo', None, True, 'foo']})
+
+        # check that rows must have the same attributes
+
+        writer = _columnar.ColumnarWriter('unused')
+        writer.add({'a': 1})
+        with self.assertRaises(ValueError):
+            writer.add({'b': 1})
@@ -0,0 +1,187 @@
+"""Test creating splits."""
+
+import collections
+import json
+import os
+import random
+import tempfile
+import unittest
+
+from . import create_splits
+
+
+class AssignSplitIndicesTestCase(unittest.TestCase):
+    """Test the ``_assign_split_indices`` function."""
+
+    def test__assign_split_indices(self):
+        """Test ``_assign_split_indices``."""
+        random.seed(0)
+        split_indices = create_splits._assign_split_indices(1000)
+
+        self.assertEqual(
+            collections.Counter(split_indices),
+            {0: 800, 1: 100, 2: 100})
+
+        # check that weighted IDs split the weight by the portions
+        weights = [100, 50] + [1] * 850
+        for seed in range(5):
+            random.seed(seed)
+            split_indices = create_splits._assign_split_indices(
+                len(weights), weights=weights)
+
+            split_weights = [0, 0, 0]
+            for weight, split_index in zip(weights, split_indices):
+                split_weights[split_index] += weight
+            for split_weight, portion in zip(split_weights, [0.8, 0.1, 0.1]):
+                self.assertAlmostEqual(
+                    split_weight / sum(weights), portion, delta=0.1)
+
+        # check that no IDs give no split indices
+        self.assertEqual(create_splits._assign_split_indices(0), bytearray())
+        self.assertEqual(
+            create_splits._assign_split_indices(0, weights=[]),
+            bytearray())
+
+
+class HashSplitIndexTestCase(unittest.TestCase):
+    """Test the ``_hash_split_index`` function."""
+
+    def test__hash_split_index(self):
+        """Test ``_hash_split_index``."""
+        strs = [f'question:{i}' for i in range(1000)]
+        split_indices = [
+            create_splits._hash_split_index(
+                s, create_splits.SPLIT_PORTIONS, b'foo')
+            for s in strs
+        ]
+
+        # the split indices follow the portions
+        counts = collections.Counter(split_indices)
+        self.assertEqual(set(counts), {0, 1, 2})
+        self.assertAlmostEqual(counts[0] / len(strs), 0.8, delta=0.05)
+        self.assertAlmostEqual(counts[1] / len(strs), 0.1, delta=0.05)
+
+        # check that the split indices are deterministic
+        self.assertEqual(
+            [
+                create_splits._hash_split_index(
+                    s, create_splits.SPLIT_PORTIONS, b'foo')
+                for s in strs
+            ],
+            split_indices)
+
+        # check that the split indices depend on the key
+        self.assertNotEqual(
+            [
+                create_splits._hash_split_index(
+                    s, create_splits.SPLIT_PORTIONS, b'bar')
+                for s in strs
+            ],
+            split_indices)
+
+
+class AppendHashedSplitsTestCase(unittest.TestCase):
+    """Test the ``_append_hashed_splits`` function."""
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.tmp_dir = tmp_dir.name
+
+        rng = random.Random(0)
+        subjects = ['Cat', 'cat!', 'dog', 'a car'] + [
+            f'thing {i}' for i in range(50)
+        ]
+        self.batches = []
+        for batch_idx in range(2):
+            rows = [
+                {
+                    'subject': rng.choice(subjects),
+                    'question': f'Is it number {rng.randrange(100)}?',
+                    'answer': rng.choice([True, False]),
+                    'batch': batch_idx,
+                    'i': i
+                }
+                for i in range(500)
+            ]
+            batch_path = os.path.join(
+                self.tmp_dir, f'batch-{batch_idx}.jsonl')
+            with open(batch_path, 'w') as batch_file:
+                for row in rows:
+                    batch_file.write(json.dumps(row) + '\n')
+            self.batches.append(batch_path)
+
+    def append(self, output_dir, batch_path):
+        """Append ``batch_path`` to the splits in ``output_dir``."""
+        os.makedirs(output_dir, exist_ok=True)
+        create_splits._append_hashed_splits(
+            data_path=batch_path,
+            dataset=None,
+            split_paths=[
+                os.path.join(output_dir, f'{split_name}.jsonl')
+                for split_name in create_splits.SPLIT_NAMES
+            ],
+            batches_path=os.path.join(output_dir, 'batches.txt'),
+            hash_key=b'key')
+
+    def read_splits(self, output_dir):
+        """Return the lines of each split in ``output_dir``."""
+        splits = []
+        for split_name in create_splits.SPLIT_NAMES:
+            with open(os.path.join(output_dir, f'{split_name}.jsonl')) as f:
+                splits.append(f.readlines())
+
+        return splits
+
+    def test__append_hashed_splits(self):
+        """Test ``_append_hashed_splits``."""
+        output_dir_a = os.path.join(self.tmp_dir, 'a')
+        output_dir_b = os.path.join(self.tmp_dir, 'b')
+
+        self.append(output_dir_a, self.batches[0])
+        old_splits = self.read_splits(output_dir_a)
+        self.assertTrue(all(len(split) > 0 for split in old_splits))
+        self.assertEqual(
+            sum(len(split) for split in old_splits),
+            500)
+
+        # check that the splits are deterministic
+        self.append(output_dir_b, self.batches[0])
+        self.assertEqual(self.read_splits(output_dir_b), old_splits)
+
+        # check that appending a batch never moves the old rows
+        self.append(output_dir_a, self.batches[1])
+        new_splits = self.read_splits(output_dir_a)
+        for old_split, new_split in zip(old_splits, new_splits):
+            self.assertEqual(new_split[:len(old_split)], old_split)
+        self.assertEqual(
+            sum(len(split) for split in new_splits),
+            1000)
+
+        # check that the split indices are the lowest split containing
+        # each subject and question
+        subject_to_split_index = {}
+        question_to_split_index = {}
+        for split_index, split in enumerate(new_splits):
+            for ln in split:
+                row = json.loads(ln)
+                subject = create_splits._normalize(row['subject'])
+                question = create_splits._normalize(row['question'])
+                subject_to_split_index.setdefault(subject, split_index)
+                question_to_split_index.setdefault(question, split_index)
+        for split in new_splits:
+            for ln in split:
+                row = json.loads(ln)
+                self.assertEqual(
+                    row['subject_split_index'],
+                    subject_to_split_index[
+                        create_splits._normalize(row['subject'])])
+                self.assertEqual(
+                    row['question_split_index'],
+                    question_to_split_index[
+                        create_splits._normalize(row['question'])])
+
+        # check that a batch can't be appended twice
+        with self.assertRaises(ValueError):
+            self.append(output_dir_a, self.batches[1])
+        self.assertEqual(self.read_splits(output_dir_a), new_splits)
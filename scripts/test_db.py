@@ -0,0 +1,80 @@
+"""Test the SQLite store."""
+
+import json
+import os
+import tempfile
+import unittest
+
+from click.testing import CliRunner
+
+from . import _db, query
+
+
+class WriteTestCase(unittest.TestCase):
+    """Test the ``write`` function."""
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.db_path = os.path.join(tmp_dir.name, 'test.db')
+
+        self.rows = [
+            {'subject': 'cat', 'question': f'is it {i}?', 'answer': 'no'}
+            for i in range(5)
+        ]
+
+    def test_write(self):
+        """Test ``write``."""
+        row_strs = [json.dumps(row) for row in self.rows]
+        self.assertEqual(
+            _db.write(self.db_path, 'foo', row_strs, batch_size=2),
+            5)
+        self.assertEqual(list(_db.read(self.db_path, 'foo')), self.rows)
+
+        # check that appending keeps the old rows
+        _db.write(self.db_path, 'foo', row_strs[:1], replace=False)
+        self.assertEqual(
+            list(_db.read(self.db_path, 'foo')),
+            self.rows + self.rows[:1])
+
+        # check that replacing keeps the old rows if writing fails
+        def failing_row_strs():
+            yield from row_strs[:3]
+            raise RuntimeError
+
+        with self.assertRaises(RuntimeError):
+            _db.write(self.db_path, 'foo', failing_row_strs(), batch_size=2)
+        self.assertEqual(
+            list(_db.read(self.db_path, 'foo')),
+            self.rows + self.rows[:1])
+
+        _db.write(self.db_path, 'foo', row_strs[1:])
+        self.assertEqual(
+            list(_db.read(self.db_path, 'foo')),
+            self.rows[1:])
+
+
+class QueryTestCase(unittest.TestCase):
+    """Test the ``query`` command."""
+
+    def test_query(self):
+        """Test ``query``."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = os.path.join(tmp_dir, 'test.db')
+            _db.write(db_path, 'foo', ['{"subject": "cat"}'])
+
+            result = CliRunner().invoke(
+                query.query,
+                [db_path, '--sql', 'SELECT subject FROM rows'])
+            self.assertEqual(result.exit_code, 0, result.output)
+            self.assertEqual(result.output, '{"subject": "cat"}\n')
+
+            # check that --sql can't modify the database
+            result = CliRunner().invoke(
+                query.query,
+                [db_path, '--sql', 'DELETE FROM rows'])
+            self.assertEqual(result.exit_code, 2)
+            self.assertIn('readonly', result.output)
+            self.assertEqual(
+                list(_db.read(db_path, 'foo')),
+                [{'subject': 'cat'}])
@@ -0,0 +1,123 @@
+"""Test decoding the form data."""
+
+import ast
+import collections
+import random
+import unittest
+import warnings
+
+from . import _decoding
+
+
+class LiteralTestCase(unittest.TestCase):
+    """Test the ``literal`` function."""
+
+    def assert_matches_literal_eval(self, s):
+        """Assert ``literal`` parses ``s`` like ``ast.literal_eval``."""
+        # clear the cache so that the parsers are exercised each time
+        _decoding._literal.cache_clear()
+
+        with warnings.catch_warnings():
+            # literal_eval warns about invalid escapes and some
+            # malformed numbers
+            warnings.simplefilter('ignore')
+            try:
+                expected = ast.literal_eval(s)
+            except Exception:
+                with self.assertRaises(Exception, msg=repr(s)):
+                    _decoding.literal(s)
+                return
+
+            value = _decoding.literal(s)
+
+        self.assertEqual(value, expected, msg=repr(s))
+        self.assertEqual(type(value), type(expected), msg=repr(s))
+
+    def test_literal(self):
+        """Test ``literal``."""
+        self.assertIsNone(_decoding.literal('None'))
+        self.assertIs(_decoding.literal('True'), True)
+        self.assertIs(_decoding.literal('False'), False)
+        self.assertEqual(_decoding.literal('-12'), -12)
+        self.assertEqual(
+            _decoding.literal("['good', 'good', 'bad']"),
+            ['good', 'good', 'bad'])
+
+        # check that the fast paths match ast.literal_eval, including
+        # escapes, embedded quotes, and malformed values
+        for s in [
+                '0', '-0', '007', '1_000', '+1', ' 1', '1 ', '1.5',
+                str(2 ** 70), str(-2 ** 70),
+                '[]', '[ ]', "['']", "['a']", "['a', 'b']", "['a','b']",
+                "['a',  'b']", "['a', 'b',]", "[ 'a']", "['a' ]",
+                "['a', b]", "['a' 'b']", "['a]", "['a', 'b'",
+                "['it\\'s']", "['a\\\\']", "['\\n']", "['\\x41']",
+                "['\\u00e9']", "['é', '漢字']", '["a"]', '["it\'s"]',
+                "[\"a\", 'b']", "['a\nb']", "['a\rb']", "['a\x00b']",
+                "['a\tb']", "[1, 2]", "[-1]", "('a', 'b')", "{'a': 1}",
+                "'a'", 'none', 'true', ''
+        ]:
+            self.assert_matches_literal_eval(s)
+
+        rng = random.Random(0)
+        alphabet = "ab'\"\\\n\r\t\x00, []-0129é"
+        for _ in range(2000):
+            chars = ''.join(
+                rng.choice(alphabet)
+                for _ in range(rng.randint(0, 8)))
+            self.assert_matches_literal_eval(chars)
+            self.assert_matches_literal_eval(f"['{chars}']")
+            self.assert_matches_literal_eval(repr([chars, chars[::-1]]))
+            self.assert_matches_literal_eval(
+                str(rng.randint(-10 ** 20, 10 ** 20)))
+
+        # check that the cached lists aren't handed out
+        labels = _decoding.literal("['good', 'bad']")
+        labels.append('bad')
+        self.assertEqual(
+            _decoding.literal("['good', 'bad']"),
+            ['good', 'bad'])
+
+
+class CompileSchemaTestCase(unittest.TestCase):
+    """Test the ``compile_schema`` function."""
+
+    def test_compile_schema(self):
+        """Test ``compile_schema``."""
+        schema = collections.OrderedDict([
+            ('subject', str),
+            ('count', int),
+            ('quality_labels', _decoding.literal),
+            ("it's", _decoding.literal)
+        ])
+        decode = _decoding.compile_schema(schema)
+        values = ['cat', '3', "['good', 'bad']", 'None']
+
+        decoded = decode(values)
+        self.assertIsInstance(decoded, collections.OrderedDict)
+        self.assertEqual(
+            list(decoded.items()),
+            [
+                ('subject', 'cat'),
+                ('count', 3),
+                ('quality_labels', ['good', 'bad']),
+                ("it's", None)
+            ])
+        # the decoder matches applying the schema one attribute at a
+        # time
+        self.assertEqual(
+            decoded,
+            collections.OrderedDict([
+                (attribute, as_type(value))
+                for (attribute, as_type), value
+                in zip(schema.items(), values)
+            ]))
+
+        # check that errors from the types propagate
+        with self.assertRaises(ValueError):
+            decode(['cat', 'three', '[]', 'None'])
+
+        # check that an empty schema decodes to an empty row
+        self.assertEqual(
+            _decoding.compile_schema({})([]),
+            collections.OrderedDict())
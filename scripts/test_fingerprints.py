@@ -0,0 +1,78 @@
+"""Test the fingerprint index."""
+
+import os
+import stat
+import tempfile
+import unittest
+
+from . import _fingerprints
+
+
+class FingerprintTestCase(unittest.TestCase):
+    """Test the ``fingerprint`` function."""
+
+    def test_fingerprint(self):
+        """Test ``fingerprint``."""
+        value = _fingerprints.fingerprint(['cat', 'is it alive?'])
+
+        self.assertEqual(
+            _fingerprints.fingerprint(['cat', 'is it alive?']),
+            value)
+        self.assertNotEqual(
+            _fingerprints.fingerprint(['dog', 'is it alive?']),
+            value)
+        self.assertTrue(0 <= value < 2 ** (8 * _fingerprints.DIGEST_SIZE))
+
+
+class FingerprintIndexTestCase(unittest.TestCase):
+    """Test the ``FingerprintIndex`` class."""
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.path = os.path.join(tmp_dir.name, 'seen.npy')
+
+        umask = os.umask(0o027)
+        self.addCleanup(os.umask, umask)
+
+    def test_save(self):
+        """Test ``save``."""
+        index = _fingerprints.FingerprintIndex(self.path)
+        self.assertEqual(len(index), 0)
+
+        index.add(['cat', 'is it alive?'])
+        index.add(['dog', 'is it alive?'])
+        index.add(['cat', 'is it alive?'])
+        # added keys aren't visible until the index is saved
+        self.assertNotIn(['cat', 'is it alive?'], index)
+
+        index.save()
+        self.assertEqual(len(index), 2)
+        self.assertIn(['cat', 'is it alive?'], index)
+
+        # check that the saved index has the umask's permissions
+        self.assertEqual(
+            stat.S_IMODE(os.stat(self.path).st_mode),
+            0o640)
+
+        # check that reloading the index keeps the keys
+        index = _fingerprints.FingerprintIndex(self.path)
+        self.assertEqual(len(index), 2)
+        self.assertIn(['cat', 'is it alive?'], index)
+        self.assertIn(['dog', 'is it alive?'], index)
+        self.assertNotIn(['cow', 'is it alive?'], index)
+
+        # check that new keys are merged into the existing index, and
+        # the existing permissions are kept
+        os.chmod(self.path, 0o644)
+        index.add(['cow', 'is it alive?'])
+        index.add(['dog', 'is it alive?'])
+        index.save()
+
+        index = _fingerprints.FingerprintIndex(self.path)
+        self.assertEqual(len(index), 3)
+        for subject in ['cat', 'dog', 'cow']:
+            self.assertIn([subject, 'is it alive?'], index)
+        self.assertEqual(
+            stat.S_IMODE(os.stat(self.path).st_mode),
+            0o644)
@@ -0,0 +1,130 @@
+"""Test grouping by subject."""
+
+import json
+import os
+import tempfile
+import unittest
+
+from click.testing import CliRunner
+
+from . import groupbysubject
+
+
+class PackTestCase(unittest.TestCase):
+    """Test the ``_pack`` function."""
+
+    def test__pack(self):
+        """Test ``_pack``."""
+        groups = [
+            ['a'] * 3,
+            ['b'] * 8,
+            ['c'] * 5,
+            ['d'] * 7,
+            ['e'] * 2
+        ]
+
+        # the groups are placed largest first, each into the earliest
+        # opened bin with room
+        self.assertEqual(
+            groupbysubject._pack(groups=groups, capacity=10),
+            [
+                ['b'] * 8 + ['e'] * 2,
+                ['d'] * 7 + ['a'] * 3,
+                ['c'] * 5
+            ])
+
+        # check that ties keep their original order
+        self.assertEqual(
+            groupbysubject._pack(groups=[['a'], ['b'], ['c']], capacity=2),
+            [['a', 'b'], ['c']])
+
+        # check that max_groups caps the groups in a bin
+        self.assertEqual(
+            groupbysubject._pack(groups=groups, capacity=10, max_groups=1),
+            [['b'] * 8, ['d'] * 7, ['c'] * 5, ['a'] * 3, ['e'] * 2])
+        self.assertEqual(
+            groupbysubject._pack(
+                groups=[['a'], ['b'], ['c'], ['d'], ['e']],
+                capacity=10,
+                max_groups=2),
+            [['a', 'b'], ['c', 'd'], ['e']])
+
+        # check that no groups give no bins
+        self.assertEqual(groupbysubject._pack(groups=[], capacity=10), [])
+
+
+class GroupbysubjectTestCase(unittest.TestCase):
+    """Test the ``groupbysubject`` command."""
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+
+        self.data_path = os.path.join(tmp_dir.name, 'data.jsonl')
+        self.output_path = os.path.join(tmp_dir.name, 'output.jsonl')
+
+        rows = (
+            [{'subject': 'x', 'i': i} for i in range(25)]
+            + [{'subject': 'y', 'i': i} for i in range(3)]
+            + [{'subject': 'z', 'i': i} for i in range(4)]
+        )
+        with open(self.data_path, 'w') as data_file:
+            for row in rows:
+                data_file.write(json.dumps(row) + '\n')
+
+    def run_groupbysubject(self, *args):
+        """Return the result and blocks from running the command."""
+        result = CliRunner().invoke(
+            groupbysubject.groupbysubject,
+            [self.data_path, self.output_path, *args])
+
+        blocks = []
+        if result.exit_code == 0:
+            with open(self.output_path, 'r') as output_file:
+                blocks = [
+                    [
+                        (row['subject'], row['i'])
+                        for row in json.loads(ln)['rows']
+                    ]
+                    for ln in output_file
+                ]
+
+        return result, blocks
+
+    def test_groupbysubject(self):
+        """Test ``groupbysubject``."""
+        result, blocks = self.run_groupbysubject()
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertEqual(
+            [len(block) for block in blocks],
+            [20, 5, 3, 4])
+
+        # check that --pack packs the leftover rows, keeping each
+        # subject's leftovers together
+        result, blocks = self.run_groupbysubject('--pack')
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertEqual(
+            blocks,
+            [
+                [('x', i) for i in range(20)],
+                [('x', i) for i in range(20, 25)]
+                + [('z', i) for i in range(4)]
+                + [('y', i) for i in range(3)]
+            ])
+
+        result, blocks = self.run_groupbysubject(
+            '--pack', '--max-subjects-per-block', '2')
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertEqual(
+            [len(block) for block in blocks],
+            [20, 9, 3])
+
+        # check that invalid combinations of options are rejected
+        for args in [
+                ['--ignore-subject', '--pack'],
+                ['--ignore-subject', '--max-subjects-per-block', '2'],
+                ['--max-subjects-per-block', '2']
+        ]:
+            result, _ = self.run_groupbysubject(*args)
+            self.assertEqual(result.exit_code, 2, args)
+            self.assertIn('Error:', result.output)
@@ -0,0 +1,134 @@
+"""Test near-duplicate detection."""
+
+import random
+import unittest
+
+import numpy as np
+
+from . import _minhash
+
+
+def _jaccard(s, t, shingle_size=_minhash.SHINGLE_SIZE):
+    """Return the Jaccard similarity of the shingles of s and t."""
+    s_shingles = {
+        s[i:i+shingle_size]
+        for i in range(len(s) - shingle_size + 1)
+    }
+    t_shingles = {
+        t[i:i+shingle_size]
+        for i in range(len(t) - shingle_size + 1)
+    }
+
+    return len(s_shingles & t_shingles) / len(s_shingles | t_shingles)
+
+
+class ChooseBandsTestCase(unittest.TestCase):
+    """Test the ``_choose_bands`` function."""
+
+    def test__choose_bands(self):
+        """Test ``_choose_bands``."""
+        self.assertEqual(_minhash._choose_bands(64, 0.6), (16, 4))
+        self.assertEqual(_minhash._choose_bands(64, 0.9), (4, 13))
+        self.assertEqual(_minhash._choose_bands(64, 1.), (1, 64))
+
+        # check that the steepest point is the closest to the threshold
+        # without going above it
+        for num_hashes in [16, 64, 128]:
+            points = [
+                (1 / (num_hashes // rows)) ** (1 / rows)
+                for rows in range(1, num_hashes + 1)
+            ]
+            for threshold in np.linspace(0.1, 1., 19):
+                bands, rows = _minhash._choose_bands(num_hashes, threshold)
+                self.assertLessEqual(bands * rows, num_hashes)
+                self.assertEqual(
+                    (1 / bands) ** (1 / rows),
+                    max(point for point in points if point <= threshold))
+
+        # check that a threshold below every steepest point gives the
+        # most bands
+        self.assertEqual(_minhash._choose_bands(64, 0.01), (64, 1))
+
+
+class SignaturesTestCase(unittest.TestCase):
+    """Test the ``signatures`` function."""
+
+    def test_signatures(self):
+        """Test ``signatures``."""
+        strs = [
+            'is it bigger than a car',
+            'is it larger than a car',
+            'is it bigger than a car',
+            'can you eat it',
+            'a'
+        ]
+        sigs = _minhash.signatures(strs, num_hashes=256)
+
+        self.assertEqual(sigs.shape, (5, 256))
+        np.testing.assert_array_equal(sigs[0], sigs[2])
+        self.assertAlmostEqual(
+            (sigs[0] == sigs[1]).mean(),
+            _jaccard(strs[0], strs[1]),
+            delta=0.1)
+        self.assertLess((sigs[0] == sigs[3]).mean(), 0.1)
+
+        # check that signatures are deterministic given the seed
+        np.testing.assert_array_equal(
+            _minhash.signatures(strs, num_hashes=256), sigs)
+
+        # check that shingles must fit in an integer
+        with self.assertRaises(ValueError):
+            _minhash.signatures(
+                strs, shingle_size=_minhash.MAX_SHINGLE_SIZE + 1)
+
+
+class ClusterTestCase(unittest.TestCase):
+    """Test the ``cluster`` function."""
+
+    def test_cluster(self):
+        """Test ``cluster``."""
+        self.assertEqual(
+            _minhash.cluster([
+                'is it bigger than a car',
+                'can you eat it',
+                'is it larger than a car',
+                'is it bigger than a car?'
+            ]),
+            [0, 1, 0, 0])
+
+        # check that near-duplicates don't chain together. Each string
+        # overlaps the next one, so neighbors are near-duplicates but
+        # strings two apart aren't.
+        rng = random.Random(0)
+        text = ''.join(
+            rng.choice('abcdefghijklmnopqrstuvwxyz ')
+            for _ in range(200))
+        strs = [text[i * 8:i * 8 + 48] for i in range(8)]
+        self.assertGreater(_jaccard(strs[0], strs[1]), 0.6)
+        self.assertLess(_jaccard(strs[0], strs[2]), 0.6)
+
+        self.assertEqual(
+            _minhash.cluster(strs, threshold=0.6),
+            [0, 0, 1, 1, 2, 2, 3, 3])
+
+        # check that every string is a near-duplicate of its center,
+        # the first string in its cluster
+        strs = [
+            f'is it {rng.choice(["a", "an", "the"])} {word}'
+            for word in [
+                ''.join(
+                    rng.choice('abcdefghijklmnopqrstuvwxyz')
+                    for _ in range(rng.randint(2, 6)))
+                for _ in range(500)
+            ]
+        ]
+        cluster_ids = _minhash.cluster(strs, threshold=0.6)
+        sigs = _minhash.signatures(strs)
+        centers = {}
+        for i, cluster_id in enumerate(cluster_ids):
+            center = centers.setdefault(cluster_id, i)
+            self.assertGreaterEqual((sigs[i] == sigs[center]).mean(), 0.6)
+        self.assertEqual(sorted(centers), list(range(len(centers))))
+
+        # check that no strings give no clusters
+        self.assertEqual(_minhash.cluster([]), [])
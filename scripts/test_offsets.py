@@ -0,0 +1,154 @@
+"""Test byte-offset indexes."""
+
+import json
+import os
+import tempfile
+import unittest
+
+from click.testing import CliRunner
+
+from . import _offsets, lookup
+
+
+class OffsetsTestCase(unittest.TestCase):
+    """Base class for tests that index a JSON Lines file."""
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.data_path = os.path.join(tmp_dir.name, 'data.jsonl')
+
+        self.rows = [
+            {'subject': 'cat', 'question': 'is it an animal?'},
+            {'subject': 'dog', 'question': 'is it an animal?'},
+            {'subject': 'cat', 'question': 'does it purr?'},
+            {'question': 'is it alive?'}
+        ]
+        self.write_rows(self.rows)
+
+    def write_rows(self, rows):
+        """Write ``rows`` to the data file."""
+        with open(self.data_path, 'w') as data_file:
+            for row in rows:
+                data_file.write(json.dumps(row) + '\n')
+
+
+class BuildTestCase(OffsetsTestCase):
+    """Test the ``build`` function."""
+
+    def test_build(self):
+        """Test ``build``."""
+        self.assertEqual(
+            _offsets.build(self.data_path, keys=['subject']),
+            4)
+        with _offsets.OffsetIndex(self.data_path) as index:
+            self.assertEqual(len(index), 4)
+            self.assertEqual(
+                index.lookup('subject', 'cat'),
+                [self.rows[0], self.rows[2]])
+
+        # check that only string values can be indexed
+        for value in [['cat'], 1, True, None, {'name': 'cat'}]:
+            self.write_rows([{'subject': 'cat'}, {'subject': value}])
+            with self.assertRaises(ValueError):
+                _offsets.build(self.data_path, keys=['subject'])
+
+        # check that compressed files can't be indexed
+        with self.assertRaises(ValueError):
+            _offsets.build(self.data_path + '.gz')
+
+
+class OffsetIndexTestCase(OffsetsTestCase):
+    """Test the ``OffsetIndex`` class."""
+
+    def test___init__(self):
+        """Test ``__init__``."""
+        # check that a missing index raises a ValueError
+        with self.assertRaises(ValueError):
+            _offsets.OffsetIndex(self.data_path)
+
+        _offsets.build(self.data_path, keys=['subject'])
+        _offsets.OffsetIndex(self.data_path).close()
+
+        # check that changing the data file's modification time makes
+        # the index out of date, even if its size is the same
+        stat = os.stat(self.data_path)
+        os.utime(
+            self.data_path,
+            ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        with self.assertRaises(ValueError):
+            _offsets.OffsetIndex(self.data_path)
+
+        # check that changing the data file's size makes the index out
+        # of date
+        _offsets.build(self.data_path)
+        with open(self.data_path, 'a') as data_file:
+            data_file.write(json.dumps({'subject': 'cow'}) + '\n')
+        os.utime(self.data_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        with self.assertRaises(ValueError):
+            _offsets.OffsetIndex(self.data_path)
+
+    def test___getitem__(self):
+        """Test ``__getitem__``."""
+        _offsets.build(self.data_path)
+        with _offsets.OffsetIndex(self.data_path) as index:
+            self.assertEqual([index[i] for i in range(4)], self.rows)
+            self.assertEqual(index[-1], self.rows[-1])
+            with self.assertRaises(IndexError):
+                index[4]
+
+        # check that empty files can be indexed
+        self.write_rows([])
+        _offsets.build(self.data_path)
+        with _offsets.OffsetIndex(self.data_path) as index:
+            self.assertEqual(len(index), 0)
+
+    def test_lookup(self):
+        """Test ``lookup``."""
+        _offsets.build(self.data_path, keys=['subject', 'question'])
+        with _offsets.OffsetIndex(self.data_path) as index:
+            self.assertEqual(
+                index.lookup('subject', 'cat'),
+                [self.rows[0], self.rows[2]])
+            self.assertEqual(
+                index.lookup('question', 'is it an animal?'),
+                self.rows[:2])
+            self.assertEqual(index.lookup('subject', 'cow'), [])
+
+            # check that keys must have been indexed
+            with self.assertRaises(ValueError):
+                index.lookup('answer', 'yes')
+
+        # check that a key index left over from an old build is out of
+        # date
+        stat = os.stat(self.data_path)
+        self.write_rows(self.rows[::-1])
+        os.utime(
+            self.data_path,
+            ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        _offsets.build(self.data_path)
+        with _offsets.OffsetIndex(self.data_path) as index:
+            with self.assertRaises(ValueError):
+                index.lookup('subject', 'cat')
+
+
+class LookupTestCase(OffsetsTestCase):
+    """Test the ``lookup`` command."""
+
+    def test_lookup(self):
+        """Test ``lookup``."""
+        # check that a missing index is a bad parameter
+        result = CliRunner().invoke(
+            lookup.lookup,
+            [self.data_path, '--row', '0'])
+        self.assertEqual(result.exit_code, 2)
+        self.assertIn('buildindex', result.output)
+
+        _offsets.build(self.data_path, keys=['subject'])
+        result = CliRunner().invoke(
+            lookup.lookup,
+            [self.data_path, '--row', '1', '--key', 'subject', 'cat'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertEqual(
+            [json.loads(ln) for ln in result.output.splitlines()],
+            [self.rows[1], self.rows[0], self.rows[2]])
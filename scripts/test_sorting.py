@@ -0,0 +1,88 @@
+"""Test external memory sorting."""
+
+import os
+import random
+import unittest
+from unittest import mock
+
+from . import _sorting
+
+
+class ExternalSorterTestCase(unittest.TestCase):
+    """Test the ``ExternalSorter`` class."""
+
+    def setUp(self):
+        rng = random.Random(0)
+        self.strs = [str(rng.randrange(50)) for _ in range(500)]
+
+    def test_add(self):
+        """Test ``add``."""
+        # strings are held in memory while they fit in the budget
+        sorter = _sorting.ExternalSorter()
+        for s in self.strs:
+            sorter.add(s)
+
+        self.assertEqual(sorter._spill_paths, [])
+        self.assertEqual(list(sorter), sorted(self.strs))
+
+        # check that strings are spilled once they exceed the budget
+        sorter = _sorting.ExternalSorter(memory_budget=0)
+        for s in self.strs[:10]:
+            sorter.add(s)
+
+        self.assertEqual(len(sorter._spill_paths), 10)
+        self.assertTrue(
+            all(os.path.exists(path) for path in sorter._spill_paths))
+        self.assertEqual(list(sorter), sorted(self.strs[:10]))
+
+    def test___iter__(self):
+        """Test ``__iter__``."""
+        # with a budget of 0 every string gets its own spill file, so
+        # sorting 500 strings merges past MERGE_FAN_IN runs
+        self.assertGreater(len(self.strs), _sorting.MERGE_FAN_IN)
+
+        sorter = _sorting.ExternalSorter(memory_budget=0)
+        for s in self.strs:
+            sorter.add(s)
+        tmp_dir = sorter._tmp_dir.name
+
+        self.assertEqual(list(sorter), sorted(self.strs))
+        # check that the spill files are cleaned up
+        self.assertFalse(os.path.exists(tmp_dir))
+
+        # check that merging takes several passes when needed
+        with mock.patch.object(_sorting, 'MERGE_FAN_IN', 3):
+            sorter = _sorting.ExternalSorter(memory_budget=0)
+            for s in self.strs:
+                sorter.add(s)
+
+            self.assertEqual(list(sorter), sorted(self.strs))
+
+        # check that duplicates are removed across runs
+        sorter = _sorting.ExternalSorter(memory_budget=0, unique=True)
+        for s in self.strs:
+            sorter.add(s)
+
+        self.assertEqual(list(sorter), sorted(set(self.strs)))
+
+        # check that duplicates are removed in memory
+        sorter = _sorting.ExternalSorter(unique=True)
+        for s in self.strs:
+            sorter.add(s)
+
+        self.assertEqual(list(sorter), sorted(set(self.strs)))
+
+        # check that an empty sorter yields nothing
+        self.assertEqual(list(_sorting.ExternalSorter()), [])
+
+        # check that the spill files are cleaned up if iteration stops
+        # early
+        sorter = _sorting.ExternalSorter(memory_budget=0)
+        for s in self.strs:
+            sorter.add(s)
+        tmp_dir = sorter._tmp_dir.name
+        strs = iter(sorter)
+
+        self.assertEqual(next(strs), min(self.strs))
+        strs.close()
+        self.assertFalse(os.path.exists(tmp_dir))